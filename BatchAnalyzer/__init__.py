@@ -0,0 +1,229 @@
+"""Run the analyze, review and report pipeline for many complaints.
+
+:class:`BatchAnalyzer` pushes each complaint through the same steps as the
+CLI (``LLMAnalyzer`` → ``Review`` → ``ReportGenerator``) on a bounded thread
+pool, so throughput grows with ``concurrency`` while the number of LLM
+requests in flight stays limited. Items are independent: a failing item is
+recorded with its error and the remaining ones continue.
+
+The default concurrency is read from ``BATCH_CONCURRENCY`` (default ``4``).
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+import json
+import logging
+import os
+import threading
+import time
+
+from ComplaintSearch import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Claims workbook columns feeding the complaint details of a batch item
+CLAIM_FIELDS = {
+    "customer": normalize_text("Müşteri Adı"),
+    "subject": normalize_text("Hata Tanımı - Kök Neden"),
+    "part_code": normalize_text("Parça Numarası"),
+}
+
+
+def claims_to_details(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Return complaint details for rows of :class:`ExcelClaimsSearcher`.
+
+    The failure description of a claim serves as both complaint text and
+    subject; rows without one are skipped and other empty cells become
+    empty strings.
+    """
+    details: List[Dict[str, str]] = []
+    for row in rows:
+        item = {
+            field: "" if row.get(key) is None else str(row.get(key)).strip()
+            for field, key in CLAIM_FIELDS.items()
+        }
+        if not item["subject"]:
+            continue
+        item["complaint"] = item["subject"]
+        details.append(item)
+    return details
+
+
+class BatchAnalyzer:
+    """Analyze, review and report a list of complaints concurrently.
+
+    Parameters
+    ----------
+    guide_manager:
+        Source of the guideline for the requested method.
+    analyzer, reviewer, reporter:
+        ``LLMAnalyzer``, ``Review`` and ``ReportGenerator`` instances shared
+        by all items; they are safe to use from several threads.
+    concurrency:
+        Number of items processed at once. Defaults to ``BATCH_CONCURRENCY``.
+    pool:
+        Optional :class:`~ReportGenerator.pool.ReportPool`. When given,
+        reports are rendered in its worker processes instead of by
+        ``reporter`` on the batch threads, sharing its queue limit and its
+        deduplication of identical reports.
+    """
+
+    def __init__(
+        self,
+        guide_manager: Any,
+        analyzer: Any,
+        reviewer: Any,
+        reporter: Any,
+        concurrency: int | None = None,
+        pool: Any = None,
+    ) -> None:
+        self.guide_manager = guide_manager
+        self.analyzer = analyzer
+        self.reviewer = reviewer
+        self.reporter = reporter
+        if concurrency is None:
+            concurrency = int(os.getenv("BATCH_CONCURRENCY", "4"))
+        self.concurrency = max(1, concurrency)
+        self.pool = pool
+
+    def process(
+        self,
+        details: Dict[str, Any],
+        method: str,
+        guideline: Dict[str, Any],
+        output_dir: str | Path,
+        directives: str = "",
+        language: str = "Türkçe",
+    ) -> Dict[str, Any]:
+        """Run the pipeline for one complaint and return the report paths."""
+        analyze = self.analyzer.analyze
+        analysis = analyze(details, guideline, directives, language)
+        if "full_text" in analysis:
+            combined = analysis["full_text"]
+        else:
+            combined = "\n".join(v["response"] for v in analysis.values())
+        full_report = self.reviewer.perform(
+            combined,
+            method=method,
+            customer=details.get("customer", ""),
+            subject=details.get("subject", ""),
+            part_code=details.get("part_code", ""),
+            guideline_json=json.dumps(guideline, ensure_ascii=False),
+            language=language,
+        )
+        analysis["full_report"] = {"response": full_report}
+        complaint_info = {
+            "customer": details.get("customer", ""),
+            "subject": details.get("subject", ""),
+            "part_code": details.get("part_code", ""),
+        }
+        if self.pool is not None:
+            return self.pool.render(analysis, complaint_info, output_dir)
+        return self.reporter.generate(analysis, complaint_info, output_dir)
+
+    def run(
+        self,
+        items: List[Dict[str, Any]],
+        method: str,
+        output_dir: str | Path,
+        directives: str = "",
+        language: str = "Türkçe",
+        progress: Callable[[Dict[str, Any]], None] | None = None,
+    ) -> Dict[str, Any]:
+        """Process ``items`` and return per-item status with totals.
+
+        Parameters
+        ----------
+        items:
+            Complaint details with ``complaint``, ``customer``, ``subject``
+            and ``part_code`` keys.
+        method:
+            Reporting method whose guideline is used for every item.
+        output_dir:
+            Directory receiving the generated reports.
+        progress:
+            Optional callback receiving ``total``, ``completed``, ``failed``
+            and the ``items`` status list whenever an item changes state.
+
+        Returns
+        -------
+        Dict[str, Any]
+            ``total``, ``completed``, ``failed``, ``elapsed`` and ``items``;
+            each item holds ``index``, ``status`` (``queued``, ``running``,
+            ``done`` or ``failed``), ``pdf``/``excel`` paths and ``error``.
+        """
+        guideline = self.guide_manager.get_format(method)
+        empty = {"pdf": None, "excel": None, "error": None}
+        indices = range(len(items))
+        statuses = [dict(index=i, status="queued", **empty) for i in indices]
+        counts = {"completed": 0, "failed": 0}
+        lock = threading.Lock()
+
+        def report() -> None:
+            if progress is None:
+                return
+            # Reported under the lock so snapshots never arrive out of order
+            with lock:
+                progress(
+                    {
+                        "total": len(items),
+                        **counts,
+                        "items": [dict(s) for s in statuses],
+                    }
+                )
+
+        def work(index: int) -> None:
+            with lock:
+                statuses[index]["status"] = "running"
+            report()
+            try:
+                paths = self.process(
+                    items[index],
+                    method,
+                    guideline,
+                    output_dir,
+                    directives,
+                    language,
+                )
+            except Exception as exc:
+                logger.exception("Batch item %d failed", index)
+                with lock:
+                    statuses[index].update(status="failed", error=str(exc))
+                    counts["failed"] += 1
+            else:
+                with lock:
+                    statuses[index].update(
+                        status="done",
+                        pdf=str(paths["pdf"]),
+                        excel=str(paths["excel"]),
+                    )
+                    counts["completed"] += 1
+            report()
+
+        start = time.perf_counter()
+        report()
+        workers = min(self.concurrency, len(items)) or 1
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="batch"
+        ) as executor:
+            list(executor.map(work, range(len(items))))
+        elapsed = time.perf_counter() - start
+        logger.info(
+            "Batch of %d items finished in %.2fs (%d failed, concurrency %d)",
+            len(items),
+            elapsed,
+            counts["failed"],
+            workers,
+        )
+        return {
+            "total": len(items),
+            **counts,
+            "elapsed": round(elapsed, 3),
+            "items": statuses,
+        }
+
+
+__all__ = ["BatchAnalyzer", "claims_to_details"]
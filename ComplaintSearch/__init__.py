@@ -3,11 +3,16 @@
 from __future__ import annotations
 
 from pathlib import Path
-import json
 import re
 import unicodedata
-from difflib import SequenceMatcher
-from typing import Dict, List
+from typing import Dict, List, Type
+
+from .similarity import NGramIndex, SimilarityIndex
+
+# Record fields compared against search keywords
+SEARCH_FIELDS = ("complaint", "customer", "subject", "part_code")
+# Default database, next to the packages rather than in the working directory
+DEFAULT_STORE_PATH = Path(__file__).resolve().parents[1] / "complaints.db"
 
 
 def normalize_text(text: str) -> str:
@@ -21,56 +26,57 @@ def normalize_text(text: str) -> str:
 
 
 class ComplaintStore:
-    """Persist and query complaint records."""
+    """Persist and query complaint records.
+
+    Records are kept in SQLite by default. Paths ending in ``.json`` or
+    ``backend="json"`` select the plain JSON file backend instead.
+    """
 
-    def __init__(self, path: str | Path = "complaints.json") -> None:
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_STORE_PATH,
+        engine: Type[SimilarityIndex] = NGramIndex,
+        backend: str | None = None,
+    ) -> None:
+        """Initialize the store at ``path`` using the fuzzy ``engine``.
+
+        ``backend`` is ``"sqlite"`` or ``"json"``; when omitted it is chosen
+        from the file suffix. A new SQLite store imports the complaints of
+        the ``.json`` file with the same name once, if it exists.
+        """
         self.path = Path(path)
-        if not self.path.exists():
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump([], f)
+        if backend is None:
+            suffix = self.path.suffix.lower()
+            backend = "json" if suffix == ".json" else "sqlite"
+        if backend == "json":
+            self.backend: JSONComplaintBackend | SQLiteComplaintBackend = (
+                JSONComplaintBackend(self.path, engine)
+            )
+        elif backend == "sqlite":
+            self.backend = SQLiteComplaintBackend(self.path, engine)
+        else:
+            raise ValueError(f"Unknown complaint store backend: {backend}")
 
     def add_complaint(self, info: Dict[str, str]) -> None:
         """Append a complaint record to the store."""
-        if not self.path.exists():
-            data: List[Dict[str, str]] = []
-        else:
-            with open(self.path, "r", encoding="utf-8") as f:
-                try:
-                    data = json.load(f)
-                except json.JSONDecodeError:
-                    data = []
-        data.append(info)
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        self.backend.add_complaint(info)
 
     def search(self, keyword: str) -> List[Dict[str, str]]:
         """Return complaint records fuzzy-matching ``keyword``."""
-        if not self.path.exists():
-            return []
-
-        with open(self.path, "r", encoding="utf-8") as f:
-            try:
-                items: List[Dict[str, str]] = json.load(f)
-            except json.JSONDecodeError:
-                return []
-
-        keyword_norm = normalize_text(keyword)
-        results = []
-
-        for item in items:
-            for field in ["complaint", "customer", "subject", "part_code"]:
-                value = str(item.get(field, ""))
-                value_norm = normalize_text(value)
-                if keyword_norm in value_norm:
-                    results.append(item)
-                    break
-                ratio = SequenceMatcher(None, keyword_norm, value_norm).ratio()
-                if ratio >= 0.8:
-                    results.append(item)
-                    break
-        return results
-
-
-from .claims_excel import ExcelClaimsSearcher
-
-__all__ = ["ComplaintStore", "ExcelClaimsSearcher"]
+        return self.backend.search(keyword)
+
+
+# Imported last: both modules use ``normalize_text`` from this package
+from .storage import JSONComplaintBackend, SQLiteComplaintBackend  # noqa: E402
+from .claims_excel import (  # noqa: E402
+    ALIAS_TO_HEADER,
+    ExcelClaimsSearcher,
+    map_filters,
+)
+
+__all__ = [
+    "ALIAS_TO_HEADER",
+    "ComplaintStore",
+    "ExcelClaimsSearcher",
+    "map_filters",
+]
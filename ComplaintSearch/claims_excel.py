@@ -2,33 +2,155 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List, Tuple
+from typing import Any, Dict, Iterable, List, Tuple, Type
 from pathlib import Path
 from datetime import datetime
 import os
 import logging
+import threading
+import time
 
 from dotenv import load_dotenv
 from importlib import resources
 
-from difflib import SequenceMatcher
 from openpyxl import load_workbook
 
+from . import normalize_text
+from .similarity import ColumnMatcher, NGramIndex, SimilarityIndex
+
 # Normalized header names considered as date columns
 DATE_KEYS = {"date", "tarih", "hata tarihi"}
 
-from . import normalize_text
+logger = logging.getLogger(__name__)
+
+# Map common query aliases to Excel header names
+ALIAS_TO_HEADER = {
+    normalize_text("customer"): "Müşteri Adı",
+    normalize_text("musteri"): "Müşteri Adı",
+    normalize_text("müşteri adı"): "Müşteri Adı",
+    normalize_text("musteri adi"): "Müşteri Adı",
+    normalize_text("subject"): "Hata Tanımı - Kök Neden",
+    normalize_text("konu"): "Konu",
+    normalize_text("hata tanımı - kök neden"): "Hata Tanımı - Kök Neden",
+    normalize_text("part_code"): "Parça Numarası",
+    normalize_text("parca kodu"): "Parça Numarası",
+    normalize_text("parça kodu"): "Parça Numarası",
+    normalize_text("parça numarası"): "Parça Numarası",
+}
+
+
+def map_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``filters`` keyed by Excel header names.
+
+    Keys are looked up in :data:`ALIAS_TO_HEADER`; unknown keys are kept.
+    String values are stripped.
+    """
+    normalized: Dict[str, Any] = {}
+    for key, val in filters.items():
+        mapped = ALIAS_TO_HEADER.get(normalize_text(key), key)
+        if isinstance(val, str):
+            val = val.strip()
+        normalized[mapped] = val
+    return normalized
+
+
+# Marker for date cells holding strings that are not ISO formatted dates
+_INVALID_DATE = object()
+
+
+class ClaimsTable:
+    """Columnar in-memory snapshot of the active worksheet of a workbook.
+
+    Besides the raw column values the table keeps, for every column, a
+    mapping from normalized cell text to the row numbers holding it so that
+    filters are resolved per distinct value instead of per row.
+    """
+
+    __slots__ = (
+        "headers",
+        "indices",
+        "columns",
+        "row_count",
+        "lookup",
+        "dates",
+        "matchers",
+    )
+
+    def __init__(
+        self,
+        headers: List[str],
+        indices: Dict[str, int],
+        columns: Dict[str, Tuple[Any, ...]],
+        row_count: int,
+    ) -> None:
+        self.headers = headers
+        self.indices = indices
+        self.columns = columns
+        self.row_count = row_count
+        self.lookup: Dict[str, Dict[str, List[int]]] = {}
+        for key, column in columns.items():
+            index: Dict[str, List[int]] = {}
+            for row, value in enumerate(column):
+                index.setdefault(normalize_text(str(value)), []).append(row)
+            self.lookup[key] = index
+        self.dates: Tuple[Any, ...] | None = None
+        date_key = next((k for k in DATE_KEYS if k in columns), None)
+        if date_key is not None:
+            self.dates = tuple(_parse_date(v) for v in columns[date_key])
+        self.matchers: Dict[Tuple[type, str], ColumnMatcher] = {}
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Return row ``row`` as a dictionary keyed by normalized headers."""
+        return {key: column[row] for key, column in self.columns.items()}
+
+    def matcher(
+        self, key: str, engine: Type[SimilarityIndex] = NGramIndex
+    ) -> ColumnMatcher:
+        """Return a fuzzy matcher over the normalized values of column ``key``.
+
+        Matchers are built on first use and kept with the table. Unknown
+        columns behave like a column of empty cells.
+        """
+        index = self.lookup.get(key)
+        if index is None:
+            return ColumnMatcher({"": list(range(self.row_count))}, engine)
+        matcher = self.matchers.get((engine, key))
+        if matcher is None:
+            matcher = ColumnMatcher(index, engine)
+            self.matchers[(engine, key)] = matcher
+        return matcher
+
+
+def _parse_date(value: Any) -> Any:
+    """Return ``value`` with ISO date strings converted to ``datetime``."""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return _INVALID_DATE
+    return value
+
+
+# Loaded tables keyed by resolved path with their ``(mtime_ns, size)`` stamp
+_TABLE_CACHE: Dict[Path, Tuple[Tuple[int, int], ClaimsTable]] = {}
+_TABLE_LOCK = threading.Lock()
 
 
 class ExcelClaimsSearcher:
     """Search complaint records stored in an Excel file."""
 
-    def __init__(self, path: str | Path | None = None) -> None:
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        engine: Type[SimilarityIndex] = NGramIndex,
+    ) -> None:
         """Initialize with optional Excel file ``path``.
 
         When ``path`` is ``None``, ``CLAIMS_FILE_PATH`` is read from the
         ``.env`` file. If the variable is unset, the bundled
         ``F160_Customer_Claims.xlsx`` inside the ``CC`` package is used.
+        ``engine`` selects the fuzzy matching implementation from
+        :mod:`ComplaintSearch.similarity`.
         """
         if path is None:
             load_dotenv()
@@ -38,6 +160,7 @@ class ExcelClaimsSearcher:
                     "F160_Customer_Claims.xlsx"
                 )
         self.path = Path(path)
+        self.engine = engine
 
     def _load_headers(
         self, rows: Iterable[tuple[Any, ...]]
@@ -53,6 +176,51 @@ class ExcelClaimsSearcher:
                 return headers, mapping
         return [], {}
 
+    def _read_table(self) -> ClaimsTable:
+        """Parse the workbook at ``self.path`` into a :class:`ClaimsTable`."""
+        wb = load_workbook(self.path, read_only=True)
+        try:
+            ws = wb.active
+            rows = ws.iter_rows(values_only=True)
+            headers, indices = self._load_headers(rows)
+            if not headers:
+                return ClaimsTable([], {}, {}, 0)
+            data = list(rows)
+        finally:
+            wb.close()
+        columns = {
+            key: tuple(row[idx] if idx < len(row) else None for row in data)
+            for key, idx in indices.items()
+        }
+        return ClaimsTable(headers, indices, columns, len(data))
+
+    def _get_table(self) -> ClaimsTable | None:
+        """Return the cached table, reloading it when the file has changed.
+
+        Returns ``None`` when the file does not exist.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = self.path.resolve()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with _TABLE_LOCK:
+            cached = _TABLE_CACHE.get(key)
+            if cached is not None and cached[0] == stamp:
+                logger.debug("Claims cache hit for %s", key)
+                return cached[1]
+            start = time.perf_counter()
+            table = self._read_table()
+            _TABLE_CACHE[key] = (stamp, table)
+        logger.info(
+            "Claims cache miss for %s; loaded %d rows in %.3fs",
+            key,
+            table.row_count,
+            time.perf_counter() - start,
+        )
+        return table
+
     def search(
         self,
         filters: Dict[str, str],
@@ -80,32 +248,39 @@ class ExcelClaimsSearcher:
         List[Dict[str, Any]]
             Matching rows as dictionaries keyed by normalized headers.
         """
-        if not self.path.exists():
+        table = self._get_table()
+        if table is None:
             logging.warning("Excel file not found at %s", self.path)
             return []
-
-        wb = load_workbook(self.path, read_only=True)
-        ws = wb.active
-        rows = ws.iter_rows(values_only=True)
-        headers, indices = self._load_headers(rows)
-        if not headers:
-            wb.close()
+        if not table.headers:
             return []
-        results: List[Dict[str, Any]] = []
 
-        date_key = next((k for k in DATE_KEYS if k in indices), None)
+        candidates: set[int] | None = None
+        for key, val in filters.items():
+            if not val:
+                continue
+            key = normalize_text(key)
+            val_norm = normalize_text(str(val))
+            matcher = table.matcher(key, self.engine)
+            matched = matcher.match(val_norm, substring=key == "complaint")
+            if candidates is not None:
+                matched &= candidates
+            candidates = matched
+            if not candidates:
+                return []
+
+        rows: Iterable[int]
+        if candidates is None:
+            rows = range(table.row_count)
+        else:
+            rows = sorted(candidates)
+
+        results: List[Dict[str, Any]] = []
         for row in rows:
-            record = {
-                key: row[idx] if idx < len(row) else None
-                for key, idx in indices.items()
-            }
-            if date_key is not None:
-                value = record.get(date_key)
-                if isinstance(value, str):
-                    try:
-                        value = datetime.fromisoformat(value)
-                    except ValueError:
-                        continue
+            if table.dates is not None:
+                value = table.dates[row]
+                if value is _INVALID_DATE:
+                    continue
             else:
                 value = None
 
@@ -118,30 +293,8 @@ class ExcelClaimsSearcher:
                     continue
                 if end_year is not None and yr is not None and yr > end_year:
                     continue
-            match = True
-            for key, val in filters.items():
-                if not val:
-                    continue
-                key = normalize_text(key)
-                cell_raw = str(record.get(key, ""))
-                cell = normalize_text(cell_raw)
-                val_norm = normalize_text(str(val))
-                if key == "complaint":
-                    if val_norm in cell:
-                        continue
-                    ratio = SequenceMatcher(None, val_norm, cell).ratio()
-                    if ratio < 0.8:
-                        match = False
-                        break
-                else:
-                    ratio = SequenceMatcher(None, val_norm, cell).ratio()
-                    if cell != val_norm and ratio < 0.8:
-                        match = False
-                        break
-            if match:
-                results.append(record)
-
-        wb.close()
+            results.append(table.record(row))
+
         return results
 
     def unique_values(self, field: str) -> List[str]:
@@ -158,36 +311,23 @@ class ExcelClaimsSearcher:
         List[str]
             Unique cell values as strings. Empty cells are ignored.
         """
-        if not self.path.exists():
-            return []
-
-        wb = load_workbook(self.path, read_only=True)
-        ws = wb.active
-        rows = ws.iter_rows(values_only=True)
-        headers, indices = self._load_headers(rows)
-        if not headers:
-            wb.close()
+        table = self._get_table()
+        if table is None or not table.headers:
             return []
 
         key = normalize_text(field)
-        if key not in indices:
-            wb.close()
+        if key not in table.columns:
             return []
 
-        index = indices[key]
         values = set()
-        for row in rows:
-            if index >= len(row):
-                continue
-            val = row[index]
+        for val in table.columns[key]:
             if val is None:
                 continue
             text = str(val).strip()
             if text:
                 values.add(text)
 
-        wb.close()
         return sorted(values)
 
 
-__all__ = ["ExcelClaimsSearcher"]
+__all__ = ["ALIAS_TO_HEADER", "ExcelClaimsSearcher", "map_filters"]
@@ -0,0 +1,254 @@
+"""Fuzzy matching engines used by the complaint searchers.
+
+Both engines answer the same question as the original per-row loop: which
+stored values contain the query (substring mode) or are equal to it, or
+reach a :class:`difflib.SequenceMatcher` ratio of at least ``threshold``.
+:class:`ScanIndex` checks every value, while :class:`NGramIndex` uses
+length buckets and an n-gram inverted index to discard values that cannot
+reach the threshold before computing the exact ratio.
+"""
+
+from __future__ import annotations
+
+import abc
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Set, Type
+
+# Minimum ``SequenceMatcher.ratio`` for two values to be considered similar
+FUZZY_THRESHOLD = 0.8
+
+
+def _ratio_at_least(query: str, value: str, threshold: float) -> bool:
+    """Return ``True`` when ``SequenceMatcher`` rates the pair high enough."""
+    matcher = SequenceMatcher(None, query, value)
+    return (
+        matcher.real_quick_ratio() >= threshold
+        and matcher.quick_ratio() >= threshold
+        and matcher.ratio() >= threshold
+    )
+
+
+class SimilarityIndex(abc.ABC):
+    """Collection of normalized values answering fuzzy queries by id.
+
+    Subclasses implement :meth:`match`.
+    """
+
+    def __init__(
+        self, values: Iterable[str] = (), threshold: float = FUZZY_THRESHOLD
+    ) -> None:
+        self.threshold = threshold
+        self.values: List[str] = []
+        for value in values:
+            self.add(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, value: str) -> int:
+        """Store ``value`` and return its id."""
+        self.values.append(value)
+        return len(self.values) - 1
+
+    def _is_match(self, query: str, value: str, substring: bool) -> bool:
+        if substring:
+            if query in value:
+                return True
+        elif query == value:
+            return True
+        return _ratio_at_least(query, value, self.threshold)
+
+    @abc.abstractmethod
+    def match(self, query: str, substring: bool = False) -> List[int]:
+        """Return sorted ids of values matching ``query``.
+
+        Parameters
+        ----------
+        query:
+            Normalized text to look up.
+        substring:
+            When ``True`` values containing ``query`` match; otherwise only
+            values equal to it. Values reaching the similarity threshold
+            match in both modes.
+        """
+        raise NotImplementedError
+
+
+class ScanIndex(SimilarityIndex):
+    """Reference engine comparing the query against every value."""
+
+    def match(self, query: str, substring: bool = False) -> List[int]:
+        return [
+            idx
+            for idx, value in enumerate(self.values)
+            if self._is_match(query, value, substring)
+        ]
+
+
+class NGramIndex(SimilarityIndex):
+    """Engine pruning candidates with length buckets and n-gram counts.
+
+    A value of length ``lb`` can only reach ``threshold`` against a query of
+    length ``la`` when ``2 * min(la, lb) / (la + lb)`` does. For the lengths
+    that pass, the threshold fixes a minimum number ``m`` of matching
+    characters. Every unmatched character of one string breaks at most ``q``
+    of its n-grams and every unmatched character of the other breaks at most
+    ``q - 1``, so both strings must share at least
+    ``la - q + 1 - q * (la - m) - (q - 1) * (lb - m)`` n-grams. Only values
+    passing these checks reach ``SequenceMatcher``, so results are identical
+    to :class:`ScanIndex`.
+
+    Bigrams are used by default: with trigrams the bound above is never
+    positive at the default threshold of 0.8, so they could not prune.
+    """
+
+    q = 2
+
+    def __init__(
+        self, values: Iterable[str] = (), threshold: float = FUZZY_THRESHOLD
+    ) -> None:
+        self._postings: Dict[str, List[int]] = {}
+        self._lengths: Dict[int, List[int]] = {}
+        super().__init__(values, threshold)
+
+    def _grams(self, text: str) -> Iterable[str]:
+        q = self.q
+        ends = range(q, len(text) + 1)
+        return (text[i:end] for i, end in enumerate(ends))
+
+    def add(self, value: str) -> int:
+        idx = super().add(value)
+        self._lengths.setdefault(len(value), []).append(idx)
+        for gram in set(self._grams(value)):
+            self._postings.setdefault(gram, []).append(idx)
+        return idx
+
+    def _min_matches(self, total: int) -> int:
+        """Return the smallest match count reaching the threshold ratio."""
+        needed = int(self.threshold * total / 2)
+        while needed > 0 and 2.0 * (needed - 1) / total >= self.threshold:
+            needed -= 1
+        while total and 2.0 * needed / total < self.threshold:
+            needed += 1
+        return needed
+
+    def _required_grams(self, la: int, lb: int, matches: int) -> int:
+        """Return how many n-grams two strings with ``matches`` must share."""
+        q = self.q
+        return max(
+            la - q + 1 - q * (la - matches) - (q - 1) * (lb - matches),
+            lb - q + 1 - q * (lb - matches) - (q - 1) * (la - matches),
+        )
+
+    def _substring_ids(self, query: str) -> Set[int]:
+        if len(query) < self.q:
+            values = enumerate(self.values)
+            return {idx for idx, value in values if query in value}
+        lists = sorted(
+            (self._postings.get(gram, []) for gram in set(self._grams(query))),
+            key=len,
+        )
+        found = set(lists[0])
+        for ids in lists[1:]:
+            if not found:
+                break
+            found.intersection_update(ids)
+        return {idx for idx in found if query in self.values[idx]}
+
+    def match(self, query: str, substring: bool = False) -> List[int]:
+        if not query:
+            if substring:
+                return list(range(len(self.values)))
+            return [
+                idx
+                for idx in self._lengths.get(0, [])
+                if self._is_match(query, self.values[idx], substring)
+            ]
+
+        found: Set[int] = set()
+        if substring:
+            found = self._substring_ids(query)
+        else:
+            found.update(
+                idx
+                for idx in self._lengths.get(len(query), [])
+                if self.values[idx] == query
+            )
+
+        la = len(query)
+        scores: Counter[int] | None = None
+        for lb, ids in self._lengths.items():
+            total = la + lb
+            if 2.0 * min(la, lb) / total < self.threshold:
+                continue
+            required = self._required_grams(la, lb, self._min_matches(total))
+            if required > 0:
+                if scores is None:
+                    scores = Counter()
+                    for gram, count in Counter(self._grams(query)).items():
+                        for idx in self._postings.get(gram, ()):
+                            scores[idx] += count
+                candidates: Iterable[int] = (
+                    idx for idx in ids if scores[idx] >= required
+                )
+            else:
+                candidates = ids
+            for idx in candidates:
+                if idx not in found and _ratio_at_least(
+                    query, self.values[idx], self.threshold
+                ):
+                    found.add(idx)
+        return sorted(found)
+
+
+class ColumnMatcher:
+    """Fuzzy lookup from normalized column values to the rows holding them.
+
+    The engine only sees distinct values, so rows sharing a value are
+    compared once.
+    """
+
+    def __init__(
+        self,
+        rows: Dict[str, List[int]] | None = None,
+        engine: Type[SimilarityIndex] = NGramIndex,
+    ) -> None:
+        self.rows: Dict[str, List[int]] = rows if rows is not None else {}
+        self.engine = engine(self.rows)
+        self._row_lists = list(self.rows.values())
+
+    @classmethod
+    def from_values(
+        cls, values: Iterable[str], engine: Type[SimilarityIndex] = NGramIndex
+    ) -> "ColumnMatcher":
+        """Return a matcher over ``values`` using their position as row."""
+        matcher = cls(engine=engine)
+        for row, value in enumerate(values):
+            matcher.add(value, row)
+        return matcher
+
+    def add(self, value: str, row: int) -> None:
+        """Record that ``row`` holds the normalized ``value``."""
+        rows = self.rows.get(value)
+        if rows is None:
+            rows = self.rows[value] = []
+            self.engine.add(value)
+            self._row_lists.append(rows)
+        rows.append(row)
+
+    def match(self, query: str, substring: bool = False) -> Set[int]:
+        """Return rows whose value matches ``query``."""
+        found: Set[int] = set(self.rows.get(query, ()))
+        for idx in self.engine.match(query, substring):
+            found.update(self._row_lists[idx])
+        return found
+
+
+__all__ = [
+    "FUZZY_THRESHOLD",
+    "SimilarityIndex",
+    "ScanIndex",
+    "NGramIndex",
+    "ColumnMatcher",
+]
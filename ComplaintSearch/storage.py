@@ -0,0 +1,271 @@
+"""Storage backends used by :class:`ComplaintSearch.ComplaintStore`."""
+
+from __future__ import annotations
+
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set, Tuple, Type
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from . import SEARCH_FIELDS, normalize_text
+from .similarity import ColumnMatcher, NGramIndex, SimilarityIndex
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of ids bound to a single ``IN`` clause
+_CHUNK_SIZE = 500
+# Complaints by id, for one chunk of ids formatted into the ``IN`` clause
+_SELECT_CHUNK = "SELECT data FROM complaints WHERE id IN ({}) ORDER BY id"
+# Ids of the complaints containing a phrase, through the trigram index
+_FTS_QUERY = "SELECT rowid FROM complaints_fts WHERE complaints_fts MATCH ?"
+
+# File stamp, records and matchers of the last JSON load
+Snapshot = Tuple[Tuple[int, int], List[Dict[str, str]], List[ColumnMatcher]]
+
+
+class JSONComplaintBackend:
+    """Keep complaints in a JSON array rewritten on every insert."""
+
+    def __init__(
+        self, path: str | Path, engine: Type[SimilarityIndex] = NGramIndex
+    ) -> None:
+        self.path = Path(path)
+        self.engine = engine
+        self._snapshot: Snapshot | None = None
+        if not self.path.exists():
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump([], f)
+
+    def add_complaint(self, info: Dict[str, str]) -> None:
+        """Append a complaint record to the file."""
+        if not self.path.exists():
+            data: List[Dict[str, str]] = []
+        else:
+            with open(self.path, "r", encoding="utf-8") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    data = []
+        data.append(info)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def _load(self) -> Tuple[List[Dict[str, str]], List[ColumnMatcher]] | None:
+        """Return stored items with per-field matchers, reusing the last load.
+
+        The file is parsed again only when its modification time or size
+        changed. ``None`` is returned when the file is missing or invalid.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if self._snapshot is not None and self._snapshot[0] == stamp:
+            return self._snapshot[1], self._snapshot[2]
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            try:
+                items: List[Dict[str, str]] = json.load(f)
+            except json.JSONDecodeError:
+                return None
+        matchers = [
+            ColumnMatcher.from_values(
+                (normalize_text(str(item.get(field, ""))) for item in items),
+                self.engine,
+            )
+            for field in SEARCH_FIELDS
+        ]
+        self._snapshot = (stamp, items, matchers)
+        return items, matchers
+
+    def search(self, keyword: str) -> List[Dict[str, str]]:
+        """Return complaint records fuzzy-matching ``keyword``."""
+        loaded = self._load()
+        if loaded is None:
+            return []
+        items, matchers = loaded
+
+        keyword_norm = normalize_text(keyword)
+        rows: Set[int] = set()
+        for matcher in matchers:
+            rows.update(matcher.match(keyword_norm, substring=True))
+        return [dict(items[row]) for row in sorted(rows)]
+
+
+class SQLiteComplaintBackend:
+    """Keep complaints in SQLite with append-only inserts.
+
+    The database runs in WAL mode so readers never block the single-row
+    inserts. Normalized copies of the searchable fields feed an FTS5 trigram
+    index answering substring queries; fuzzy matches come from in-memory
+    matchers that are topped up with rows inserted since the last search.
+    On first use, records from ``migrate_from`` (by default the ``.json``
+    file next to the database) are imported once.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        engine: Type[SimilarityIndex] = NGramIndex,
+        migrate_from: str | Path | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._ids: List[int] = []
+        self._matchers = [ColumnMatcher(engine=engine) for _ in SEARCH_FIELDS]
+        self._fts = True
+        self._init_db()
+        if migrate_from is None:
+            migrate_from = self.path.with_suffix(".json")
+        self._migrate(Path(migrate_from))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _init_db(self) -> None:
+        columns = ", ".join(f"{field} TEXT" for field in SEARCH_FIELDS)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS complaints ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                f"data TEXT NOT NULL, {columns})"
+            )
+            meta = "meta (key TEXT PRIMARY KEY, value TEXT)"
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {meta}")
+            fields = ", ".join(SEARCH_FIELDS)
+            new_fields = ", ".join(f"new.{field}" for field in SEARCH_FIELDS)
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS complaints_fts "
+                    f"USING fts5({fields}, content='complaints', "
+                    "content_rowid='id', tokenize='trigram')"
+                )
+            except sqlite3.OperationalError as exc:
+                logger.warning("FTS5 trigram index unavailable: %s", exc)
+                self._fts = False
+                return
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS complaints_ai AFTER INSERT ON "
+                "complaints BEGIN INSERT INTO complaints_fts"
+                f"(rowid, {fields}) VALUES (new.id, {new_fields}); END"
+            )
+
+    @staticmethod
+    def _row(info: Dict[str, Any]) -> Tuple[str, ...]:
+        values = (str(info.get(field, "")) for field in SEARCH_FIELDS)
+        normalized = (normalize_text(value) for value in values)
+        return (json.dumps(info, ensure_ascii=False), *normalized)
+
+    def _insert(
+        self, conn: sqlite3.Connection, items: Iterable[Dict[str, Any]]
+    ) -> None:
+        placeholders = ", ".join("?" for _ in range(len(SEARCH_FIELDS) + 1))
+        conn.executemany(
+            f"INSERT INTO complaints(data, {', '.join(SEARCH_FIELDS)}) "
+            f"VALUES ({placeholders})",
+            (self._row(info) for info in items),
+        )
+
+    def _migrate(self, source: Path) -> None:
+        """Import ``source`` once when it holds a JSON list of complaints."""
+        if not source.exists():
+            return
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                done = conn.execute(
+                    "SELECT 1 FROM meta WHERE key = 'json_migrated'"
+                ).fetchone()
+                if done is None:
+                    with open(source, "r", encoding="utf-8") as f:
+                        try:
+                            items = json.load(f)
+                        except json.JSONDecodeError:
+                            items = []
+                    self._insert(conn, items)
+                    conn.execute(
+                        "INSERT INTO meta(key, value) VALUES (?, ?)",
+                        ("json_migrated", str(source)),
+                    )
+                    logger.info(
+                        "Migrated %d complaints from %s to %s",
+                        len(items),
+                        source,
+                        self.path,
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def add_complaint(self, info: Dict[str, str]) -> None:
+        """Insert a complaint record."""
+        with closing(self._connect()) as conn:
+            self._insert(conn, [info])
+
+    def _refresh(self, conn: sqlite3.Connection) -> None:
+        """Feed rows inserted since the last call into the matchers."""
+        last = self._ids[-1] if self._ids else 0
+        rows = conn.execute(
+            f"SELECT id, {', '.join(SEARCH_FIELDS)} FROM complaints "
+            "WHERE id > ? ORDER BY id",
+            (last,),
+        )
+        for row_id, *values in rows:
+            position = len(self._ids)
+            self._ids.append(row_id)
+            for matcher, value in zip(self._matchers, values):
+                matcher.add(value or "", position)
+
+    def _substring_ids(
+        self,
+        conn: sqlite3.Connection,
+        keyword: str,
+    ) -> Set[int]:
+        if self._fts and len(keyword) >= 3:
+            phrase = '"' + keyword.replace('"', '""') + '"'
+            rows = conn.execute(_FTS_QUERY, (phrase,))
+        else:
+            escaped = keyword.replace("\\", "\\\\").replace("%", "\\%")
+            pattern = "%" + escaped.replace("_", "\\_") + "%"
+            where = " OR ".join(
+                f"{field} LIKE ? ESCAPE '\\'" for field in SEARCH_FIELDS
+            )
+            rows = conn.execute(
+                f"SELECT id FROM complaints WHERE {where}",
+                [pattern] * len(SEARCH_FIELDS),
+            )
+        return {row[0] for row in rows}
+
+    def search(self, keyword: str) -> List[Dict[str, str]]:
+        """Return complaint records fuzzy-matching ``keyword``."""
+        keyword_norm = normalize_text(keyword)
+        with closing(self._connect()) as conn:
+            with self._lock:
+                self._refresh(conn)
+                if not keyword_norm:
+                    ids = set(self._ids)
+                else:
+                    ids = self._substring_ids(conn, keyword_norm)
+                    for matcher in self._matchers:
+                        positions = matcher.match(keyword_norm)
+                        ids.update(self._ids[p] for p in positions)
+            ordered = sorted(ids)
+            results: List[Dict[str, str]] = []
+            for start in range(0, len(ordered), _CHUNK_SIZE):
+                stop = start + _CHUNK_SIZE
+                chunk = ordered[start:stop]
+                marks = ", ".join("?" for _ in chunk)
+                rows = conn.execute(_SELECT_CHUNK.format(marks), chunk)
+                results.extend(json.loads(row[0]) for row in rows)
+        return results
+
+
+__all__ = ["JSONComplaintBackend", "SQLiteComplaintBackend"]
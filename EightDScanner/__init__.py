@@ -2,24 +2,106 @@
 
 from __future__ import annotations
 
+import hashlib
+import logging
+import os
+import re
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, List, Tuple
 
 from openpyxl import load_workbook
 
+# Columns returned by :meth:`EightDScanner.search`
+REPORT_FIELDS = (
+    "id",
+    "material_code",
+    "description",
+    "customer",
+    "root_cause",
+    "permanent_action",
+)
+
+# ``PRAGMA user_version`` once all migrations ran: ``1`` indexed existing
+# rows for full-text search, ``2`` dropped rows stored before files were
+# tracked (done by the first scan, which imports them again)
+SCHEMA_VERSION = 2
+
+# Letters the FTS tokenizer does not fold to ASCII by itself
+_FOLD_TABLE = str.maketrans({"ı": "i", "İ": "i"})
+
+# Default database, next to the packages rather than in the working directory
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[1] / "eight_d.db"
+
+# Extracted report row and the ``(key, stamp, rows)`` result of a file
+Row = tuple[str, str, str, str, str]
+FileResult = Tuple[str, Tuple[int, int, str], List[Row] | None]
+
+
+logger = logging.getLogger(__name__)
+
+
+def _file_hash(path: Path) -> str:
+    """Return the SHA-256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fold(text: str | None) -> str:
+    """Return ``text`` prepared for the full-text index."""
+    return (text or "").translate(_FOLD_TABLE)
+
 
 class EightDScanner:
     """Scan Excel reports for key fields and persist them."""
 
-    def __init__(self, reports_dir: str | Path, db_path: str | Path = "eight_d.db") -> None:
+    def __init__(
+        self,
+        reports_dir: str | Path,
+        db_path: str | Path = DEFAULT_DB_PATH,
+        workers: int | None = None,
+        batch_size: int | None = None,
+    ) -> None:
+        """Initialize the scanner for ``reports_dir`` storing into ``db_path``.
+
+        ``workers`` is the number of processes parsing workbooks in parallel
+        and defaults to ``EIGHT_D_WORKERS`` or ``1`` (parse in the calling
+        thread). ``batch_size`` is the number of files written per database
+        transaction and defaults to ``EIGHT_D_BATCH_SIZE`` or ``50``.
+        """
         self.reports_dir = Path(reports_dir)
         self.reports_dir.mkdir(parents=True, exist_ok=True)
         self.db_path = Path(db_path)
+        if workers is None:
+            workers = int(os.getenv("EIGHT_D_WORKERS", "1"))
+        if batch_size is None:
+            batch_size = int(os.getenv("EIGHT_D_BATCH_SIZE", "50"))
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
         self._init_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.create_function("fold", 1, _fold, deterministic=True)
+        return conn
+
+    @staticmethod
+    def _index_rows(conn: sqlite3.Connection, after_id: int) -> None:
+        """Add rows with an id above ``after_id`` to the full-text index."""
+        conn.execute(
+            "INSERT INTO reports_fts"
+            "(rowid, description, root_cause, permanent_action) "
+            "SELECT id, fold(description), fold(root_cause), "
+            "fold(permanent_action) FROM reports WHERE id > ?",
+            (after_id,),
+        )
+
     def _init_db(self) -> None:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS reports (
@@ -28,10 +110,52 @@ class EightDScanner:
                     description TEXT,
                     customer TEXT,
                     root_cause TEXT,
-                    permanent_action TEXT
+                    permanent_action TEXT,
+                    source TEXT
                 )
                 """
             )
+            info = conn.execute("PRAGMA table_info(reports)")
+            columns = {row[1] for row in info}
+            if "source" not in columns:
+                conn.execute("ALTER TABLE reports ADD COLUMN source TEXT")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reports_source "
+                "ON reports(source)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reports_material_code "
+                "ON reports(material_code)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reports_customer "
+                "ON reports(customer COLLATE NOCASE)"
+            )
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            conn.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+                    description,
+                    root_cause,
+                    permanent_action,
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+                """
+            )
+            if version < 1:
+                # Index rows stored before the full-text table existed
+                self._index_rows(conn, 0)
+                conn.execute("PRAGMA user_version = 1")
 
     @staticmethod
     def _normalize(text: str) -> str:
@@ -69,17 +193,259 @@ class EightDScanner:
         wb.close()
         return results
 
-    def scan(self) -> int:
-        """Scan all Excel files and persist extracted rows."""
-        count = 0
-        for path in self.reports_dir.glob("*.xlsx"):
-            rows = self._extract_rows(path)
-            with sqlite3.connect(self.db_path) as conn:
-                conn.executemany(
-                    "INSERT INTO reports(material_code, description, customer, root_cause, permanent_action) VALUES (?, ?, ?, ?, ?)",
-                    rows,
+    @staticmethod
+    def _delete_rows(
+        conn: sqlite3.Connection, where: str, params: tuple
+    ) -> None:
+        """Delete report rows matching ``where`` from both tables."""
+        conn.execute(
+            "DELETE FROM reports_fts WHERE rowid IN "
+            f"(SELECT id FROM reports WHERE {where})",
+            params,
+        )
+        conn.execute(f"DELETE FROM reports WHERE {where}", params)
+
+    def _read_file(
+        self, path: Path, key: str, known_hash: str | None
+    ) -> FileResult:
+        """Return the manifest stamp of ``path`` and its rows.
+
+        Rows are ``None`` when the content hash equals ``known_hash``. Runs
+        in worker processes when parallel scanning is enabled.
+        """
+        stat = path.stat()
+        digest = _file_hash(path)
+        stamp = (stat.st_size, stat.st_mtime_ns, digest)
+        if digest == known_hash:
+            return key, stamp, None
+        return key, stamp, self._extract_rows(path)
+
+    def _store_batch(self, batch: List[FileResult]) -> None:
+        """Write extracted files in one transaction.
+
+        Rows of each file replace the rows previously stored for it; files
+        without rows only get their manifest stamp refreshed.
+        """
+        with self._connect() as conn:
+            for key, stamp, rows in batch:
+                if rows is not None:
+                    self._delete_rows(conn, "source = ?", (key,))
+                    last_id = conn.execute(
+                        "SELECT COALESCE(MAX(id), 0) FROM reports"
+                    ).fetchone()[0]
+                    conn.executemany(
+                        "INSERT INTO reports(material_code, description, "
+                        "customer, root_cause, permanent_action, source) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [(*row, key) for row in rows],
+                    )
+                    self._index_rows(conn, last_id)
+                conn.execute(
+                    "INSERT OR REPLACE INTO files"
+                    "(path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                    (key, *stamp),
+                )
+
+    def scan(
+        self, progress: Callable[[Dict[str, Any]], None] | None = None
+    ) -> Dict[str, Any]:
+        """Scan new or changed Excel files and persist extracted rows.
+
+        Files are tracked in the ``files`` manifest by size, modification
+        time and content hash. Unchanged files are skipped, rows of changed
+        files are replaced atomically and rows of files that no longer exist
+        are removed. With more than one worker, workbooks are parsed in a
+        process pool while the calling thread is the only database writer,
+        committing ``batch_size`` files per transaction. A workbook that
+        cannot be read is reported in ``errors`` and left out of the
+        manifest so the next scan tries it again.
+
+        Parameters
+        ----------
+        progress:
+            Optional callable receiving ``files_done``, ``files_total``,
+            ``rows_inserted`` and ``errors`` after each processed file.
+
+        Returns
+        -------
+        Dict[str, Any]
+            ``rows`` inserted, the number of files ``scanned`` (parsed),
+            ``skipped`` (unchanged), ``replaced`` (parsed again after a
+            change) and ``deleted`` (purged), and ``errors`` as a list of
+            ``{"file", "error"}`` entries.
+        """
+        result: Dict[str, Any] = {
+            "rows": 0,
+            "scanned": 0,
+            "skipped": 0,
+            "replaced": 0,
+            "deleted": 0,
+            "errors": [],
+        }
+        with self._connect() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                # Rows stored before files were tracked cannot be attributed;
+                # this scan imports their files again
+                self._delete_rows(conn, "source IS NULL", ())
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            manifest = {
+                path: (size, mtime_ns, sha256)
+                for path, size, mtime_ns, sha256 in conn.execute(
+                    "SELECT path, size, mtime_ns, sha256 FROM files"
+                )
+            }
+
+        seen = set()
+        pending: List[Tuple[Path, str, str | None]] = []
+        for path in sorted(self.reports_dir.glob("*.xlsx")):
+            key = path.relative_to(self.reports_dir).as_posix()
+            seen.add(key)
+            stat = path.stat()
+            known = manifest.get(key)
+            if known is None:
+                pending.append((path, key, None))
+            elif known[:2] == (stat.st_size, stat.st_mtime_ns):
+                result["skipped"] += 1
+            else:
+                pending.append((path, key, known[2]))
+
+        total = len(seen)
+        done = total - len(pending)
+        batch: List[Any] = []
+
+        def report() -> None:
+            if progress is not None:
+                progress(
+                    {
+                        "files_done": done,
+                        "files_total": total,
+                        "rows_inserted": result["rows"],
+                        "errors": list(result["errors"]),
+                    }
                 )
-                count += len(rows)
-        return count
 
-__all__ = ["EightDScanner"]
+        def fail(key: str, exc: Exception) -> None:
+            nonlocal done
+            logger.warning("Could not read 8D report %s: %s", key, exc)
+            result["errors"].append({"file": key, "error": str(exc)})
+            done += 1
+            report()
+
+        def collect(item: Any) -> None:
+            nonlocal done
+            key, _, rows = item
+            if rows is None:
+                result["skipped"] += 1
+            else:
+                result["rows"] += len(rows)
+                result["scanned"] += 1
+                if key in manifest:
+                    result["replaced"] += 1
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._store_batch(batch)
+                batch.clear()
+            done += 1
+            report()
+
+        report()
+        if self.workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    pool.submit(self._read_file, *job): job[1]
+                    for job in pending
+                }
+                for future in as_completed(futures):
+                    try:
+                        item = future.result()
+                    except Exception as exc:
+                        fail(futures[future], exc)
+                    else:
+                        collect(item)
+        else:
+            for job in pending:
+                try:
+                    item = self._read_file(*job)
+                except Exception as exc:
+                    fail(job[1], exc)
+                else:
+                    collect(item)
+        if batch:
+            self._store_batch(batch)
+
+        removed = [key for key in manifest if key not in seen]
+        if removed:
+            with self._connect() as conn:
+                for key in removed:
+                    self._delete_rows(conn, "source = ?", (key,))
+                    conn.execute("DELETE FROM files WHERE path = ?", (key,))
+            result["deleted"] = len(removed)
+        logger.info("8D scan finished: %s", result)
+        return result
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """Return an FTS5 query requiring every word of ``text`` as prefix."""
+        words = re.findall(r"\w+", _fold(text))
+        return " ".join(f'"{word}"*' for word in words)
+
+    def search(
+        self,
+        text: str = "",
+        material_code: str | None = None,
+        customer: str | None = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """Return stored 8D rows matching the given criteria.
+
+        Parameters
+        ----------
+        text:
+            Words looked up in description, root cause and permanent action.
+            Every word must appear, possibly as a prefix. Results are ranked
+            by relevance.
+        material_code:
+            Exact material code to restrict the results to.
+        customer:
+            Customer name, compared case-insensitively.
+        limit:
+            Maximum number of rows to return.
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            Rows keyed by :data:`REPORT_FIELDS`, newest first when no
+            ``text`` is given.
+        """
+        columns = ", ".join(f"r.{field}" for field in REPORT_FIELDS)
+        clauses: List[str] = []
+        params: List[Any] = []
+        query = self._fts_query(text)
+        if query:
+            sql = (
+                f"SELECT {columns} FROM reports_fts "
+                "JOIN reports AS r ON r.id = reports_fts.rowid"
+            )
+            clauses.append("reports_fts MATCH ?")
+            params.append(query)
+            order = "reports_fts.rank"
+        else:
+            sql = f"SELECT {columns} FROM reports AS r"
+            order = "r.id DESC"
+        if material_code:
+            clauses.append("r.material_code = ?")
+            params.append(material_code)
+        if customer:
+            clauses.append("r.customer = ? COLLATE NOCASE")
+            params.append(customer)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(zip(REPORT_FIELDS, row)) for row in rows]
+
+
+__all__ = ["EightDScanner", "REPORT_FIELDS"]
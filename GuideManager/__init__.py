@@ -3,12 +3,10 @@
 from __future__ import annotations
 
 import json
-from pathlib import Path
+import threading
 from typing import Any, Dict
 
-
-class GuideNotFoundError(FileNotFoundError):
-    """Raised when the requested guide file cannot be found."""
+from .registry import GuideEntry, GuideNotFoundError, GuideRegistry, GUIDE_DIR
 
 
 DEFAULT_8D_GUIDE: Dict[str, Any] = {
@@ -95,12 +93,33 @@ DEFAULT_8D_GUIDE: Dict[str, Any] = {
 }
 
 
+_default: GuideRegistry | None = None
+_default_lock = threading.Lock()
+
+
+def default_guide_registry() -> GuideRegistry:
+    """Return the process-wide registry of the bundled ``Guidelines/``."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            fallbacks = {"8D": DEFAULT_8D_GUIDE}
+            _default = GuideRegistry(GUIDE_DIR, fallbacks=fallbacks)
+        return _default
+
+
 class GuideManager:
-    """Manages guide steps and resources for quality-report methods."""
+    """Manages guide steps and resources for quality-report methods.
 
-    def __init__(self) -> None:
-        """Initialize the guide cache."""
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    Guides come from ``registry``, by default the process-wide
+    :func:`default_guide_registry` that loads all guides once. Returned
+    guides are read-only; :func:`copy.deepcopy` returns a mutable copy.
+    """
+
+    def __init__(self, registry: GuideRegistry | None = None) -> None:
+        """Use ``registry`` or the shared one for guide lookups."""
+        if registry is None:
+            registry = default_guide_registry()
+        self.registry = registry
 
     def load_guide(self, path: str) -> Dict[str, Any]:
         """Load guide information from the given path."""
@@ -112,17 +131,18 @@ class GuideManager:
 
     def get_format(self, method: str) -> Dict[str, Any]:
         """Return the guide dictionary for the given method."""
-        if method not in self._cache:
-            base_dir = Path(__file__).resolve().parents[1] / "Guidelines"
-            guide_path = base_dir / f"{method}_Guide.json"
-            try:
-                self._cache[method] = self.load_guide(str(guide_path))
-            except GuideNotFoundError:
-                if method == "8D":
-                    self._cache[method] = DEFAULT_8D_GUIDE
-                else:
-                    raise
-        return self._cache[method]
-
-
-__all__ = ["GuideManager", "GuideNotFoundError", "DEFAULT_8D_GUIDE"]
+        return self.registry.get(method)
+
+    def get_entry(self, method: str) -> GuideEntry:
+        """Return the guide of ``method`` with its JSON body and ETag."""
+        return self.registry.entry(method)
+
+
+__all__ = [
+    "DEFAULT_8D_GUIDE",
+    "GuideEntry",
+    "GuideManager",
+    "GuideNotFoundError",
+    "GuideRegistry",
+    "default_guide_registry",
+]
@@ -0,0 +1,211 @@
+"""Eagerly loaded, immutable guideline registry.
+
+:class:`GuideRegistry` parses every ``*_Guide.json`` of ``Guidelines/`` when
+it is created. Each guide is kept as a :class:`GuideEntry` holding the
+frozen data, the JSON body as sent by the API and an ETag derived from that
+body, so serving a guide neither re-reads nor re-serializes it. Lookups
+compare the file's modification time and size with the loaded version and
+reload it when it changed, like the prompt registry does.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, NoReturn, Tuple
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+GUIDE_DIR = Path(__file__).resolve().parents[1] / "Guidelines"
+
+Signature = Tuple[int, int]
+
+
+class GuideNotFoundError(FileNotFoundError):
+    """Raised when the requested guide file cannot be found."""
+
+
+def _readonly(self: Any, *args: Any, **kwargs: Any) -> NoReturn:
+    raise TypeError(f"{type(self).__name__} is read-only")
+
+
+class FrozenDict(dict):
+    """Read-only ``dict`` that still serializes and compares like a dict.
+
+    Copies made with :mod:`copy` are ordinary mutable containers.
+    """
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Dict[str, Any]:
+        return thaw(self)
+
+    def __reduce__(self) -> Any:
+        return (dict, (thaw(self),))
+
+
+class FrozenList(list):
+    """Read-only ``list`` counterpart of :class:`FrozenDict`."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = remove = pop = clear = _readonly
+    sort = reverse = _readonly
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> list:
+        return thaw(self)
+
+    def __reduce__(self) -> Any:
+        return (list, (thaw(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Return ``value`` with all nested dicts and lists made read-only."""
+    if isinstance(value, dict):
+        frozen = FrozenDict()
+        for key, item in value.items():
+            dict.__setitem__(frozen, key, freeze(item))
+        return frozen
+    if isinstance(value, list):
+        frozen_list = FrozenList()
+        list.extend(frozen_list, (freeze(item) for item in value))
+        return frozen_list
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Return a mutable deep copy of a structure built by :func:`freeze`."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+class GuideEntry:
+    """A loaded guide with its serialized JSON body and ETag."""
+
+    __slots__ = ("method", "data", "body", "etag", "signature")
+
+    def __init__(
+        self, method: str, data: Any, signature: Signature | None = None
+    ) -> None:
+        self.method = method
+        self.data = freeze(data)
+        # Same encoding as FastAPI's JSONResponse
+        self.body = json.dumps(
+            self.data,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.signature = signature
+
+
+class GuideRegistry:
+    """Process-wide cache of parsed guides keyed by method name.
+
+    Parameters
+    ----------
+    base_dir:
+        Directory holding the ``{method}_Guide.json`` files.
+    fallbacks:
+        Guides used when a method has no file, e.g. the built-in 8D guide.
+    """
+
+    def __init__(
+        self,
+        base_dir: str | Path = GUIDE_DIR,
+        fallbacks: Dict[str, Dict[str, Any]] | None = None,
+    ) -> None:
+        self.base_dir = Path(base_dir)
+        self.loads = 0
+        self._fallbacks = {
+            method: GuideEntry(method, data)
+            for method, data in (fallbacks or {}).items()
+        }
+        self._entries: Dict[str, GuideEntry] = {}
+        self._lock = threading.Lock()
+        if self.base_dir.is_dir():
+            for path in sorted(self.base_dir.glob("*_Guide.json")):
+                self.entry(path.name[: -len("_Guide.json")])
+
+    def _path(self, method: str) -> Path:
+        return self.base_dir / f"{method}_Guide.json"
+
+    @staticmethod
+    def _signature(path: Path) -> Signature | None:
+        try:
+            stat = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def entry(self, method: str) -> GuideEntry:
+        """Return the current :class:`GuideEntry` of ``method``.
+
+        Raises
+        ------
+        GuideNotFoundError
+            If there is neither a guide file nor a fallback for ``method``.
+        """
+        path = self._path(method)
+        signature = self._signature(path)
+        entry = self._entries.get(method)
+        if entry is not None and entry.signature == signature:
+            return entry
+        with self._lock:
+            entry = self._entries.get(method)
+            if entry is not None and entry.signature == signature:
+                return entry
+            if signature is None:
+                self._entries.pop(method, None)
+                if method in self._fallbacks:
+                    return self._fallbacks[method]
+                raise GuideNotFoundError(str(path))
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+            except FileNotFoundError as exc:
+                raise GuideNotFoundError(str(path)) from exc
+            except ValueError:
+                if entry is None:
+                    raise
+                logger.exception(
+                    "Could not reload guide %s; keeping old one",
+                    path,
+                )
+                return entry
+            if entry is not None:
+                logger.info("Guide %s reloaded", method)
+            entry = GuideEntry(method, data, signature)
+            self._entries[method] = entry
+            self.loads += 1
+            return entry
+
+    def get(self, method: str) -> Any:
+        """Return the frozen guide data of ``method``."""
+        return self.entry(method).data
+
+
+__all__ = [
+    "FrozenDict",
+    "FrozenList",
+    "GuideEntry",
+    "GuideNotFoundError",
+    "GuideRegistry",
+    "freeze",
+    "thaw",
+]
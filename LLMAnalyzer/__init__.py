@@ -6,12 +6,21 @@ produce structured reports from complaint data.
 
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import os
 import logging
-from pathlib import Path
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
-from PromptManager import PromptManager
+from PromptManager import PromptManager, compile_format
+
+from .budget import PromptBudget, default_budget
+from .cache import ResponseCache, default_cache
+from .client import get_async_client
+from .metrics import method_context, track_call
+from .query import LLMQuery, Messages
+from .resilience import Resilience, default_resilience
 
 # Default prompt used for 8D analyses when no template is loaded.
 DEFAULT_8D_PROMPT = """
@@ -54,106 +63,210 @@ ya da metodoloji açıklaması yapma. Her başlığı kendi içeriğiyle doldur,
 """
 
 
+# Token cap of the complaint subject, which is meant to be a short title
+SUBJECT_TOKENS = 200
+
+
 class OpenAIError(RuntimeError):
     """Raised when the OpenAI client cannot be used."""
 
 
-class LLMAnalyzer:
+class LLMAnalyzer(LLMQuery):
     """Analyzes text using a Large Language Model."""
 
-    def __init__(self, model: str | None = None) -> None:
+    label = "LLMAnalyzer"
+    component = "analyzer"
+    error = OpenAIError
+
+    def __init__(
+        self,
+        model: str | None = None,
+        concurrency: int | None = None,
+        cache: ResponseCache | None = None,
+        resilience: Resilience | None = None,
+        budget: PromptBudget | None = None,
+    ) -> None:
         """Initialize the analyzer with an optional LLM model name.
 
         If ``model`` is ``None``, ``OPENAI_MODEL`` environment variable is used.
         When the variable is not set, ``"gpt-3.5-turbo"`` becomes the default.
+        ``concurrency`` limits how many step prompts are sent at once; it
+        defaults to ``LLM_STEP_CONCURRENCY`` or ``4``. ``1`` queries the
+        steps one after another. Successful answers are stored in ``cache``,
+        by default the process-wide cache of
+        :func:`LLMAnalyzer.cache.default_cache` when it is enabled. Requests
+        go through ``resilience`` (retries, rate limiting and circuit
+        breaking), by default the process-wide
+        :func:`LLMAnalyzer.resilience.default_resilience`. Complaint text,
+        subject and directives are shortened to fit ``budget``, by default
+        :func:`LLMAnalyzer.budget.default_budget`.
         """
         if model is None:
             model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        if concurrency is None:
+            concurrency = int(os.getenv("LLM_STEP_CONCURRENCY", "4"))
         self.model = model
+        self.concurrency = max(1, concurrency)
+        self.cache = cache if cache is not None else default_cache()
+        self.resilience = (
+            resilience if resilience is not None else default_resilience()
+        )
+        self.budget = budget if budget is not None else default_budget()
         self.logger = logging.getLogger(__name__)
-        self._8d_prompt: str | None = None
+        self.prompt_manager = PromptManager()
 
-    def _query_llm(self, system_prompt: str, user_prompt: str) -> str:
-        """Return the LLM response for the given prompt pair."""
-        self.logger.debug("LLMAnalyzer._query_llm start")
+    def _messages(self, system_prompt: str, user_prompt: str) -> Messages:
+        """Log the prompt pair and return it as chat messages."""
         truncated_sys = system_prompt.replace("\n", " ")[:200]
         truncated_user = user_prompt.replace("\n", " ")[:200]
         self.logger.debug("system_prompt: %s", truncated_sys)
         self.logger.debug("user_prompt: %s", truncated_user)
-        try:
-            from openai import OpenAI  # type: ignore
-        except ImportError as exc:  # pragma: no cover - import errors not expected
-            raise OpenAIError("openai package is not installed") from exc
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
 
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise OpenAIError("OPENAI_API_KEY not set")
-        client = OpenAI(api_key=api_key)
+    def _cache_key(self, system_prompt: str, user_prompt: str) -> str | None:
+        if self.cache is None:
+            return None
+        return ResponseCache.key(self.model, system_prompt, user_prompt)
 
-        try:
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-            )
-            tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
-            if tokens is not None:
-                self.logger.info("LLMAnalyzer tokens used: %s", tokens)
-            result = response.choices[0].message.content.strip()
-            self.logger.debug("LLMAnalyzer returned: %s", result.replace("\n", " ")[:200])
-            self.logger.debug("LLMAnalyzer._query_llm end")
-            return result
-        except Exception as exc:  # pragma: no cover - network issues
-            if "invalid" in str(exc).lower() or "incorrect" in str(exc).lower():
-                raise OpenAIError("Invalid OpenAI API key") from exc
-            self.logger.error("LLMAnalyzer error: %s", exc)
-            self.logger.debug("LLMAnalyzer._query_llm end")
-            return f"LLM response placeholder for: {user_prompt[:50]}"
+    def _query_llm(self, system_prompt: str, user_prompt: str) -> str:
+        """Return the LLM response for the given prompt pair."""
+        return self._complete(
+            self.resilience.call,
+            self._messages(system_prompt, user_prompt),
+            self._cache_key(system_prompt, user_prompt),
+            user_prompt,
+        )
+
+    async def _aquery_llm(self, system_prompt: str, user_prompt: str) -> str:
+        """Asynchronous variant of :meth:`_query_llm`."""
+        return await self._acomplete(
+            self.resilience.acall,
+            self._messages(system_prompt, user_prompt),
+            self._cache_key(system_prompt, user_prompt),
+            user_prompt,
+        )
+
+    async def _aquery_llm_stream(
+        self, system_prompt: str, user_prompt: str, method: str = ""
+    ) -> AsyncIterator[str]:
+        """Yield the LLM response for the prompt pair as chunks arrive.
+
+        Cached answers and error placeholders are yielded as one chunk. A
+        failure after the first chunk raises :class:`OpenAIError` instead, so
+        a truncated answer is never mistaken for a complete one.
+        ``method`` labels the recorded metrics; a generator cannot rely on
+        :func:`method_context` because it runs in its consumer's context.
+        """
+        with track_call(self.component, self.model, method) as call:
+            key = self._cache_key(system_prompt, user_prompt)
+            if key is not None:
+                cached = await self.cache.aget(key)
+                if cached is not None:
+                    yield self._cache_hit(call, key, cached)
+                    return
+            messages = self._messages(system_prompt, user_prompt)
+            client = self._open_client(get_async_client)
+            parts: List[str] = []
+            try:
+                stream = await self.resilience.acall(
+                    client.chat.completions.create,
+                    model=self.model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None)
+                    tokens = getattr(usage, "total_tokens", None)
+                    if tokens is not None:
+                        self.logger.info("LLMAnalyzer tokens used: %s", tokens)
+                        call.usage(usage)
+                    if not chunk.choices:
+                        continue
+                    text = chunk.choices[0].delta.content
+                    if text:
+                        parts.append(text)
+                        yield text
+            except Exception as exc:  # pragma: no cover - network issues
+                if parts:
+                    # A placeholder cannot replace text the consumer already
+                    # has; a quiet return would pass the truncated answer off
+                    # as complete
+                    self.logger.error("LLMAnalyzer stream broke off: %s", exc)
+                    raise OpenAIError(f"LLM stream broke off: {exc}") from exc
+                call.outcome = "placeholder"
+                yield self._fallback(exc, user_prompt)
+                return
+            result = "".join(parts).strip()
+            self._log_result(result)
+            if key is not None:
+                await self.cache.aset(key, result)
 
     def _load_8d_prompt(self) -> str:
-        """Return the 8D system prompt, loading from file if available."""
-        if self._8d_prompt is None:
-            base = Path(__file__).resolve().parents[1] / "Prompts"
-            prompt_path = base / "8D_Prompt.txt"
-            if prompt_path.exists():
-                with open(prompt_path, "r", encoding="utf-8") as file:
-                    self._8d_prompt = file.read()
-            else:
-                self._8d_prompt = DEFAULT_8D_PROMPT
-        return self._8d_prompt
+        """Return the 8D system prompt from ``Prompts/`` or the default."""
+        return self.prompt_manager.get_text_prompt("8D") or DEFAULT_8D_PROMPT
 
-    def analyze(
+    @staticmethod
+    def _method_name(guideline: Dict[str, Any]) -> str:
+        """Return the method named by the guideline, e.g. ``8D``."""
+        method_field = guideline.get("method", "")
+        return method_field.split()[0] if method_field else ""
+
+    def _fit_inputs(
+        self,
+        overhead: str,
+        details: Dict[str, Any],
+        directives: str,
+        prompt: str,
+    ) -> Dict[str, str]:
+        """Return complaint fields and directives fitted to ``budget``.
+
+        When the prompt is too long the directives are shortened first, then
+        the description, the subject and finally the complaint text.
+        """
+        complaint_text = details.get("complaint", "")
+        description = details.get("description", complaint_text)
+        return self.budget.fit(
+            overhead,
+            [
+                ("complaint", complaint_text, None),
+                ("subject", details.get("subject", ""), SUBJECT_TOKENS),
+                ("description", description, None),
+                ("directives", directives, None),
+            ],
+            prompt=prompt,
+        )
+
+    def _build_prompts(
         self,
         details: Dict[str, Any],
         guideline: Dict[str, Any],
         directives: str = "",
         language: str = "Türkçe",
-    ) -> Dict[str, Any]:
-        """Return analysis using complaint details.
+    ) -> List[Tuple[str | None, str, str]]:
+        """Return ``(step_id, system_prompt, user_prompt)`` for each LLM call.
 
-        Parameters
-        ----------
-        details
-            Complaint information such as text and customer.
-        guideline
-            Guideline describing the report format.
-        directives
-            Optional user directives to customize the report.
-        language
-            Desired language for the response.
+        Methods answered by a single free-text call yield one entry whose
+        ``step_id`` is ``None``.
         """
-        complaint_text = details.get("complaint", "")
         customer = details.get("customer", "")
-        subject = details.get("subject", "")
         part_code = details.get("part_code", "")
 
-        method_field = guideline.get("method", "")
-        method = method_field.split()[0] if method_field else ""
+        method = self._method_name(guideline)
 
         # ``8D`` method now uses a single LLM call with a dedicated prompt.
         if method == "8D":
+            fitted = self._fit_inputs(
+                self._load_8d_prompt(),
+                details,
+                directives,
+                f"{method} analysis",
+            )
+            complaint_text, subject = fitted["complaint"], fitted["subject"]
+            directives = fitted["directives"]
             user_prompt = (
                 f"Müşteri Şikayeti: {complaint_text}\n"
                 f"Parça Kodu: {part_code}\n"
@@ -167,16 +280,20 @@ class LLMAnalyzer:
                 )
             if language:
                 user_prompt += f"\nRaporu {language} dilinde yaz."
-            answer = self._query_llm(self._load_8d_prompt(), user_prompt)
-            return {"full_text": answer}
+            return [(None, self._load_8d_prompt(), user_prompt)]
 
-        prompt_manager = PromptManager()
-        text_template = prompt_manager.get_text_prompt(method)
-        if text_template:
-            user_prompt = (
-                text_template.replace("{{musteri_sikayeti}}", complaint_text)
-                .replace("{{parca_kodu}}", part_code)
-                .replace("{{problem_aciklamasi}}", subject or complaint_text)
+        prompt_manager = self.prompt_manager
+        text_template = prompt_manager.get_text_template(method)
+        if text_template is not None and text_template.source:
+            fitted = self._fit_inputs(
+                text_template.source, details, directives, f"{method} analysis"
+            )
+            complaint_text, subject = fitted["complaint"], fitted["subject"]
+            directives = fitted["directives"]
+            user_prompt = text_template.render(
+                musteri_sikayeti=complaint_text,
+                parca_kodu=part_code,
+                problem_aciklamasi=subject or complaint_text,
             )
             if directives:
                 user_prompt += (
@@ -186,8 +303,7 @@ class LLMAnalyzer:
                 )
             if language:
                 user_prompt += f"\nRaporu {language} dilinde yaz."
-            answer = self._query_llm("", user_prompt)
-            return {"full_text": answer}
+            return [(None, "", user_prompt)]
 
         template = {"system": "", "steps": {}}
         if method:
@@ -196,8 +312,27 @@ class LLMAnalyzer:
         step_templates = template.get("steps", {})
         template_has_steps = bool(step_templates)
 
-        results: Dict[str, Any] = {}
         fields = guideline.get("fields") or guideline.get("steps", [])
+        # The longest step template and definition bound the fixed text
+        step_texts = [str(entry) for entry in step_templates.values()] or [
+            str(entry) for key, entry in template.items() if key != "system"
+        ]
+        definitions = [
+            str(step.get("definition") or step.get("detail", ""))
+            for step in fields
+        ]
+        overhead = (
+            system_tmpl
+            + max(step_texts, key=len, default="")
+            + max(definitions, key=len, default="")
+        )
+        fitted = self._fit_inputs(
+            overhead, details, directives, f"{method or 'step'} analysis"
+        )
+        complaint_text, subject = fitted["complaint"], fitted["subject"]
+        directives = fitted["directives"]
+
+        prompts: List[Tuple[str | None, str, str]] = []
         for step in fields:
             step_id = step.get("id") or step.get("step", "unknown")
             definition = step.get("definition") or step.get("detail", "")
@@ -210,19 +345,22 @@ class LLMAnalyzer:
                 "complaint_text": complaint_text,
                 "definition": definition,
                 "complaint": complaint_text,
-                "description": details.get("description", complaint_text),
+                "description": fitted["description"],
             }
 
             if template_has_steps:
-                system_prompt = system_tmpl.format(**values)
+                system_prompt = compile_format(system_tmpl).render(**values)
                 step_tmpl = step_templates.get(step_id, {}).get("prompt", "")
                 user_prompt = f"Step definition: {definition}"
                 if step_tmpl:
-                    user_prompt += f"\n{step_tmpl.format(**values)}"
+                    step_prompt = compile_format(step_tmpl).render(**values)
+                    user_prompt += f"\n{step_prompt}"
             else:
                 step_entry = template.get(step_id, {})
-                system_prompt = step_entry.get("system", "").format(**values)
-                user_prompt = step_entry.get("user_template", "").format(**values)
+                entry_system = step_entry.get("system", "")
+                entry_user = step_entry.get("user_template", "")
+                system_prompt = compile_format(entry_system).render(**values)
+                user_prompt = compile_format(entry_user).render(**values)
             if directives:
                 user_prompt += (
                     "\n---\nKullanıcıdan gelen özel talimatlar:\n"
@@ -231,10 +369,162 @@ class LLMAnalyzer:
                 )
             if language:
                 user_prompt += f"\nRaporu {language} dilinde yaz."
+            prompts.append((step_id, system_prompt, user_prompt))
+        return prompts
 
-            answer = self._query_llm(system_prompt, user_prompt)
-            results[step_id] = {"response": answer}
+    def _query_steps(self, prompts: List[Tuple[str, str]]) -> List[str]:
+        """Return answers for ``(system, user)`` prompt pairs in input order.
 
+        Up to ``concurrency`` requests are in flight at the same time.
+        """
+        workers = min(self.concurrency, len(prompts))
+        if workers <= 1:
+            return [self._query_llm(system, user) for system, user in prompts]
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="llm-step"
+        ) as pool:
+            # Each worker call runs in a copy of the caller's context so the
+            # metrics keep the method set by ``analyze``
+            futures = [
+                pool.submit(
+                    contextvars.copy_context().run, self._query_llm, *pair
+                )
+                for pair in prompts
+            ]
+            return [future.result() for future in futures]
+
+    def analyze(
+        self,
+        details: Dict[str, Any],
+        guideline: Dict[str, Any],
+        directives: str = "",
+        language: str = "Türkçe",
+    ) -> Dict[str, Any]:
+        """Return analysis using complaint details.
+
+        Step prompts of multi-step methods are independent, so they are sent
+        concurrently (see ``concurrency``); the result keeps guideline order.
+
+        Parameters
+        ----------
+        details
+            Complaint information such as text and customer.
+        guideline
+            Guideline describing the report format.
+        directives
+            Optional user directives to customize the report.
+        language
+            Desired language for the response.
+        """
+        prompts = self._build_prompts(details, guideline, directives, language)
+        with method_context(self._method_name(guideline)):
+            if len(prompts) == 1 and prompts[0][0] is None:
+                _, system_prompt, user_prompt = prompts[0]
+                full_text = self._query_llm(system_prompt, user_prompt)
+                return {"full_text": full_text}
+
+            answers = self._query_steps(
+                [(system, user) for _, system, user in prompts]
+            )
+        return self._collect(prompts, answers)
+
+    async def analyze_async(
+        self,
+        details: Dict[str, Any],
+        guideline: Dict[str, Any],
+        directives: str = "",
+        language: str = "Türkçe",
+    ) -> Dict[str, Any]:
+        """Asynchronous variant of :meth:`analyze`.
+
+        Uses the shared ``AsyncOpenAI`` client so no thread is blocked while
+        waiting for the LLM. At most ``concurrency`` step prompts of one
+        analysis are in flight at the same time.
+        """
+        prompts = self._build_prompts(details, guideline, directives, language)
+        with method_context(self._method_name(guideline)):
+            if len(prompts) == 1 and prompts[0][0] is None:
+                _, system_prompt, user_prompt = prompts[0]
+                answer = await self._aquery_llm(system_prompt, user_prompt)
+                return {"full_text": answer}
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def query(system_prompt: str, user_prompt: str) -> str:
+                async with semaphore:
+                    return await self._aquery_llm(system_prompt, user_prompt)
+
+            answers = await asyncio.gather(
+                *(query(system, user) for _, system, user in prompts)
+            )
+        return self._collect(prompts, answers)
+
+    async def analyze_stream(
+        self,
+        details: Dict[str, Any],
+        guideline: Dict[str, Any],
+        directives: str = "",
+        language: str = "Türkçe",
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield ``(event, data)`` pairs while the analysis is produced.
+
+        Single-prompt methods such as ``8D`` stream the answer as
+        ``("token", {"text": ...})`` events. Multi-step methods yield
+        ``("step", {"step_id": ..., "response": ...})`` whenever a step
+        completes, in completion order. The last event is ``("done", result)``
+        where ``result`` equals the return value of :meth:`analyze`. If the
+        answer stream breaks off after the first token, :class:`OpenAIError`
+        is raised and no ``done`` event follows.
+        """
+        prompts = self._build_prompts(details, guideline, directives, language)
+        method = self._method_name(guideline)
+        if len(prompts) == 1 and prompts[0][0] is None:
+            _, system_prompt, user_prompt = prompts[0]
+            parts: List[str] = []
+            async for text in self._aquery_llm_stream(
+                system_prompt, user_prompt, method
+            ):
+                parts.append(text)
+                yield "token", {"text": text}
+            yield "done", {"full_text": "".join(parts).strip()}
+            return
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def query(
+            index: int, system_prompt: str, user_prompt: str
+        ) -> Tuple[int, str]:
+            async with semaphore:
+                answer = await self._aquery_llm(system_prompt, user_prompt)
+            return index, answer
+
+        # Tasks copy the current context when created, method included
+        with method_context(method):
+            tasks = [
+                asyncio.ensure_future(query(index, system, user))
+                for index, (_, system, user) in enumerate(prompts)
+            ]
+        answers = [""] * len(prompts)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, answer = await next_done
+                answers[index] = answer
+                step_id = prompts[index][0]
+                yield "step", {"step_id": step_id, "response": answer}
+        finally:
+            # Stop outstanding steps when the consumer goes away
+            for task in tasks:
+                task.cancel()
+        yield "done", self._collect(prompts, answers)
+
+    @staticmethod
+    def _collect(
+        prompts: List[Tuple[str | None, str, str]], answers: List[str]
+    ) -> Dict[str, Any]:
+        """Return step results keyed by step id in guideline order."""
+        results: Dict[str, Any] = {}
+        for (step_id, _, _), answer in zip(prompts, answers):
+            results[step_id] = {"response": answer}
         return results
 
 
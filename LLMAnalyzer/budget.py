@@ -0,0 +1,289 @@
+"""Token budgets for LLM prompts.
+
+Complaint text, user directives, the report under review and the guideline
+JSON are inserted into prompts verbatim. :class:`PromptBudget` keeps the
+result within a token limit: every field is first capped on its own, then
+fields are shortened in reverse priority order until the whole prompt fits.
+Guideline JSON is compacted step by step (see :func:`compact_guideline`) so
+it stays valid JSON. Every truncation is logged and counted in the
+``llm_prompt_truncations_total`` metric.
+
+Tokens are counted with ``tiktoken`` when it is installed and estimated as
+one token per three characters otherwise, which over-counts Turkish and
+English text slightly and thus errs on the safe side.
+
+The process-wide budget returned by :func:`default_budget` reads:
+
+``LLM_PROMPT_TOKEN_BUDGET``
+    Maximum prompt tokens (default ``8000``, ``0`` disables the budget).
+``LLM_FIELD_TOKEN_LIMIT``
+    Cap for a single free-text field such as the complaint (default
+    ``2000``).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import json
+import logging
+import math
+import os
+import threading
+
+from .metrics import default_registry
+
+logger = logging.getLogger(__name__)
+
+# Characters per token assumed when ``tiktoken`` is not available
+CHARS_PER_TOKEN = 3
+TRUNCATION_MARK = " […]"
+
+_encoding: Any = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding() -> Any:
+    """Return the ``tiktoken`` encoding or ``None`` when unavailable."""
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:  # pragma: no cover - optional dependency
+                _encoding = None
+            _encoding_loaded = True
+        return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """Return the number of tokens ``text`` is expected to use."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Return ``text`` cut to at most ``max_tokens`` tokens.
+
+    Truncated text ends with :data:`TRUNCATION_MARK`; a cut inside a word
+    moves back to the preceding whitespace when one is close.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(TRUNCATION_MARK)
+    if budget <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        head = encoding.decode(encoding.encode(text)[:budget])
+    else:
+        head = text[: budget * CHARS_PER_TOKEN]
+    space = head.rfind(" ")
+    if space > len(head) * 0.8:
+        head = head[:space]
+    return head.rstrip() + TRUNCATION_MARK
+
+
+def _dump(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _guideline_levels(
+    guideline: Dict[str, Any],
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Return ever smaller variants of ``guideline`` with their names."""
+    steps_key = "fields" if "fields" in guideline else "steps"
+    steps = guideline.get(steps_key) or []
+
+    def with_steps(
+        keep: Callable[[str], bool], drop_description: bool
+    ) -> Dict[str, Any]:
+        def trim(step: Any) -> Any:
+            if not isinstance(step, dict):
+                return step
+            return {k: v for k, v in step.items() if keep(k)}
+
+        data = {
+            k: v
+            for k, v in guideline.items()
+            if k != steps_key and not (drop_description and k == "description")
+        }
+        data[steps_key] = [trim(step) for step in steps]
+        return data
+
+    def no_examples(key: str) -> bool:
+        return not key.startswith("example")
+
+    def title(key: str) -> bool:
+        return key in {"id", "step", "title"}
+
+    return [
+        ("compact", guideline),
+        ("no_examples", with_steps(no_examples, False)),
+        ("no_description", with_steps(no_examples, True)),
+        ("titles_only", with_steps(title, True)),
+    ]
+
+
+def compact_guideline(
+    guideline_json: str, max_tokens: int | None = None
+) -> Tuple[str, str]:
+    """Return the smallest needed form of ``guideline_json`` and its level.
+
+    The levels are tried in order until one fits ``max_tokens``:
+    ``compact`` (no whitespace), ``no_examples`` (example questions
+    removed), ``no_description`` (method description removed too) and
+    ``titles_only`` (step ids and titles). Text that is not a JSON object is
+    truncated instead (level ``truncated``); ``original`` means it was left
+    as it is.
+    """
+    try:
+        guideline = json.loads(guideline_json)
+    except (TypeError, ValueError):
+        guideline = None
+    if not isinstance(guideline, dict):
+        if max_tokens is None or estimate_tokens(guideline_json) <= max_tokens:
+            return guideline_json, "original"
+        return truncate_text(guideline_json, max_tokens), "truncated"
+    text = ""
+    for level, data in _guideline_levels(guideline):
+        text = _dump(data)
+        if max_tokens is None or estimate_tokens(text) <= max_tokens:
+            return text, level
+    return truncate_text(text, max_tokens), "truncated"
+
+
+class PromptBudget:
+    """Fit prompt fields into a token budget.
+
+    Parameters
+    ----------
+    max_tokens:
+        Limit for the whole prompt; ``None`` only applies the field caps.
+    field_tokens:
+        Default cap for a single field; individual fields may override it.
+    """
+
+    def __init__(
+        self, max_tokens: int | None = 8000, field_tokens: int | None = 2000
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.field_tokens = field_tokens
+
+    def _record(
+        self, prompt: str, name: str, before: int, after: int, how: str
+    ) -> None:
+        logger.info(
+            "Prompt %s: %s truncated from %d to %d tokens (%s)",
+            prompt,
+            name,
+            before,
+            after,
+            how,
+        )
+        default_registry().counter(
+            "llm_prompt_truncations_total",
+            "Prompt fields shortened to fit the token budget.",
+            ("prompt", "field"),
+        ).inc(prompt=prompt, field=name)
+
+    def _shrink(
+        self, name: str, text: str, max_tokens: int, guideline: bool
+    ) -> Tuple[str, str]:
+        if guideline:
+            return compact_guideline(text, max_tokens)
+        return truncate_text(text, max_tokens), "truncated"
+
+    def fit(
+        self,
+        overhead: str,
+        fields: Sequence[Tuple[str, str, int | None]],
+        prompt: str = "prompt",
+        guideline_fields: Sequence[str] = ("guideline_json",),
+    ) -> Dict[str, str]:
+        """Return ``fields`` shortened so that the prompt fits the budget.
+
+        Parameters
+        ----------
+        overhead:
+            Fixed prompt text surrounding the fields (templates, labels).
+        fields:
+            ``(name, text, cap)`` in priority order, most important first;
+            ``cap`` overrides ``field_tokens`` for that field and ``0``
+            leaves it uncapped.
+        prompt:
+            Name of the prompt used in log messages and metrics.
+        guideline_fields:
+            Fields holding guideline JSON; they are always compacted and
+            shortened with :func:`compact_guideline`.
+        """
+        result: Dict[str, str] = {}
+        sizes: Dict[str, int] = {}
+        for name, text, cap in fields:
+            text = text or ""
+            guideline = name in guideline_fields
+            limit = self.field_tokens if cap is None else (cap or None)
+            before = estimate_tokens(text)
+            if guideline:
+                text, _ = compact_guideline(text)
+            if limit is not None and estimate_tokens(text) > limit:
+                text, how = self._shrink(name, text, limit, guideline)
+                self._record(prompt, name, before, estimate_tokens(text), how)
+            result[name] = text
+            sizes[name] = estimate_tokens(text)
+
+        if self.max_tokens is None:
+            return result
+        total = estimate_tokens(overhead) + sum(sizes.values())
+        excess = total - self.max_tokens
+        for name, _, _ in reversed(fields):
+            if excess <= 0:
+                break
+            if not sizes[name]:
+                continue
+            target = max(0, sizes[name] - excess)
+            text, how = self._shrink(
+                name, result[name], target, name in guideline_fields
+            )
+            after = estimate_tokens(text)
+            self._record(prompt, name, sizes[name], after, how)
+            excess -= sizes[name] - after
+            result[name] = text
+            sizes[name] = after
+        if excess > 0:
+            logger.warning(
+                "Prompt %s exceeds the token budget by %d tokens",
+                prompt,
+                excess,
+            )
+        return result
+
+
+_default: PromptBudget | None = None
+_default_lock = threading.Lock()
+
+
+def default_budget() -> PromptBudget:
+    """Return the process-wide budget configured by environment variables."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            max_tokens = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "8000"))
+            field_tokens = int(os.getenv("LLM_FIELD_TOKEN_LIMIT", "2000"))
+            _default = PromptBudget(max_tokens or None, field_tokens or None)
+        return _default
+
+
+__all__ = [
+    "PromptBudget",
+    "compact_guideline",
+    "default_budget",
+    "estimate_tokens",
+    "truncate_text",
+]
@@ -0,0 +1,261 @@
+"""Content-addressed cache for LLM responses.
+
+Answers are stored under the SHA-256 of model, system prompt and user prompt
+so repeated analyses of the same complaint skip the round-trip. A bounded
+in-memory LRU tier answers hot keys; an optional SQLite tier keeps answers
+across restarts. Both tiers drop entries older than ``ttl`` seconds.
+
+The process-wide cache returned by :func:`default_cache` is configured with
+environment variables and disabled unless one of them is set:
+
+``LLM_CACHE``
+    ``1`` enables the in-memory tier only.
+``LLM_CACHE_PATH``
+    SQLite file of the persistent tier; enables the cache.
+``LLM_CACHE_TTL``
+    Lifetime of an entry in seconds (default ``86400``, ``0`` disables it).
+``LLM_CACHE_MEMORY_ENTRIES``
+    Size of the in-memory tier (default ``256``).
+``LLM_CACHE_MAX_ENTRIES``
+    Size of the SQLite tier (default ``10000``).
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Two-tier LRU cache mapping prompt hashes to LLM answers.
+
+    Parameters
+    ----------
+    path:
+        SQLite database for the persistent tier. ``None`` keeps the cache
+        in memory only.
+    ttl:
+        Seconds an entry stays valid; ``None`` keeps entries until evicted.
+    memory_entries:
+        Maximum number of answers held in memory.
+    max_entries:
+        Maximum number of answers kept in the SQLite tier; the least
+        recently used ones are evicted first.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        ttl: float | None = 86400,
+        memory_entries: int = 256,
+        max_entries: int = 10000,
+    ) -> None:
+        self.path = Path(path) if path is not None else None
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+        if self.path is not None:
+            self._init_db()
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_prompt: str) -> str:
+        """Return the cache key of a prompt pair sent to ``model``."""
+        digest = hashlib.sha256()
+        for part in (model, system_prompt, user_prompt):
+            data = part.encode("utf-8")
+            # Length prefixes keep ("ab", "c") and ("a", "bc") apart
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _init_db(self) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_accessed "
+                "ON responses(accessed)"
+            )
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def _remember(self, key: str, created: float, value: str) -> None:
+        """Put ``value`` into the memory tier; caller holds the lock."""
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def get(self, key: str) -> str | None:
+        """Return the cached answer for ``key`` or ``None``."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+        if self.path is not None:
+            value = self._disk_get(key, now)
+            if value is not None:
+                return value
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def _disk_get(self, key: str, now: float) -> str | None:
+        """Return ``key`` from the disk tier and keep it in memory."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self._expired(created, now):
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                with self._lock:
+                    self._counters["expired"] += 1
+                return None
+            conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                (now, key),
+            )
+        with self._lock:
+            self._remember(key, created, value)
+            self._counters["hits"] += 1
+            self._counters["disk_hits"] += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store ``value`` under ``key`` in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._counters["stores"] += 1
+        if self.path is None:
+            return
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.ttl is not None:
+                expiry = now - self.ttl
+                conn.execute(
+                    "DELETE FROM responses WHERE created < ?",
+                    (expiry,),
+                )
+            row = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            excess = row[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM "
+                    "responses ORDER BY accessed LIMIT ?)",
+                    (excess,),
+                )
+                with self._lock:
+                    self._counters["evictions"] += excess
+
+    async def aget(self, key: str) -> str | None:
+        """Asynchronous variant of :meth:`get`.
+
+        The SQLite tier is read in a worker thread so the event loop is not
+        blocked; a memory-only cache answers inline.
+        """
+        if self.path is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """Asynchronous variant of :meth:`set`."""
+        if self.path is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def clear(self) -> None:
+        """Remove every cached answer."""
+        with self._lock:
+            self._memory.clear()
+        if self.path is not None:
+            with closing(self._connect()) as conn:
+                conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit, miss, store and eviction counters."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        return stats
+
+
+_default: ResponseCache | None = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def default_cache() -> ResponseCache | None:
+    """Return the process-wide cache configured by ``LLM_CACHE*`` variables.
+
+    ``None`` is returned when caching is not enabled.
+    """
+    global _default, _default_loaded
+    with _default_lock:
+        if not _default_loaded:
+            path = os.getenv("LLM_CACHE_PATH")
+            flag = os.getenv("LLM_CACHE", "").lower()
+            if path or flag in {"1", "true", "yes"}:
+                ttl = float(os.getenv("LLM_CACHE_TTL", "86400"))
+                memory = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+                disk = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+                _default = ResponseCache(
+                    path or None,
+                    ttl=ttl or None,
+                    memory_entries=memory,
+                    max_entries=disk,
+                )
+                logger.info("LLM response cache enabled (path=%s)", path)
+            _default_loaded = True
+        return _default
+
+
+__all__ = ["ResponseCache", "default_cache"]
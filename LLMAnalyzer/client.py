@@ -0,0 +1,195 @@
+"""Process-wide OpenAI client shared by the LLM based components.
+
+Creating an ``OpenAI`` client per request discards its HTTP connection pool
+and TLS sessions. :func:`get_client` builds one client lazily and hands the
+same instance to every caller in the process. Timeouts and pool sizes are
+read from the environment:
+
+``OPENAI_TIMEOUT``
+    Read/write timeout in seconds (default ``60``).
+``OPENAI_CONNECT_TIMEOUT``
+    Connect timeout in seconds (default ``10``).
+``OPENAI_MAX_CONNECTIONS``
+    Maximum number of open connections (default ``20``).
+``OPENAI_MAX_KEEPALIVE``
+    Idle connections kept in the pool (default ``10``).
+``OPENAI_KEEPALIVE_EXPIRY``
+    Seconds an idle connection stays in the pool (default ``30``).
+``OPENAI_MAX_RETRIES``
+    Retries performed by the SDK itself (default ``0``; retries are handled
+    by :mod:`LLMAnalyzer.resilience`).
+
+:func:`get_async_client` does the same for ``AsyncOpenAI``, keeping one
+client per event loop since its connections cannot move between loops.
+Tests can bypass the real clients with :func:`set_client` and
+:func:`set_async_client`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_client: Any = None
+_client_key: Tuple[Any, ...] | None = None
+_override: Any = None
+# Settings key and client of each event loop
+_async_clients: "weakref.WeakKeyDictionary[Any, Tuple[Tuple[Any, ...], Any]]"
+_async_clients = weakref.WeakKeyDictionary()
+_async_override: Any = None
+
+
+def client_settings() -> Dict[str, float]:
+    """Return timeout and pool settings taken from the environment."""
+    return {
+        "timeout": float(os.getenv("OPENAI_TIMEOUT", "60")),
+        "connect_timeout": float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10")),
+        "max_connections": int(os.getenv("OPENAI_MAX_CONNECTIONS", "20")),
+        "max_keepalive": int(os.getenv("OPENAI_MAX_KEEPALIVE", "10")),
+        "keepalive_expiry": float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")),
+        "max_retries": int(os.getenv("OPENAI_MAX_RETRIES", "0")),
+    }
+
+
+def _build(
+    openai: Any,
+    api_key: str,
+    settings: Dict[str, float],
+    asynchronous: bool = False,
+) -> Any:
+    """Return a new ``OpenAI`` or ``AsyncOpenAI`` client using ``settings``."""
+    client_cls = openai.AsyncOpenAI if asynchronous else openai.OpenAI
+    http_client_cls = getattr(
+        openai,
+        "DefaultAsyncHttpxClient" if asynchronous else "DefaultHttpxClient",
+        None,
+    )
+    if http_client_cls is None:
+        # SDK without a configurable transport
+        return client_cls(api_key=api_key)
+
+    import httpx
+
+    connect = settings["connect_timeout"]
+    timeout = openai.Timeout(settings["timeout"], connect=connect)
+    http_client = http_client_cls(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_keepalive"],
+            keepalive_expiry=settings["keepalive_expiry"],
+        ),
+    )
+    return client_cls(
+        api_key=api_key,
+        timeout=timeout,
+        max_retries=settings["max_retries"],
+        http_client=http_client,
+    )
+
+
+def get_client(api_key: str) -> Any:
+    """Return the shared client for ``api_key``, creating it on first use.
+
+    A new client replaces the cached one only when the key, the settings or
+    the ``openai`` module itself changed.
+
+    Raises
+    ------
+    ImportError
+        If the ``openai`` package is not installed.
+    """
+    if _override is not None:
+        return _override
+    import openai  # type: ignore
+
+    global _client, _client_key
+    settings = client_settings()
+    key = (openai.OpenAI, api_key, tuple(sorted(settings.items())))
+    with _lock:
+        if _client is None or _client_key != key:
+            # The previous client may still serve requests in other threads
+            _client = _build(openai, api_key, settings)
+            _client_key = key
+            logger.debug("Created shared OpenAI client with %s", settings)
+        return _client
+
+
+def get_async_client(api_key: str) -> Any:
+    """Return the shared ``AsyncOpenAI`` client of the running event loop.
+
+    Must be called from a coroutine. The cached client is replaced under the
+    same conditions as in :func:`get_client`.
+
+    Raises
+    ------
+    ImportError
+        If the ``openai`` package is not installed.
+    """
+    if _async_override is not None:
+        return _async_override
+    import openai  # type: ignore
+
+    loop = asyncio.get_running_loop()
+    settings = client_settings()
+    key = (openai.AsyncOpenAI, api_key, tuple(sorted(settings.items())))
+    with _lock:
+        cached = _async_clients.get(loop)
+        if cached is None or cached[0] != key:
+            client = _build(openai, api_key, settings, asynchronous=True)
+            cached = (key, client)
+            _async_clients[loop] = cached
+            logger.debug("Created shared AsyncOpenAI client with %s", settings)
+        return cached[1]
+
+
+def set_client(client: Any) -> None:
+    """Make :func:`get_client` return ``client``; ``None`` restores it."""
+    global _override
+    _override = client
+
+
+def set_async_client(client: Any) -> None:
+    """Make :func:`get_async_client` return ``client``; ``None`` resets."""
+    global _async_override
+    _async_override = client
+
+
+def reset_client() -> None:
+    """Forget the cached clients so the next calls build new ones.
+
+    The synchronous client is closed; async clients are only dropped since
+    closing them requires their event loop.
+    """
+    global _client, _client_key
+    with _lock:
+        previous, _client, _client_key = _client, None, None
+        _async_clients.clear()
+    if previous is not None:
+        _close(previous)
+
+
+def _close(client: Any) -> None:
+    close = getattr(client, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception as exc:  # pragma: no cover - best effort cleanup
+            logger.debug("Closing OpenAI client failed: %s", exc)
+
+
+__all__ = [
+    "client_settings",
+    "get_async_client",
+    "get_client",
+    "reset_client",
+    "set_async_client",
+    "set_client",
+]
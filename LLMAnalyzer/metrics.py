@@ -0,0 +1,332 @@
+"""In-process metrics for LLM calls rendered in Prometheus text format.
+
+:class:`MetricsRegistry` holds labelled counters and histograms and renders
+them in the Prometheus exposition format (version 0.0.4) without an extra
+dependency. Further values, such as the counters of
+:meth:`Resilience.stats` or :meth:`ResponseCache.stats`, are exported by
+registering a collector with :meth:`MetricsRegistry.register_stats`.
+
+LLM requests are recorded with :func:`track_call`:
+
+``llm_request_duration_seconds``
+    Histogram of request latency labelled with ``component`` (``analyzer``
+    or ``review``), ``model``, ``method`` and ``outcome`` (``ok``,
+    ``cached``, ``placeholder``, ``error`` or ``cancelled``).
+``llm_prompt_tokens_total`` / ``llm_completion_tokens_total``
+    Tokens reported by the API, labelled with ``component``, ``model`` and
+    ``method``.
+
+The reporting method is taken from :func:`method_context`, which the
+analyzer and reviewer enter for the duration of an analysis.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+import asyncio
+import math
+import threading
+import time
+
+# Upper bounds in seconds; LLM calls range from cache hits to minutes
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+_method: ContextVar[str] = ContextVar("llm_method", default="")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(
+    names: Sequence[str],
+    values: Sequence[str],
+    extra: str = "",
+) -> str:
+    pairs = zip(names, values)
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in pairs]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with one value per label combination."""
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str]
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Add ``amount`` to the value of ``labels``."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current value of ``labels``."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram:
+    """Cumulative histogram with one series per label combination."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (bucket counts, sum, count)
+        self._series: Dict[LabelValues, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record ``value`` for ``labels``."""
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations for ``labels``."""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = self._series.items()
+            series = sorted((key, (list(s[0]), *s[1:])) for key, s in items)
+        lines: List[str] = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                labels = _labels(self.labelnames, key, le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Counter | Histogram] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls: type, name: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already a {metric.kind}")
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Return the counter ``name``, creating it on first use."""
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Return the histogram ``name``, creating it on first use."""
+        return self._get(Histogram, name, documentation, labelnames, buckets)
+
+    def register_stats(
+        self,
+        prefix: str,
+        stats: Callable[[], Dict[str, Any]],
+    ) -> None:
+        """Export the values of ``stats`` as gauges named ``prefix_key``.
+
+        Numeric values become one gauge each; string values become a gauge
+        of ``1`` labelled with the value, e.g. ``prefix_state{state="open"}``.
+        Registering the same ``prefix`` again replaces the collector.
+        """
+        with self._lock:
+            self._collectors[prefix] = stats
+
+    def _render_stats(self, prefix: str, stats: Dict[str, Any]) -> List[str]:
+        lines: List[str] = []
+        for key, value in sorted(stats.items()):
+            name = f"{prefix}_{key}"
+            if isinstance(value, bool):
+                continue
+            if not isinstance(value, (int, float, str)):
+                continue
+            lines.append(f"# TYPE {name} gauge")
+            if isinstance(value, str):
+                lines.append(f'{name}{{{key}="{_escape(value)}"}} 1')
+            else:
+                lines.append(f"{name} {_number(value)}")
+        return lines
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+            collectors = sorted(self._collectors.items())
+        lines: List[str] = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        for prefix, stats in collectors:
+            lines.extend(self._render_stats(prefix, stats()))
+        return "\n".join(lines) + "\n"
+
+
+_default = MetricsRegistry()
+
+
+def default_registry() -> MetricsRegistry:
+    """Return the process-wide registry used for LLM metrics."""
+    return _default
+
+
+@contextmanager
+def method_context(method: str) -> Iterator[None]:
+    """Attribute LLM calls made inside the block to ``method``."""
+    token = _method.set(method)
+    try:
+        yield
+    finally:
+        _method.reset(token)
+
+
+class CallRecord:
+    """Outcome and token usage of one tracked LLM call."""
+
+    def __init__(self) -> None:
+        self.outcome = "ok"
+        self.prompt_tokens: int | None = None
+        self.completion_tokens: int | None = None
+
+    def usage(self, usage: Any) -> None:
+        """Take prompt and completion tokens from an API ``usage`` object."""
+        prompt = getattr(usage, "prompt_tokens", None)
+        completion = getattr(usage, "completion_tokens", None)
+        if isinstance(prompt, int):
+            self.prompt_tokens = prompt
+        if isinstance(completion, int):
+            self.completion_tokens = completion
+
+
+@contextmanager
+def track_call(
+    component: str,
+    model: str,
+    method: str | None = None,
+    registry: MetricsRegistry | None = None,
+) -> Iterator[CallRecord]:
+    """Record latency, outcome and tokens of the LLM call made in the block.
+
+    The outcome defaults to ``ok``; the block may set ``record.outcome``
+    (``cached`` or ``placeholder``). Exceptions leaving the block are
+    recorded as ``error``, cancellation as ``cancelled``. ``method``
+    defaults to the one set by :func:`method_context`.
+    """
+    registry = registry or _default
+    if method is None:
+        method = _method.get()
+    record = CallRecord()
+    start = time.perf_counter()
+    try:
+        yield record
+    except (GeneratorExit, asyncio.CancelledError):
+        record.outcome = "cancelled"
+        raise
+    except BaseException:
+        record.outcome = "error"
+        raise
+    finally:
+        labels = {"component": component, "model": model, "method": method}
+        elapsed = time.perf_counter() - start
+        registry.histogram(
+            "llm_request_duration_seconds",
+            "Latency of LLM requests in seconds.",
+            ("component", "model", "method", "outcome"),
+        ).observe(elapsed, outcome=record.outcome, **labels)
+        if record.prompt_tokens is not None:
+            registry.counter(
+                "llm_prompt_tokens_total",
+                "Prompt tokens sent to the LLM.",
+                ("component", "model", "method"),
+            ).inc(record.prompt_tokens, **labels)
+        if record.completion_tokens is not None:
+            registry.counter(
+                "llm_completion_tokens_total",
+                "Completion tokens returned by the LLM.",
+                ("component", "model", "method"),
+            ).inc(record.completion_tokens, **labels)
+
+
+__all__ = [
+    "CallRecord",
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "default_registry",
+    "method_context",
+    "track_call",
+]
@@ -0,0 +1,150 @@
+"""Request flow shared by the LLM based components.
+
+:class:`LLMQuery` answers a chat request from the response cache or sends
+it through the resilience layer, records it with :func:`track_call` and
+turns failures that retrying cannot fix into a placeholder answer.
+:class:`LLMAnalyzer.LLMAnalyzer` and :class:`Review.Review` only supply the
+messages, cache key and the class attributes naming their logs, metrics
+and errors.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, List
+import os
+
+from .client import get_async_client, get_client
+from .metrics import CallRecord, track_call
+from .resilience import CircuitOpenError, is_transient
+
+Messages = List[Dict[str, str]]
+
+
+class LLMQuery:
+    """Cached, resilient chat completion requests.
+
+    Subclasses set ``model``, ``cache``, ``resilience`` and ``logger`` on
+    the instance and override the class attributes below.
+    """
+
+    #: Prefix of the log messages, e.g. ``LLMAnalyzer``
+    label = "LLMQuery"
+    #: ``component`` label of the recorded metrics
+    component = ""
+    #: Raised when the client cannot be used or the service is down
+    error: type[Exception] = RuntimeError
+    #: Answer returned for failures that retrying cannot fix
+    placeholder = "LLM response placeholder for: {prompt}"
+
+    def _open_client(self, factory: Callable[[str], Any]) -> Any:
+        """Return the client created by ``factory`` for the configured key."""
+        self.logger.debug("%s._query_llm start", self.label)
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise self.error("OPENAI_API_KEY not set")
+        try:
+            return factory(api_key)
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise self.error("openai package is not installed") from exc
+
+    def _read_response(self, response: Any, call: CallRecord) -> str:
+        """Return the stripped answer text of a chat completion."""
+        usage = getattr(response, "usage", None)
+        call.usage(usage)
+        tokens = getattr(usage, "total_tokens", None)
+        if tokens is not None:
+            self.logger.info("%s tokens used: %s", self.label, tokens)
+        result = response.choices[0].message.content.strip()
+        self._log_result(result)
+        return result
+
+    def _log_result(self, result: str) -> None:
+        self.logger.debug(
+            "%s returned: %s", self.label, result.replace("\n", " ")[:200]
+        )
+        self.logger.debug("%s._query_llm end", self.label)
+
+    def _cache_hit(self, call: CallRecord, key: str, cached: str) -> str:
+        self.logger.debug("%s cache hit: %s", self.label, key[:12])
+        call.outcome = "cached"
+        return cached
+
+    def _fallback(self, exc: Exception, prompt: str) -> str:
+        """Return a placeholder for ``exc`` or raise for key errors."""
+        if "invalid" in str(exc).lower() or "incorrect" in str(exc).lower():
+            raise self.error("Invalid OpenAI API key") from exc
+        self.logger.error("%s error: %s", self.label, exc)
+        if isinstance(exc, CircuitOpenError) or is_transient(exc):
+            # Retries are exhausted; a placeholder would hide the outage
+            raise self.error(f"LLM service unavailable: {exc}") from exc
+        self.logger.debug("%s._query_llm end", self.label)
+        return self.placeholder.format(prompt=prompt[:50])
+
+    def _complete(
+        self,
+        send: Callable[..., Any],
+        messages: Messages,
+        key: str | None,
+        prompt: str,
+    ) -> str:
+        """Return the answer to ``messages``, from the cache when possible.
+
+        ``send`` performs the request, e.g. ``self.resilience.call``; it is
+        given the client's ``create`` method and the request arguments.
+        ``prompt`` labels the placeholder returned on failure.
+        """
+        with track_call(self.component, self.model) as call:
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return self._cache_hit(call, key, cached)
+            client = self._open_client(get_client)
+            try:
+                response = send(
+                    client.chat.completions.create,
+                    model=self.model,
+                    messages=messages,
+                )
+                result = self._read_response(response, call)
+            except Exception as exc:  # pragma: no cover - network issues
+                call.outcome = "placeholder"
+                return self._fallback(exc, prompt)
+            if key is not None:
+                self.cache.set(key, result)
+            return result
+
+    async def _acomplete(
+        self,
+        send: Callable[..., Awaitable[Any]],
+        messages: Messages,
+        key: str | None,
+        prompt: str,
+    ) -> str:
+        """Asynchronous variant of :meth:`_complete`.
+
+        ``send`` is awaited, e.g. ``self.resilience.acall``. The cache is
+        accessed through :meth:`ResponseCache.aget` and
+        :meth:`ResponseCache.aset` so the event loop is not blocked.
+        """
+        with track_call(self.component, self.model) as call:
+            if key is not None:
+                cached = await self.cache.aget(key)
+                if cached is not None:
+                    return self._cache_hit(call, key, cached)
+            client = self._open_client(get_async_client)
+            try:
+                response = await send(
+                    client.chat.completions.create,
+                    model=self.model,
+                    messages=messages,
+                )
+                result = self._read_response(response, call)
+            except Exception as exc:  # pragma: no cover - network issues
+                call.outcome = "placeholder"
+                return self._fallback(exc, prompt)
+            if key is not None:
+                await self.cache.aset(key, result)
+            return result
+
+
+__all__ = ["LLMQuery", "Messages"]
@@ -0,0 +1,375 @@
+"""Retries, rate limiting and circuit breaking around LLM requests.
+
+:class:`Resilience` wraps a single upstream call. Transient failures (HTTP
+408/409/429/5xx, connection errors and timeouts) are retried with
+exponential backoff and full jitter, waiting at least as long as the
+``Retry-After`` header asks. A concurrency limit and an optional token
+bucket bound the load sent upstream, and a :class:`CircuitBreaker` rejects
+calls immediately after repeated failures until a trial call succeeds.
+
+The process-wide instance returned by :func:`default_resilience` reads its
+settings from the environment:
+
+``LLM_MAX_ATTEMPTS``
+    Attempts per call including the first one (default ``4``).
+``LLM_RETRY_BASE_DELAY`` / ``LLM_RETRY_MAX_DELAY``
+    Backoff base and cap in seconds (defaults ``0.5`` and ``20``).
+``LLM_MAX_CONCURRENCY``
+    Requests in flight at once (default ``16``).
+``LLM_RATE_LIMIT``
+    Requests per second, ``0`` for no limit (default ``0``).
+``LLM_BREAKER_THRESHOLD`` / ``LLM_BREAKER_RESET``
+    Consecutive failures that open the breaker (default ``5``) and seconds
+    before a trial call is allowed (default ``30``).
+"""
+
+from __future__ import annotations
+
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP status codes worth retrying besides 5xx
+_RETRY_STATUS = {408, 409, 429}
+# SDK exception names raised without an HTTP status
+_TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError"}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling upstream while the breaker is open."""
+
+
+def status_code(exc: BaseException) -> int | None:
+    """Return the HTTP status attached to ``exc`` if any."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Return ``True`` when retrying the failed call may succeed."""
+    if type(exc).__name__ in _TRANSIENT_ERRORS:
+        return True
+    status = status_code(exc)
+    return status is not None and (status in _RETRY_STATUS or status >= 500)
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Return the delay requested by the ``Retry-After`` headers of ``exc``."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket handing out ``rate`` send times a second."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """Stop calling upstream after ``failure_threshold`` consecutive failures.
+
+    After ``reset_timeout`` seconds one trial call is let through
+    (``half_open``); its success closes the breaker, its failure opens it
+    again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Return ``"closed"``, ``"open"`` or ``"half_open"``."""
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        """Raise :class:`CircuitOpenError` unless a call may be made now."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return
+        raise CircuitOpenError("LLM service unavailable (circuit open)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial:
+                    self.opened += 1
+                    logger.warning(
+                        "LLM circuit opened after %d failures", self._failures
+                    )
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    def record_release(self) -> None:
+        """Give up a trial call that ended without an upstream verdict."""
+        with self._lock:
+            self._trial = False
+
+
+class Resilience:
+    """Run LLM requests with retries, a concurrency limit and a breaker."""
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        max_concurrency: int = 16,
+        rate: float | None = None,
+        breaker: CircuitBreaker | None = None,
+        max_retry_after: float = 60.0,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+        self.max_retry_after = max_retry_after
+        self.bucket = TokenBucket(rate) if rate else None
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        # An asyncio.Semaphore per event loop, as each is bound to one loop
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "rejected": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _delay(self, attempt: int, exc: BaseException) -> float:
+        """Return the wait before retry number ``attempt`` after ``exc``."""
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(0, backoff)
+        requested = retry_after(exc)
+        if requested is not None:
+            delay = max(delay, min(requested, self.max_retry_after))
+        return delay
+
+    def _failed(self, attempt: int, exc: Exception) -> float | None:
+        """Record a failed attempt and return the retry delay or ``None``."""
+        if not is_transient(exc):
+            self.breaker.record_release()
+            return None
+        if status_code(exc) == 429:
+            self._count("rate_limited")
+        self.breaker.record_failure()
+        if attempt >= self.max_attempts or self.breaker.state == "open":
+            return None
+        self._count("retries")
+        delay = self._delay(attempt, exc)
+        logger.warning(
+            "LLM request failed (%s), retry %d/%d in %.2fs",
+            exc,
+            attempt,
+            self.max_attempts - 1,
+            delay,
+        )
+        return delay
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Return ``func(*args, **kwargs)``, retrying transient failures.
+
+        Raises
+        ------
+        CircuitOpenError
+            If the breaker rejects the call.
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            if self.bucket is not None:
+                wait = self.bucket.reserve()
+                if wait:
+                    time.sleep(wait)
+            try:
+                with self._semaphore:
+                    result = func(*args, **kwargs)
+            except Exception as exc:
+                delay = self._failed(attempt, exc)
+                if delay is None:
+                    self._count("failures")
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self._count("successes")
+            return result
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._async_semaphores[loop] = semaphore
+            return semaphore
+
+    async def acall(
+        self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+    ) -> T:
+        """Asynchronous variant of :meth:`call` for coroutine functions.
+
+        The concurrency limit applies per event loop.
+        """
+        self._count("calls")
+        semaphore = self._async_semaphore()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            if self.bucket is not None:
+                wait = self.bucket.reserve()
+                if wait:
+                    await asyncio.sleep(wait)
+            try:
+                async with semaphore:
+                    result = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                self.breaker.record_release()
+                raise
+            except Exception as exc:
+                delay = self._failed(attempt, exc)
+                if delay is None:
+                    self._count("failures")
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self._count("successes")
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call, retry and rejection counters with the breaker state."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+        stats["breaker_state"] = self.breaker.state
+        stats["breaker_opened"] = self.breaker.opened
+        return stats
+
+
+_default: Resilience | None = None
+_default_lock = threading.Lock()
+
+
+def default_resilience() -> Resilience:
+    """Return the process-wide :class:`Resilience` from the environment."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            rate = float(os.getenv("LLM_RATE_LIMIT", "0"))
+            _default = Resilience(
+                max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "4")),
+                base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+                max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "20")),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+                rate=rate or None,
+                breaker=CircuitBreaker(
+                    int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+                    float(os.getenv("LLM_BREAKER_RESET", "30")),
+                ),
+            )
+        return _default
+
+
+__all__ = [
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "Resilience",
+    "TokenBucket",
+    "default_resilience",
+    "is_transient",
+    "retry_after",
+]
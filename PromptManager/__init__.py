@@ -1,19 +1,252 @@
-"""Utilities for loading prompt templates."""
+"""Utilities for loading prompt templates.
+
+All prompts in ``Prompts/`` are loaded once per process by the shared
+:class:`PromptRegistry`: text prompts are compiled into
+:class:`PromptTemplate` objects and JSON step templates are parsed; their
+``str.format`` prompts are compiled by :func:`compile_format`. A file that
+fails to load only fails the lookups that need it. Every
+lookup compares the file's modification time and size with the loaded
+version, so edited prompts are picked up without restarting the server.
+Set ``PROMPT_HOT_RELOAD=0`` to skip these checks.
+"""
 
 from __future__ import annotations
 
-import json
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
+import json
+import logging
+import os
+import re
+import string
+import threading
+
+logger = logging.getLogger(__name__)
+
+PROMPT_DIR = Path(__file__).resolve().parents[1] / "Prompts"
+PROMPT_SUFFIXES = {".txt", ".md", ".json"}
+
+# ``{{name}}`` placeholders of text prompts
+_PLACEHOLDER = re.compile(r"(\{\{\s*(\w+)\s*\}\})")
+
+
+class PromptTemplate:
+    """Text prompt split once into literals and ``{{name}}`` placeholders."""
+
+    __slots__ = ("source", "names", "_literals", "_tokens")
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        parts = _PLACEHOLDER.split(source)
+        # parts: literal, token, name, literal, token, name, ..., literal
+        self._literals: List[str] = parts[0::3]
+        self._tokens: List[str] = parts[1::3]
+        self.names: Tuple[str, ...] = tuple(parts[2::3])
+
+    def render(self, **values: Any) -> str:
+        """Return the prompt with placeholders replaced by ``values``.
+
+        Substitution is a single pass, so braces inside the values are kept
+        as they are; placeholders without a value stay unchanged.
+        """
+        out = [self._literals[0]]
+        parts = zip(self._tokens, self.names, self._literals[1:])
+        for token, name, literal in parts:
+            value = values.get(name)
+            out.append(token if value is None else str(value))
+            out.append(literal)
+        return "".join(out)
+
+
+@lru_cache(maxsize=128)
+def compile_template(source: str) -> PromptTemplate:
+    """Return the compiled :class:`PromptTemplate` for ``source``."""
+    return PromptTemplate(source)
+
+
+class FormatTemplate:
+    """``str.format`` prompt of the JSON step templates, parsed once.
+
+    :meth:`render` returns the same text as ``source.format(**values)``.
+    Sources with positional, attribute or nested fields are passed to
+    :meth:`str.format` unchanged.
+    """
+
+    __slots__ = ("source", "_parts")
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        parts = list(string.Formatter().parse(source))
+        self._parts: List[tuple] | None = parts
+        for _, name, spec, _ in parts:
+            if name is not None and (not name.isidentifier() or "{" in spec):
+                self._parts = None
+                break
+
+    def render(self, **values: Any) -> str:
+        """Return the prompt with its fields replaced by ``values``."""
+        if self._parts is None:
+            return self.source.format(**values)
+        out = []
+        for literal, name, spec, conversion in self._parts:
+            out.append(literal)
+            if name is None:
+                continue
+            value = values[name]
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "s":
+                value = str(value)
+            elif conversion == "a":
+                value = ascii(value)
+            out.append(format(value, spec))
+        return "".join(out)
+
+
+@lru_cache(maxsize=256)
+def compile_format(source: str) -> FormatTemplate:
+    """Return the compiled :class:`FormatTemplate` for ``source``."""
+    return FormatTemplate(source)
+
+
+Signature = Tuple[int, int]
+
+
+class PromptRegistry:
+    """Process-wide cache of the parsed prompt files in ``base_dir``.
+
+    Parameters
+    ----------
+    base_dir:
+        Directory holding the prompt files.
+    watch:
+        Check the file's modification time on every lookup and reload it
+        when it changed, appeared or was removed.
+    """
+
+    def __init__(
+        self,
+        base_dir: str | Path = PROMPT_DIR,
+        watch: bool = True,
+    ) -> None:
+        self.base_dir = Path(base_dir)
+        self.watch = watch
+        self.loads = 0
+        self._entries: Dict[str, Tuple[Signature, Any]] = {}
+        self._lock = threading.Lock()
+        if self.base_dir.is_dir():
+            for path in sorted(self.base_dir.iterdir()):
+                if path.name.startswith("_"):
+                    continue
+                if path.suffix not in PROMPT_SUFFIXES:
+                    continue
+                try:
+                    self.get(path.name)
+                except (OSError, ValueError):
+                    # Only the methods using this file fail, on lookup
+                    logger.exception("Could not load prompt %s", path.name)
+
+    @staticmethod
+    def _signature(path: Path) -> Signature | None:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _parse(path: Path) -> Any:
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+        if path.suffix == ".json":
+            return json.loads(text)
+        return compile_template(text)
+
+    def get(self, name: str) -> Any | None:
+        """Return the parsed prompt file ``name`` or ``None`` if missing.
+
+        Text files yield a :class:`PromptTemplate`, JSON files their data.
+        A file that fails to parse keeps its previously loaded version.
+        """
+        entry = self._entries.get(name)
+        if entry is not None and not self.watch:
+            return entry[1]
+        path = self.base_dir / name
+        signature = self._signature(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+            if signature is None:
+                if self._entries.pop(name, None) is not None:
+                    logger.info("Prompt %s removed", name)
+                return None
+            try:
+                value = self._parse(path)
+            except (OSError, ValueError):
+                if entry is None:
+                    raise
+                logger.exception(
+                    "Could not reload prompt %s; keeping old one",
+                    name,
+                )
+                return entry[1]
+            if entry is not None:
+                logger.info("Prompt %s reloaded", name)
+            self._entries[name] = (signature, value)
+            self.loads += 1
+            return value
+
+    def text(self, method: str) -> PromptTemplate | None:
+        """Return the text prompt of ``method`` if ``Prompts/`` has one."""
+        return self.get(f"{method}_Prompt.txt")
+
+    def template(self, method: str) -> Dict[str, Any]:
+        """Return the JSON step template of ``method``.
+
+        Raises
+        ------
+        FileNotFoundError
+            If ``Prompts/`` has no JSON template for ``method``.
+        """
+        name = f"{method}_Prompt.json"
+        data = self.get(name)
+        if data is None:
+            raise FileNotFoundError(str(self.base_dir / name))
+        return data
+
+
+_default: PromptRegistry | None = None
+_default_lock = threading.Lock()
+
+
+def default_prompt_registry() -> PromptRegistry:
+    """Return the process-wide registry of the bundled ``Prompts/``."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            flag = os.getenv("PROMPT_HOT_RELOAD", "1").lower()
+            watch = flag not in {"0", "false", "no"}
+            _default = PromptRegistry(PROMPT_DIR, watch=watch)
+        return _default
 
 
 class PromptManager:
-    """Manages LLM prompt templates."""
+    """Manages LLM prompt templates.
+
+    Lookups go through ``registry``, by default the process-wide
+    :func:`default_prompt_registry`, so creating managers is cheap and
+    prompts are read from disk only when they change.
+    """
 
-    def __init__(self) -> None:
-        """Initialize the template caches."""
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._text_cache: Dict[str, str] = {}
+    def __init__(self, registry: PromptRegistry | None = None) -> None:
+        """Use ``registry`` or the shared one for template lookups."""
+        if registry is None:
+            registry = default_prompt_registry()
+        self.registry = registry
 
     def load_prompt(self, path: str) -> Dict[str, Any]:
         """Load a prompt template from ``path``."""
@@ -26,23 +259,25 @@ class PromptManager:
             return file.read()
 
     def get_template(self, method: str) -> Dict[str, Any]:
-        """Return the prompt template for ``method`` with caching."""
-        if method not in self._cache:
-            base_dir = Path(__file__).resolve().parents[1] / "Prompts"
-            prompt_path = base_dir / f"{method}_Prompt.json"
-            self._cache[method] = self.load_prompt(str(prompt_path))
-        return self._cache[method]
+        """Return the JSON prompt template for ``method``."""
+        return self.registry.template(method)
+
+    def get_text_template(self, method: str) -> PromptTemplate | None:
+        """Return the compiled text prompt for ``method`` if there is one."""
+        return self.registry.text(method)
 
     def get_text_prompt(self, method: str) -> str:
-        """Return the text prompt for ``method`` with caching."""
-        if method not in self._text_cache:
-            base_dir = Path(__file__).resolve().parents[1] / "Prompts"
-            prompt_path = base_dir / f"{method}_Prompt.txt"
-            if prompt_path.exists():
-                self._text_cache[method] = self.load_text_prompt(str(prompt_path))
-            else:
-                self._text_cache[method] = ""
-        return self._text_cache[method]
-
-
-__all__ = ["PromptManager"]
+        """Return the text prompt for ``method`` or ``""`` if there is none."""
+        template = self.get_text_template(method)
+        return template.source if template is not None else ""
+
+
+__all__ = [
+    "FormatTemplate",
+    "PromptManager",
+    "PromptRegistry",
+    "PromptTemplate",
+    "compile_format",
+    "compile_template",
+    "default_prompt_registry",
+]
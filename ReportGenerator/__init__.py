@@ -1,23 +1,296 @@
-"""Report generation utilities."""
+"""Report generation utilities.
+
+Reports written to disk are content-addressed: their file names are
+:func:`report_key` of the analysis, the complaint info and the template and
+font version, so generating the same report again returns the existing
+files instead of rendering new ones.
+"""
 
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+from io import BytesIO
 from pathlib import Path
-import os
+import hashlib
+import json
 import logging
+import os
+import zipfile
 
 from fpdf import FPDF
 from openpyxl import Workbook
 from uuid import uuid4
 
-DEFAULT_FONT_PATH = Path(__file__).resolve().parents[1] / "Fonts" / "DejaVuSans.ttf"
-
 from GuideManager import GuideManager
+from .fonts import (
+    font_signature,
+    install_font_cache,
+    register_font,
+    resolve_font_path,
+)
 
 logger = logging.getLogger(__name__)
 
 
+Entry = Tuple[str, str]
+REPORT_SUFFIXES = {"pdf": ".pdf", "excel": ".xlsx"}
+# Part of every report key; bump it when ``render_pdf`` or ``render_excel``
+# change their output so that files of the old layout are not reused
+REPORT_VERSION = 1
+
+
+def report_entries(analysis: Dict[str, Any]) -> List[Entry]:
+    """Return the ``(step, response)`` lines of ``analysis``, deduplicated."""
+    entries: List[Entry] = []
+    seen = set()
+    for key, value in analysis.items():
+        if key == "full_text" and "full_report" in analysis:
+            continue
+        if isinstance(value, dict):
+            response = value.get("response", "")
+        else:
+            response = str(value)
+        if response in seen:
+            continue
+        seen.add(response)
+        entries.append((key, response))
+    return entries
+
+
+def report_key(
+    analysis: Dict[str, Any],
+    complaint_info: Dict[str, str],
+) -> str:
+    """Return the content address of the report of ``analysis``.
+
+    The key hashes the report lines of ``analysis``, ``complaint_info``,
+    :data:`REPORT_VERSION` and the PDF font, so two requests get the same
+    key exactly when they would render the same report.
+    """
+    entries = report_entries(analysis)
+    payload = json.dumps(
+        [REPORT_VERSION, font_signature(), entries, complaint_info],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def report_paths(
+    output_dir: str | Path,
+    key: str | None = None,
+) -> Dict[str, Path]:
+    """Create ``output_dir`` and return its PDF and Excel paths.
+
+    The files are named after ``key`` (see :func:`report_key`), or get a new
+    unique name without it.
+    """
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    name = key or uuid4().hex
+    return {
+        kind: out_dir / f"report_{name}{suffix}"
+        for kind, suffix in REPORT_SUFFIXES.items()
+    }
+
+
+def stored_report(paths: Dict[str, Path]) -> Dict[str, str] | None:
+    """Return ``paths`` as strings if all files exist, otherwise ``None``.
+
+    The modification times of the files are refreshed, so reports that are
+    reused are the last ones the report store removes.
+    """
+    try:
+        for path in paths.values():
+            os.utime(path)
+    except FileNotFoundError:
+        return None
+    return {kind: str(path) for kind, path in paths.items()}
+
+
+def _write_file(path: str | Path, write: Callable[[str], Any]) -> str:
+    """Let ``write`` create a temporary file and move it to ``path``.
+
+    Nobody looking for an existing report sees a half-written file. The
+    temporary name keeps the ``report_`` prefix so that the report store
+    also removes files left over by a crash.
+    """
+    path = Path(path)
+    tag = uuid4().hex[:8]
+    partial = path.with_name(f"{path.stem}.{tag}.part{path.suffix}")
+    try:
+        write(str(partial))
+        os.replace(partial, path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return str(path)
+
+
+def render_pdf(
+    entries: Sequence[Entry],
+    complaint_info: Dict[str, str],
+    path: str | Path | None = None,
+) -> str | bytes:
+    """Write the PDF report to ``path`` and return the path.
+
+    Without ``path`` the PDF is rendered in memory and its bytes returned.
+    """
+    install_font_cache()
+    pdf = FPDF()
+    pdf.add_page()
+    # Register a Unicode font for non-Latin characters; its subset is
+    # built once per character set and process (see ``fonts``)
+    font_path = resolve_font_path()
+    register_font(pdf, "DejaVu", font_path)
+    pdf.set_font("DejaVu", size=12)
+    pdf.cell(0, 10, txt="Analysis Report", ln=1)
+    customer = complaint_info.get("customer", "")
+    subject = complaint_info.get("subject", "")
+    part_code = complaint_info.get("part_code", "")
+    pdf.cell(0, 10, txt=f"Customer: {customer}", ln=1)
+    pdf.cell(0, 10, txt=f"Subject: {subject}", ln=1)
+    pdf.cell(0, 10, txt=f"Part Code: {part_code}", ln=1)
+    pdf.ln(5)
+    for key, response in entries:
+        line = f"{key}: {response}"
+        width = getattr(pdf, "epw", 0)
+        pdf.multi_cell(width, 10, txt=line)
+    try:
+        if path is None:
+            data = pdf.output(dest="S")
+            # fpdf 1.x returns the document as a latin-1 string
+            if isinstance(data, str):
+                return data.encode("latin-1")
+            return bytes(data)
+        return _write_file(path, pdf.output)
+    except Exception:
+        logger.exception("Failed to create report file")
+        raise
+
+
+def _append_report(
+    ws: Any,
+    entries: Sequence[Entry],
+    complaint_info: Dict[str, str],
+) -> None:
+    ws.append(["Customer", complaint_info.get("customer", "")])
+    ws.append(["Subject", complaint_info.get("subject", "")])
+    ws.append(["Part Code", complaint_info.get("part_code", "")])
+    ws.append([])
+    ws.append(["Step", "Response"])
+    for key, response in entries:
+        ws.append([key, response])
+
+
+def render_excel(
+    entries: Sequence[Entry],
+    complaint_info: Dict[str, str],
+    path: str | Path | None = None,
+) -> str | bytes:
+    """Write the Excel report to ``path`` and return the path.
+
+    Without ``path`` the workbook is rendered in memory and its bytes
+    returned.
+    """
+    # Write-only workbooks stream rows to disk instead of keeping cells
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet")
+    _append_report(ws, entries, complaint_info)
+    try:
+        if path is None:
+            buffer = BytesIO()
+            wb.save(buffer)
+            return buffer.getvalue()
+        return _write_file(path, wb.save)
+    except Exception:
+        logger.exception("Failed to create report file")
+        if not ws.closed:
+            ws.close()
+        raise
+
+
+def report_zip(files: Dict[str, bytes], name: str = "report") -> bytes:
+    """Return a zip archive of in-memory report ``files``.
+
+    ``files`` maps ``pdf``/``excel`` to their bytes; the archive members
+    are ``{name}.pdf`` and ``{name}.xlsx``. Both formats are compressed
+    already, so the members are stored as they are.
+    """
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for kind, data in files.items():
+            archive.writestr(f"{name}{REPORT_SUFFIXES[kind]}", data)
+    return buffer.getvalue()
+
+
+ReportItem = Tuple[Dict[str, Any], Dict[str, str]]
+EXPORT_LAYOUTS = ("rows", "sheets")
+EXPORT_HEADER = [
+    "Report",
+    "Customer",
+    "Subject",
+    "Part Code",
+    "Step",
+    "Response",
+]
+
+
+def export_workbook(
+    reports: Iterable[ReportItem], path: str | Path, layout: str = "rows"
+) -> Dict[str, Any]:
+    """Write many analyses into one Excel workbook with constant memory.
+
+    Parameters
+    ----------
+    reports:
+        ``(analysis, complaint_info)`` pairs; consumed one at a time, so a
+        generator keeps memory use independent of their number.
+    path:
+        File to create.
+    layout:
+        ``"rows"`` writes one ``Reports`` sheet with a row per step and the
+        columns of :data:`EXPORT_HEADER`; ``"sheets"`` writes one sheet per
+        analysis laid out like the single report.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The workbook ``path`` and the number of ``reports`` and ``rows``.
+    """
+    if layout not in EXPORT_LAYOUTS:
+        raise ValueError(f"Unknown export layout: {layout}")
+    wb = Workbook(write_only=True)
+    count = rows = 0
+    if layout == "rows":
+        ws = wb.create_sheet("Reports")
+        ws.append(EXPORT_HEADER)
+        for count, (analysis, info) in enumerate(reports, 1):
+            customer = info.get("customer", "")
+            subject = info.get("subject", "")
+            part_code = info.get("part_code", "")
+            for key, response in report_entries(analysis):
+                ws.append([count, customer, subject, part_code, key, response])
+                rows += 1
+    else:
+        for count, (analysis, info) in enumerate(reports, 1):
+            ws = wb.create_sheet(f"Report {count}")
+            entries = report_entries(analysis)
+            _append_report(ws, entries, info)
+            # Finish the sheet now so its temporary file is closed
+            ws.close()
+            rows += len(entries)
+        if not count:
+            wb.create_sheet("Reports")
+    try:
+        wb.save(str(path))
+    except Exception:
+        logger.exception("Failed to create report file")
+        raise
+    return {"path": str(path), "reports": count, "rows": rows}
+
+
 class ReportGenerator:
     """Generates reports for quality-report methods from analyzed data."""
 
@@ -34,7 +307,8 @@ class ReportGenerator:
         analysis: Dict[str, Any],
         complaint_info: Dict[str, str],
         output_dir: str | Path = ".",
-    ) -> Dict[str, str]:
+        in_memory: bool = False,
+    ) -> Dict[str, Any]:
         """Create PDF and Excel reports from the analysis results.
 
         Parameters
@@ -45,86 +319,67 @@ class ReportGenerator:
             Information about the complaint such as customer, subject and part code.
         output_dir: str | Path, optional
             Directory in which to save the generated files.
+        in_memory: bool, optional
+            Render into memory instead of files; ``output_dir`` is ignored.
 
         Returns
         -------
-        Dict[str, str]
-            A dictionary containing the generated PDF and Excel file paths.
+        Dict[str, Any]
+            The generated PDF and Excel file paths, or their bytes when
+            ``in_memory`` is set.
+
+        Files are named by :func:`report_key`: if ``output_dir`` already
+        holds the report, its paths are returned without rendering.
+        Concurrent requests for the same report are coalesced by
+        :class:`~ReportGenerator.pool.ReportPool`.
         """
+        entries = report_entries(analysis)
+        if in_memory:
+            return {
+                "pdf": render_pdf(entries, complaint_info),
+                "excel": render_excel(entries, complaint_info),
+            }
+        paths = report_paths(output_dir, report_key(analysis, complaint_info))
+        result = stored_report(paths)
+        if result is None:
+            result = {
+                "pdf": render_pdf(entries, complaint_info, paths["pdf"]),
+                "excel": render_excel(entries, complaint_info, paths["excel"]),
+            }
+        return result
 
-        out_dir = Path(output_dir)
-        out_dir.mkdir(parents=True, exist_ok=True)
+    def export(
+        self,
+        reports: Iterable[ReportItem],
+        output_dir: str | Path = ".",
+        layout: str = "rows",
+    ) -> Dict[str, Any]:
+        """Export many ``(analysis, complaint_info)`` pairs into one workbook.
 
-        unique_id = uuid4().hex
-        pdf_path = out_dir / f"report_{unique_id}.pdf"
-        excel_path = out_dir / f"report_{unique_id}.xlsx"
+        See :func:`export_workbook`; the file gets a unique name in
+        ``output_dir`` and its path is returned as ``excel``.
+        """
+        path = report_paths(output_dir)["excel"]
+        result = export_workbook(reports, path, layout)
+        return {
+            "excel": result["path"],
+            "reports": result["reports"],
+            "rows": result["rows"],
+        }
 
-        # Create PDF
-        pdf = FPDF()
-        pdf.add_page()
-        # Register a Unicode font for non-Latin characters
-        env_font = os.getenv("FONT_PATH")
-        if env_font:
-            font_path = Path(env_font)
-        else:
-            font_path = DEFAULT_FONT_PATH
-        if not font_path.exists():
-            fallback = Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
-            if fallback.exists():
-                font_path = fallback
-            else:
-                raise FileNotFoundError(
-                    "Font file not found. Checked "
-                    f"{font_path} and {fallback}. Set FONT_PATH to override."
-                )
-        pdf.add_font("DejaVu", "", str(font_path), uni=True)
-        pdf.set_font("DejaVu", size=12)
-        pdf.cell(0, 10, txt="Analysis Report", ln=1)
-        customer = complaint_info.get("customer", "")
-        subject = complaint_info.get("subject", "")
-        part_code = complaint_info.get("part_code", "")
-        pdf.cell(0, 10, txt=f"Customer: {customer}", ln=1)
-        pdf.cell(0, 10, txt=f"Subject: {subject}", ln=1)
-        pdf.cell(0, 10, txt=f"Part Code: {part_code}", ln=1)
-        pdf.ln(5)
-        entries = []
-        seen = set()
-        for key, value in analysis.items():
-            if key == "full_text" and "full_report" in analysis:
-                continue
-            response = value.get("response", "") if isinstance(value, dict) else str(value)
-            if response in seen:
-                continue
-            seen.add(response)
-            entries.append((key, response))
-
-        for key, response in entries:
-            line = f"{key}: {response}"
-            width = getattr(pdf, "epw", 0)
-            pdf.multi_cell(width, 10, txt=line)
-        try:
-            pdf.output(str(pdf_path))
-        except Exception:
-            logger.exception("Failed to create report file")
-            raise
-
-        # Create Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.append(["Customer", customer])
-        ws.append(["Subject", subject])
-        ws.append(["Part Code", part_code])
-        ws.append([])
-        ws.append(["Step", "Response"])
-        for key, response in entries:
-            ws.append([key, response])
-        try:
-            wb.save(str(excel_path))
-        except Exception:
-            logger.exception("Failed to create report file")
-            raise
-
-        return {"pdf": str(pdf_path), "excel": str(excel_path)}
-
-
-__all__ = ["ReportGenerator"]
+
+__all__ = [
+    "EXPORT_HEADER",
+    "EXPORT_LAYOUTS",
+    "REPORT_SUFFIXES",
+    "REPORT_VERSION",
+    "ReportGenerator",
+    "export_workbook",
+    "render_excel",
+    "render_pdf",
+    "report_entries",
+    "report_key",
+    "report_paths",
+    "report_zip",
+    "stored_report",
+]
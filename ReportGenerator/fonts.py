@@ -0,0 +1,208 @@
+"""Process-wide font subset cache for PDF reports.
+
+``fpdf`` embeds a subset of the TrueType font into every PDF. Building it
+re-reads and parses the whole font file (character map, metrics, glyph
+offsets) and is the most expensive step of a report. :class:`CachedTTFontFile`
+keeps the subsets it built in memory, keyed by font file and glyph set.
+``fpdf`` has no hook for its font class, so :func:`install_font_cache`
+replaces ``fpdf.fpdf.TTFontFile``; importing this module changes nothing,
+the replacement happens when :func:`~ReportGenerator.render_pdf` first
+draws a PDF in the process.
+
+To make reports share a subset, the glyphs of :data:`BASE_GLYPHS` (ASCII,
+Latin-1, Latin Extended-A with the Turkish letters, common punctuation) are
+always embedded; a report only needs a new subset when it uses characters
+outside this set. This adds roughly 20 KB to each PDF. Set
+``PDF_FONT_BASE_SUBSET=0`` to embed only the characters used, in which case
+only reports with identical character sets share a subset.
+
+:func:`register_font` also replaces the font's list of used characters,
+which ``fpdf`` fills with one entry per printed character, by a
+:class:`GlyphSet` so that writing the glyph widths does not scan it.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Tuple
+import logging
+import os
+import threading
+
+import fpdf.fpdf
+from fpdf.ttfonts import TTFontFile
+
+logger = logging.getLogger(__name__)
+
+_FONT_DIR = Path(__file__).resolve().parents[1] / "Fonts"
+DEFAULT_FONT_PATH = _FONT_DIR / "DejaVuSans.ttf"
+SYSTEM_FONT_PATH = Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+
+BASE_GLYPHS: FrozenSet[int] = frozenset(
+    [*range(0x20, 0x7F), *range(0xA0, 0x180), *range(0x2010, 0x2027)]
+    + [*range(0x2030, 0x203B), 0x20AC, 0x2122]
+)
+
+SubsetKey = Tuple[str, int, int, Tuple[int, ...]]
+Subset = Tuple[bytes, Dict[int, int]]
+
+
+def resolve_font_path() -> Path:
+    """Return the font used for PDFs.
+
+    ``FONT_PATH`` overrides the bundled DejaVuSans; the system DejaVuSans is
+    used when neither exists.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no font file can be found.
+    """
+    env_font = os.getenv("FONT_PATH")
+    font_path = Path(env_font) if env_font else DEFAULT_FONT_PATH
+    if not font_path.exists():
+        if SYSTEM_FONT_PATH.exists():
+            return SYSTEM_FONT_PATH
+        raise FileNotFoundError(
+            "Font file not found. Checked "
+            f"{font_path} and {SYSTEM_FONT_PATH}. Set FONT_PATH to override."
+        )
+    return font_path
+
+
+class GlyphSet(list):
+    """Glyph list of an ``fpdf`` font that stores every code only once.
+
+    ``fpdf`` appends each printed character to the font's ``subset`` list
+    and later tests codes against it with ``in``; with duplicates removed
+    and a set for lookups both stay cheap for long reports.
+    """
+
+    def __init__(self, codes: Iterable[int] = ()) -> None:
+        super().__init__()
+        self._codes: set[int] = set()
+        for code in codes:
+            self.append(code)
+
+    def __contains__(self, code: object) -> bool:
+        return code in self._codes
+
+    def append(self, code: int) -> None:
+        if code not in self._codes:
+            self._codes.add(code)
+            super().append(code)
+
+    def __delitem__(self, index: int | slice) -> None:
+        super().__delitem__(index)
+        self._codes = set(self)
+
+
+def _base_glyphs() -> FrozenSet[int]:
+    """Return :data:`BASE_GLYPHS` unless ``PDF_FONT_BASE_SUBSET`` is off."""
+    if os.getenv("PDF_FONT_BASE_SUBSET", "1").lower() in {"0", "false", "no"}:
+        return frozenset()
+    return BASE_GLYPHS
+
+
+def register_font(pdf: fpdf.FPDF, family: str, path: str | Path) -> None:
+    """Add the Unicode TrueType font at ``path`` to ``pdf`` as ``family``."""
+    pdf.add_font(family, "", str(path), uni=True)
+    font = pdf.fonts.get(family.lower())
+    if font is not None and isinstance(font.get("subset"), list):
+        font["subset"] = GlyphSet(font["subset"])
+
+
+class CachedTTFontFile(TTFontFile):
+    """``TTFontFile`` that reuses subsets built earlier in the process."""
+
+    maxsize = 32
+    base_glyphs: FrozenSet[int] = _base_glyphs()
+    hits = 0
+    misses = 0
+    _cache: "OrderedDict[SubsetKey, Subset]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all cached subsets and reset the counters."""
+        with cls._lock:
+            cls._cache.clear()
+            cls.hits = cls.misses = 0
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Return cache size, hits and misses."""
+        with cls._lock:
+            return {
+                "size": len(cls._cache),
+                "hits": cls.hits,
+                "misses": cls.misses,
+            }
+
+    def makeSubset(  # noqa: N802
+        self,
+        file: str,
+        subset: Iterable[int],
+    ) -> bytes:
+        stat = os.stat(file)
+        used = set(subset)
+        codes = tuple(sorted(used | self.base_glyphs))
+        key = (str(file), stat.st_mtime_ns, stat.st_size, codes)
+        cls = type(self)
+        with cls._lock:
+            cached = cls._cache.get(key)
+            if cached is not None:
+                cls._cache.move_to_end(key)
+                cls.hits += 1
+        if cached is None:
+            stream = super().makeSubset(file, list(codes))
+            cached = (stream, self.codeToGlyph)
+            with cls._lock:
+                cls.misses += 1
+                cls._cache[key] = cached
+                while len(cls._cache) > cls.maxsize:
+                    cls._cache.popitem(last=False)
+            logger.debug(
+                "Built font subset of %s with %d glyphs",
+                file,
+                len(codes),
+            )
+        stream, self.codeToGlyph = cached
+        # fpdf writes widths up to ``maxUni``; the base glyphs need none
+        self.maxUni = max(used, default=0)
+        return stream
+
+
+def font_signature() -> str:
+    """Return a string that changes whenever the embedded font would.
+
+    It covers the font file in use (path, size, modification time) and
+    whether :data:`BASE_GLYPHS` are embedded.
+    """
+    path = resolve_font_path()
+    stat = path.stat()
+    glyphs = "base" if CachedTTFontFile.base_glyphs else "used"
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}:{glyphs}"
+
+
+def install_font_cache() -> None:
+    """Make ``fpdf`` build font subsets through :class:`CachedTTFontFile`.
+
+    Safe to call before every PDF; only the first call in a process
+    replaces ``fpdf.fpdf.TTFontFile``.
+    """
+    if fpdf.fpdf.TTFontFile is not CachedTTFontFile:
+        fpdf.fpdf.TTFontFile = CachedTTFontFile
+
+
+__all__ = [
+    "BASE_GLYPHS",
+    "CachedTTFontFile",
+    "DEFAULT_FONT_PATH",
+    "GlyphSet",
+    "font_signature",
+    "install_font_cache",
+    "register_font",
+    "resolve_font_path",
+]
@@ -0,0 +1,381 @@
+"""Render reports in worker processes.
+
+PDF and Excel rendering are CPU-bound pure Python and hold the GIL, so
+rendering them on the API's threads stalls every other request.
+:class:`ReportPool` sends :func:`~ReportGenerator.render_pdf` and
+:func:`~ReportGenerator.render_excel` of a report to a process pool, where
+both files are built in parallel, and lets coroutines await the result.
+Bulk exports of many analyses into one workbook (:meth:`ReportPool.export`)
+run in the same pool.
+
+Reports are content-addressed (see :func:`~ReportGenerator.report_key`): a
+report whose files already exist is returned without rendering, and a
+request for a report that is being rendered shares the futures of the
+running render instead of starting another one.
+
+At most ``max_pending`` reports are queued or rendering at a time; further
+requests fail at once with :class:`ReportQueueFullError` instead of piling
+up; threads such as batch jobs wait for a slot with :meth:`ReportPool.render`.
+The process-wide pool returned by :func:`default_report_pool` reads:
+
+``REPORT_WORKERS``
+    Worker processes (default: number of CPUs, at most ``4``).
+``REPORT_MAX_PENDING``
+    Reports allowed to wait or render at the same time (default ``16``).
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import asyncio
+import logging
+import os
+import threading
+
+from . import (
+    EXPORT_LAYOUTS,
+    ReportItem,
+    export_workbook,
+    render_excel,
+    render_pdf,
+    report_entries,
+    report_key,
+    report_paths,
+    stored_report,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _failed(future: Future) -> bool:
+    """Whether ``future`` was cancelled or raised."""
+    return future.cancelled() or future.exception() is not None
+
+
+def _forward(source: Future, target: Future) -> None:
+    """Complete ``target`` like ``source`` once ``source`` is done."""
+
+    def copy(_: Future) -> None:
+        if target.cancelled():
+            return
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    source.add_done_callback(copy)
+
+
+def _follow(futures: Dict[str, Future]) -> Dict[str, Future]:
+    """Return new futures completed like ``futures``.
+
+    Callers of a shared render get their own futures, so one of them
+    cancelling its wait does not cancel the render for the others.
+    """
+    followers = {kind: Future() for kind in futures}
+    for kind, future in futures.items():
+        _forward(future, followers[kind])
+    return followers
+
+
+class ReportQueueFullError(RuntimeError):
+    """Raised when too many reports are already waiting to be rendered."""
+
+
+class ReportPool:
+    """Process pool rendering the PDF and Excel file of a report in parallel.
+
+    Parameters
+    ----------
+    workers:
+        Number of worker processes; started on first use.
+    max_pending:
+        Reports that may be queued or rendering before new ones are
+        rejected.
+    """
+
+    def __init__(
+        self, workers: int | None = None, max_pending: int | None = None
+    ) -> None:
+        if workers is None:
+            workers = int(os.getenv("REPORT_WORKERS", "0")) or min(
+                4, os.cpu_count() or 1
+            )
+        if max_pending is None:
+            max_pending = int(os.getenv("REPORT_MAX_PENDING", "16"))
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.deduplicated = 0
+        self.coalesced = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # Notified whenever a report leaves ``pending``
+        self._slot_freed = threading.Condition(self._lock)
+        # Futures of reports being rendered, shared by identical requests
+        self._flights: Dict[Tuple[Any, ...], Dict[str, Future]] = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _reserve(self, block: bool = False) -> None:
+        with self._lock:
+            while block and self.pending >= self.max_pending:
+                self._slot_freed.wait()
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ReportQueueFullError(
+                    f"{self.pending} reports are already being rendered"
+                )
+            self.pending += 1
+
+    def _release(self, *futures: Future) -> None:
+        remaining = [len(futures)]
+
+        def part_done(_: Future) -> None:
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+                self.pending -= 1
+                self._slot_freed.notify()
+                if any(map(_failed, futures)):
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+        for future in futures:
+            future.add_done_callback(part_done)
+
+    def _land(
+        self,
+        flight: Tuple[Any, ...],
+        futures: Dict[str, Future],
+    ) -> None:
+        """Forget ``flight`` once all of its ``futures`` are done."""
+        remaining = [len(futures)]
+
+        def part_done(_: Future) -> None:
+            with self._lock:
+                remaining[0] -= 1
+                if not remaining[0]:
+                    self._flights.pop(flight, None)
+
+        for future in futures.values():
+            future.add_done_callback(part_done)
+
+    def _submit(
+        self,
+        *calls: Tuple[Callable[..., Any], tuple],
+    ) -> List[Future]:
+        """Submit ``calls`` for one reserved report and track their futures."""
+        try:
+            with self._lock:
+                try:
+                    pool = self._pool()
+                    futures = [pool.submit(calls[0][0], *calls[0][1])]
+                except BrokenProcessPool:
+                    logger.warning("Report worker pool broken; restarting it")
+                    self._executor = None
+                    pool = self._pool()
+                    futures = [pool.submit(calls[0][0], *calls[0][1])]
+                futures += [pool.submit(fn, *args) for fn, args in calls[1:]]
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+                self._slot_freed.notify()
+            raise
+        self._release(*futures)
+        return futures
+
+    def submit(
+        self,
+        analysis: Dict[str, Any],
+        complaint_info: Dict[str, str],
+        output_dir: str | Path = ".",
+        in_memory: bool = False,
+        formats: Sequence[str] = ("pdf", "excel"),
+        block: bool = False,
+    ) -> Dict[str, Future]:
+        """Queue rendering of one report and return a future per format.
+
+        ``formats`` selects the files to render (``pdf``, ``excel``). The
+        futures resolve to file paths, or to the files' bytes when
+        ``in_memory`` is set. Files are named by
+        :func:`~ReportGenerator.report_key`; if they exist in
+        ``output_dir`` already the futures are done at once, and while the
+        same report is rendering its futures are returned again.
+
+        Raises
+        ------
+        ReportQueueFullError
+            If ``max_pending`` reports are already queued or rendering,
+            unless ``block`` is set; the call then waits for a free slot.
+        """
+        renderers = {"pdf": render_pdf, "excel": render_excel}
+        unknown = set(formats) - set(renderers)
+        if unknown or not formats:
+            raise ValueError(f"Unknown report formats: {sorted(unknown)}")
+        key = report_key(analysis, complaint_info)
+        if in_memory:
+            paths = dict.fromkeys(formats)
+        else:
+            paths = report_paths(output_dir, key)
+        flight = (key, *((kind, paths[kind]) for kind in formats))
+        with self._lock:
+            shared = self._flights.get(flight)
+            if shared is not None:
+                self.coalesced += 1
+                return _follow(shared)
+            shared = {kind: Future() for kind in formats}
+            self._flights[flight] = shared
+            self._land(flight, shared)
+        try:
+            stored = None
+            if not in_memory:
+                stored = stored_report({k: paths[k] for k in formats})
+            if stored is None:
+                entries = report_entries(analysis)
+                info = dict(complaint_info)
+                self._reserve(block)
+                futures = self._submit(
+                    *(
+                        (renderers[kind], (entries, info, paths[kind]))
+                        for kind in formats
+                    )
+                )
+        except BaseException as exc:
+            for future in shared.values():
+                future.set_exception(exc)
+            raise
+        if stored is None:
+            for kind, future in zip(formats, futures):
+                _forward(future, shared[kind])
+        else:
+            with self._lock:
+                self.deduplicated += 1
+            for kind, future in shared.items():
+                future.set_result(stored[kind])
+        return _follow(shared)
+
+    async def generate(
+        self,
+        analysis: Dict[str, Any],
+        complaint_info: Dict[str, str],
+        output_dir: str | Path = ".",
+        in_memory: bool = False,
+        formats: Sequence[str] = ("pdf", "excel"),
+    ) -> Dict[str, Any]:
+        """Render a report in the pool and return its PDF and Excel paths.
+
+        Same result as :meth:`ReportGenerator.generate`, including the
+        bytes returned with ``in_memory``, limited to ``formats``;
+        rendering errors from the workers are re-raised.
+        """
+        futures = self.submit(
+            analysis,
+            complaint_info,
+            output_dir,
+            in_memory,
+            formats,
+        )
+        results = await asyncio.gather(
+            *(asyncio.wrap_future(future) for future in futures.values()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return dict(zip(futures, results))
+
+    def render(
+        self,
+        analysis: Dict[str, Any],
+        complaint_info: Dict[str, str],
+        output_dir: str | Path = ".",
+    ) -> Dict[str, Any]:
+        """Blocking variant of :meth:`generate` for worker threads.
+
+        Waits for a free slot when ``max_pending`` reports are queued
+        instead of raising :class:`ReportQueueFullError`, so batch jobs
+        slow down rather than fail under load.
+        """
+        futures = self.submit(analysis, complaint_info, output_dir, block=True)
+        return {kind: future.result() for kind, future in futures.items()}
+
+    async def export(
+        self,
+        reports: Sequence[ReportItem],
+        output_dir: str | Path = ".",
+        layout: str = "rows",
+    ) -> Dict[str, Any]:
+        """Export ``reports`` into one workbook in a worker process.
+
+        Counts as one report for ``max_pending``; see
+        :meth:`ReportGenerator.export` for the result.
+        """
+        if layout not in EXPORT_LAYOUTS:
+            raise ValueError(f"Unknown export layout: {layout}")
+        self._reserve()
+        try:
+            path = report_paths(output_dir)["excel"]
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+                self._slot_freed.notify()
+            raise
+        call = (export_workbook, (list(reports), path, layout))
+        (future,) = self._submit(call)
+        result = await asyncio.wrap_future(future)
+        return {
+            "excel": result["path"],
+            "reports": result["reports"],
+            "rows": result["rows"],
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """Return pool size and report counters."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "deduplicated": self.deduplicated,
+                "coalesced": self.coalesced,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes; a later report starts new ones."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_default: ReportPool | None = None
+_default_lock = threading.Lock()
+
+
+def default_report_pool() -> ReportPool:
+    """Return the process-wide pool configured by environment variables."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ReportPool()
+        return _default
+
+
+__all__ = ["ReportPool", "ReportQueueFullError", "default_report_pool"]
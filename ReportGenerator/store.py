@@ -0,0 +1,288 @@
+"""Bounded, sharded storage for generated report files.
+
+:class:`ReportStore` hands out the directory new reports are written to and
+removes old ones. Directories are sharded by day and a random two-digit hex
+prefix (``2026-10-17/3f/``), so one directory holds about 1/256 of a day's
+reports. Content-addressed reports are found again by their key on any
+day, so they live in the ``keyed/`` shard named by the first two
+characters of the key (``keyed/3f/``) instead.
+
+:meth:`ReportStore.sweep` deletes ``report_*`` files older than
+``max_age``, judged by their modification time, and then the oldest files
+until at most ``max_files`` files and ``max_bytes`` bytes remain;
+:meth:`ReportStore.start` runs it periodically in a background thread.
+
+The process-wide store returned by :func:`default_report_store` reads:
+
+``REPORT_MAX_AGE_DAYS``
+    Days reports are kept (default :data:`DEFAULT_MAX_AGE_DAYS`, ``0``,
+    keeps them forever).
+
+With none of the limits set, nothing is ever deleted and the API does not
+start the sweeper.
+``REPORT_MAX_MB``
+    Total size of stored reports in MiB (default ``0``, unlimited).
+``REPORT_MAX_FILES``
+    Number of stored report files (default ``0``, unlimited).
+``REPORT_SWEEP_INTERVAL``
+    Seconds between sweeps (default ``300``).
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+import logging
+import os
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REPORT_DIR = Path(__file__).resolve().parents[1] / "reports"
+REPORT_PREFIX = "report_"
+# Directory below the root holding the shards of content-addressed reports
+KEYED_DIR = "keyed"
+# Retention of the process-wide store unless ``REPORT_MAX_AGE_DAYS`` is set;
+# ``0`` keeps reports forever so upgrading never deletes existing files
+DEFAULT_MAX_AGE_DAYS = 0
+
+Stored = Tuple[float, int, str]
+
+
+class ReportStore:
+    """Report directory with size, count and age limits.
+
+    Parameters
+    ----------
+    root:
+        Directory holding the reports; created if missing.
+    max_age:
+        Seconds a report is kept; ``None`` keeps reports regardless of age.
+    max_bytes, max_files:
+        Limits for all stored reports together; ``None`` means unlimited.
+    sweep_interval:
+        Seconds between sweeps of the background thread.
+    """
+
+    def __init__(
+        self,
+        root: str | Path = REPORT_DIR,
+        max_age: float | None = None,
+        max_bytes: int | None = None,
+        max_files: int | None = None,
+        sweep_interval: float = 300,
+    ) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.sweep_interval = sweep_interval
+        self._stats = {
+            "files": 0,
+            "bytes": 0,
+            "removed": 0,
+            "freed": 0,
+            "sweeps": 0,
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def limited(self) -> bool:
+        """Whether any limit is set, i.e. sweeping can remove files."""
+        limits = (self.max_age, self.max_bytes, self.max_files)
+        return any(limit is not None for limit in limits)
+
+    def directory(
+        self,
+        day: date | None = None,
+        key: str | None = None,
+    ) -> Path:
+        """Create and return a shard directory for new reports.
+
+        Reports named by ``key`` (see :func:`~ReportGenerator.report_key`)
+        go to the :data:`KEYED_DIR` shard of its first two characters and
+        ``day`` is ignored, so a report requested again on a later day is
+        found in the same directory.
+        """
+        if key:
+            path = self.root / KEYED_DIR / key[:2]
+        else:
+            day = day or date.today()
+            path = self.root / day.isoformat() / secrets.token_hex(1)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def url_path(self, path: str | Path) -> str:
+        """Return ``path`` relative to the store root, using ``/``.
+
+        Paths outside the root are reduced to their file name.
+        """
+        path = Path(path)
+        try:
+            return path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return path.name
+
+    def _files(self) -> List[Stored]:
+        found: List[Stored] = []
+        stack = [str(self.root)]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.startswith(REPORT_PREFIX):
+                        stat = entry.stat(follow_symlinks=False)
+                        found.append((stat.st_mtime, stat.st_size, entry.path))
+                except FileNotFoundError:
+                    continue
+        return found
+
+    def _prune_directories(self, today: str) -> None:
+        # Today's shards stay: reports may be about to be written into them.
+        # Keyed shards are reused on every day and stay for the same reason.
+        for day_dir in self.root.iterdir():
+            name = day_dir.name
+            if not day_dir.is_dir() or name == KEYED_DIR or name >= today:
+                continue
+            for shard in day_dir.iterdir():
+                if shard.is_dir():
+                    try:
+                        shard.rmdir()
+                    except OSError:
+                        pass
+            try:
+                day_dir.rmdir()
+            except OSError:
+                pass
+
+    def sweep(self, now: float | None = None) -> Dict[str, int]:
+        """Delete expired reports, then the oldest ones beyond the limits.
+
+        Returns the number of ``removed`` files, the ``freed`` bytes and
+        the ``files`` and ``bytes`` that remain.
+        """
+        now = time.time() if now is None else now
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        removed = freed = 0
+        for mtime, size, path in files:
+            count = len(files) - removed
+            expired = self.max_age is not None and now - mtime > self.max_age
+            too_many = self.max_files is not None and count > self.max_files
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or too_many or too_big):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.exception("Could not remove report %s", path)
+                continue
+            reason = "expired" if expired else "over limit"
+            logger.info("Removed report %s (%s)", path, reason)
+            removed += 1
+            freed += size
+            total -= size
+        self._prune_directories(datetime.fromtimestamp(now).date().isoformat())
+        result = {
+            "removed": removed,
+            "freed": freed,
+            "files": len(files) - removed,
+            "bytes": total,
+        }
+        with self._lock:
+            self._stats["files"] = result["files"]
+            self._stats["bytes"] = total
+            self._stats["removed"] += removed
+            self._stats["freed"] += freed
+            self._stats["sweeps"] += 1
+        if removed:
+            logger.info("Removed %d old reports (%d bytes)", removed, freed)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Return files and bytes kept by the last sweep and totals removed."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Report sweep failed")
+            self._stop.wait(self.sweep_interval)
+
+    def start(self) -> None:
+        """Sweep now and then every ``sweep_interval`` seconds in a thread."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="report-sweeper", daemon=True
+            )
+            self._thread.start()
+        logger.info(
+            "Sweeping reports in %s: max_age=%ss max_bytes=%s max_files=%s",
+            self.root,
+            self.max_age,
+            self.max_bytes,
+            self.max_files,
+        )
+
+    def stop(self) -> None:
+        """Stop the background sweeper."""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+
+_default: ReportStore | None = None
+_default_lock = threading.Lock()
+
+
+def default_report_store() -> ReportStore:
+    """Return the process-wide store configured by environment variables.
+
+    The store is only created here; its sweeper runs once
+    :meth:`ReportStore.start` is called, which the API does on startup.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            days = os.getenv("REPORT_MAX_AGE_DAYS", str(DEFAULT_MAX_AGE_DAYS))
+            max_age = float(days) * 86400
+            max_mb = float(os.getenv("REPORT_MAX_MB", "0"))
+            max_files = int(os.getenv("REPORT_MAX_FILES", "0"))
+            interval = os.getenv("REPORT_SWEEP_INTERVAL", "300")
+            _default = ReportStore(
+                REPORT_DIR,
+                max_age=max_age or None,
+                max_bytes=int(max_mb * 2**20) or None,
+                max_files=max_files or None,
+                sweep_interval=float(interval),
+            )
+        return _default
+
+
+__all__ = [
+    "DEFAULT_MAX_AGE_DAYS",
+    "KEYED_DIR",
+    "REPORT_DIR",
+    "ReportStore",
+    "default_report_store",
+]
@@ -4,62 +4,129 @@ from __future__ import annotations
 
 import os
 import logging
-from pathlib import Path
+from functools import lru_cache
+from string import Formatter
+from typing import FrozenSet
+
+from LLMAnalyzer.budget import PromptBudget, default_budget
+from LLMAnalyzer.cache import ResponseCache, default_cache
+from LLMAnalyzer.metrics import method_context
+from LLMAnalyzer.query import LLMQuery
+from LLMAnalyzer.resilience import Resilience, default_resilience
+from PromptManager import PromptManager, compile_format
+
+# Bundled review prompt in ``Prompts/``
+REVIEW_PROMPT = "Fixer_General_Prompt.md"
+
+
+# Budgeted template fields in priority order with their token caps;
+# ``0`` leaves the report uncapped so only the overall budget shortens it
+REVIEW_FIELDS = (
+    ("initial_report_text", 0),
+    ("subject", 200),
+    ("customer", 100),
+    ("part_code", 100),
+    ("guideline_json", 1500),
+)
 
 
 class ReviewLLMError(RuntimeError):
     """Raised when the review LLM cannot be used."""
 
 
-class Review:
+@lru_cache(maxsize=32)
+def _placeholders(template: str) -> FrozenSet[str]:
+    """Return the ``str.format`` field names used by ``template``."""
+    return frozenset(
+        name for _, name, _, _ in Formatter().parse(template) if name
+    )
+
+
+class Review(LLMQuery):
     """Reviews generated reports or analysis results."""
 
-    def __init__(self, model: str | None = None, template_path: str | None = None) -> None:
-        """Initialize with optional LLM model name and prompt template."""
+    label = "Review"
+    component = "review"
+    error = ReviewLLMError
+    placeholder = "LLM review placeholder for: {prompt}"
+
+    def __init__(
+        self,
+        model: str | None = None,
+        template_path: str | None = None,
+        cache: ResponseCache | None = None,
+        resilience: Resilience | None = None,
+        budget: PromptBudget | None = None,
+    ) -> None:
+        """Initialize with optional LLM model name and prompt template.
+
+        ``template_path`` defaults to ``Prompts/Fixer_General_Prompt.md``,
+        which is loaded through the shared prompt registry.
+        Successful answers are stored in ``cache``, by default the
+        process-wide LLM response cache when it is enabled. Requests go
+        through ``resilience``, by default the process-wide retry and
+        circuit breaker settings. Prompts are fitted to ``budget``, by
+        default the process-wide prompt token budget.
+        """
         if model is None:
             model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
         self.model = model
+        self.cache = cache if cache is not None else default_cache()
+        self.resilience = (
+            resilience if resilience is not None else default_resilience()
+        )
+        self.budget = budget if budget is not None else default_budget()
         self.logger = logging.getLogger(__name__)
 
-        if template_path is None:
-            base_dir = Path(__file__).resolve().parents[1] / "Prompts"
-            template_path = base_dir / "Fixer_General_Prompt.md"
-        with open(template_path, "r", encoding="utf-8") as file:
-            self.template = file.read()
+        self.prompt_manager = PromptManager()
+        # An explicit template is read once; the bundled one comes from the
+        # prompt registry and follows edits of its file
+        self._template: str | None = None
+        if template_path is not None:
+            prompt_manager = self.prompt_manager
+            self._template = prompt_manager.load_text_prompt(template_path)
+
+    @property
+    def template(self) -> str:
+        """Return the review prompt template."""
+        if self._template is not None:
+            return self._template
+        prompt = self.prompt_manager.registry.get(REVIEW_PROMPT)
+        if prompt is None:
+            raise FileNotFoundError(
+                str(self.prompt_manager.registry.base_dir / REVIEW_PROMPT)
+            )
+        return prompt.source
+
+    def _cache_key(self, prompt: str) -> str | None:
+        if self.cache is None:
+            return None
+        return ResponseCache.key(self.model, "", prompt)
 
     def _query_llm(self, prompt: str) -> str:
         """Return the LLM response for the given prompt."""
-        self.logger.debug("Review._query_llm start")
-        try:
-            from openai import OpenAI  # type: ignore
-        except ImportError as exc:  # pragma: no cover - optional dependency
-            raise ReviewLLMError("openai package is not installed") from exc
-
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ReviewLLMError("OPENAI_API_KEY not set")
-        client = OpenAI(api_key=api_key)
-
-        try:
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
-            if tokens is not None:
-                self.logger.info("Review tokens used: %s", tokens)
-            result = response.choices[0].message.content.strip()
-            self.logger.debug("Review._query_llm end")
-            return result
-        except Exception as exc:  # pragma: no cover - network issues
-            if "invalid" in str(exc).lower() or "incorrect" in str(exc).lower():
-                raise ReviewLLMError("Invalid OpenAI API key") from exc
-            self.logger.error("Review error: %s", exc)
-            self.logger.debug("Review._query_llm end")
-            return f"LLM review placeholder for: {prompt[:50]}"
+        return self._complete(
+            self.resilience.call,
+            [{"role": "user", "content": prompt}],
+            self._cache_key(prompt),
+            prompt,
+        )
+
+    async def _aquery_llm(self, prompt: str) -> str:
+        """Asynchronous variant of :meth:`_query_llm`."""
+        return await self._acomplete(
+            self.resilience.acall,
+            [{"role": "user", "content": prompt}],
+            self._cache_key(prompt),
+            prompt,
+        )
 
     def _build_prompt(self, text: str, **context: str) -> str:
-        """Return the review prompt filled with context and text."""
+        """Return the review prompt filled with context and text.
+
+        Fields used by the template are fitted to ``budget``: the guideline
+        JSON is compacted and shortened first, the report text last.
+        """
         params = {
             "method": context.get("method", ""),
             "customer": context.get("customer", ""),
@@ -69,7 +136,19 @@ class Review:
             "guideline_json": context.get("guideline_json", ""),
             "language": context.get("language", ""),
         }
-        return self.template.format(**params)
+        template = self.template
+        placeholders = _placeholders(template)
+        fields = [
+            (name, params[name], cap)
+            for name, cap in REVIEW_FIELDS
+            if name in placeholders
+        ]
+        compiled = compile_format(template)
+        overhead = compiled.render(
+            **{**params, **{name: "" for name, _, _ in fields}}
+        )
+        params.update(self.budget.fit(overhead, fields, prompt="review"))
+        return compiled.render(**params)
 
     def perform(self, text: str, **context: str) -> str:
         """Return a reviewed version of ``text``.
@@ -78,7 +157,14 @@ class Review:
         response language.
         """
         prompt = self._build_prompt(text, **context)
-        return self._query_llm(prompt)
+        with method_context(context.get("method", "")):
+            return self._query_llm(prompt)
+
+    async def perform_async(self, text: str, **context: str) -> str:
+        """Asynchronous variant of :meth:`perform` using ``AsyncOpenAI``."""
+        prompt = self._build_prompt(text, **context)
+        with method_context(context.get("method", "")):
+            return await self._aquery_llm(prompt)
 
 
-__all__ = ["Review", "ReviewLLMError"]
+__all__ = ["REVIEW_PROMPT", "Review", "ReviewLLMError"]
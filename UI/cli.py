@@ -5,21 +5,30 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import logging
 
-from GuideManager import GuideManager
+from BatchAnalyzer import BatchAnalyzer, claims_to_details
+from GuideManager import GuideManager, GuideNotFoundError
 from LLMAnalyzer import LLMAnalyzer
 from ReportGenerator import ReportGenerator
 from Review import Review
-from ComplaintSearch import ComplaintStore
+from ComplaintSearch import ComplaintStore, ExcelClaimsSearcher, map_filters
 
 
 METHODS = ["8D", "5N1K", "A3", "DMAIC", "Ishikawa"]
 
 
-def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
-    """Return CLI arguments."""
+def claims_filter(value: str) -> Tuple[str, str]:
+    """Return the ``(field, value)`` pair of a ``--filter FIELD=VALUE``."""
+    field, sep, text = value.partition("=")
+    if not sep or not field.strip():
+        raise argparse.ArgumentTypeError(f"expected FIELD=VALUE: {value!r}")
+    return field.strip(), text
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the CLI argument parser."""
     parser = argparse.ArgumentParser(description="Quality Reporter CLI")
     parser.add_argument("--complaint", "-c", help="Complaint text")
     parser.add_argument("--method", "-m", choices=METHODS, help="Reporting method")
@@ -29,13 +38,44 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     parser.add_argument("--part-code", help="Related part code")
     parser.add_argument("--directives", help="Additional user directives")
     parser.add_argument("--search", help="Search past complaints")
-    return parser.parse_args(args)
+    parser.add_argument(
+        "--batch", help="JSON file with a list of complaint details to report"
+    )
+    parser.add_argument(
+        "--claims",
+        action="store_true",
+        help="Report complaints selected from the claims workbook",
+    )
+    parser.add_argument(
+        "--filter",
+        action="append",
+        default=[],
+        type=claims_filter,
+        metavar="FIELD=VALUE",
+        help="Claims filter, may be repeated",
+    )
+    parser.add_argument("--year", type=int, help="Claims year")
+    parser.add_argument(
+        "--limit", type=int, default=100, help="Maximum number of claims"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Number of complaints processed at the same time in a batch",
+    )
+    return parser
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Return CLI arguments."""
+    return build_parser().parse_args(args)
 
 
 def main(args: Optional[List[str]] = None) -> None:
     """Run the CLI application."""
     logging.basicConfig(level=logging.INFO)
-    options = parse_args(args)
+    parser = build_parser()
+    options = parser.parse_args(args)
 
     if options.search:
         store = ComplaintStore()
@@ -43,6 +83,10 @@ def main(args: Optional[List[str]] = None) -> None:
         print(json.dumps(results, ensure_ascii=False, indent=2))
         return
 
+    if options.batch or options.claims:
+        run_batch(options, parser)
+        return
+
     complaint = options.complaint or input("Complaint text: ")
     method = options.method or input(f"Method ({', '.join(METHODS)}): ")
     customer = options.customer or input("Customer: ")
@@ -100,5 +144,56 @@ def main(args: Optional[List[str]] = None) -> None:
     print(f"Excel report: {paths['excel']}")
 
 
+def _read_batch(path: str, parser: argparse.ArgumentParser) -> List[dict]:
+    """Return the complaint details listed in the ``--batch`` file."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            items = json.load(f)
+    except (OSError, ValueError) as exc:
+        parser.error(f"--batch: cannot read {path}: {exc}")
+    invalid = f"--batch: {path} must contain a JSON list of objects"
+    if not isinstance(items, list):
+        parser.error(invalid)
+    if not all(isinstance(item, dict) for item in items):
+        parser.error(invalid)
+    return items
+
+
+def run_batch(
+    options: argparse.Namespace,
+    parser: Optional[argparse.ArgumentParser] = None,
+) -> None:
+    """Report every complaint of ``--batch`` or the selected claims.
+
+    Unreadable batch files and unknown methods are reported as usage
+    errors of ``parser``.
+    """
+    parser = parser or build_parser()
+    items: List[dict] = []
+    if options.batch:
+        items.extend(_read_batch(options.batch, parser))
+    method = options.method or input(f"Method ({', '.join(METHODS)}): ")
+    manager = GuideManager()
+    try:
+        manager.get_format(method)
+    except GuideNotFoundError:
+        choices = ", ".join(METHODS)
+        parser.error(f"unknown method {method!r} (choose from {choices})")
+    if options.claims:
+        filters = map_filters(dict(options.filter))
+        rows = ExcelClaimsSearcher().search(filters, options.year)
+        items.extend(claims_to_details(rows[: options.limit]))
+
+    batch = BatchAnalyzer(
+        manager,
+        LLMAnalyzer(),
+        Review(),
+        ReportGenerator(manager),
+        concurrency=options.concurrency,
+    )
+    result = batch.run(items, method, options.output, options.directives or "")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
 if __name__ == "__main__":
     main()
@@ -6,26 +6,62 @@ used by the Quality Reporter service.
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 from pathlib import Path
+from uuid import uuid4
+import json
 import logging
+import math
+import os
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from GuideManager import GuideManager
+from BatchAnalyzer import BatchAnalyzer, claims_to_details
+from GuideManager import GuideManager, GuideNotFoundError
 from LLMAnalyzer import LLMAnalyzer
+from LLMAnalyzer.metrics import default_registry
+from LLMAnalyzer.resilience import CircuitOpenError, is_transient, retry_after
 from Review import Review
-from ReportGenerator import ReportGenerator
-from ComplaintSearch import ComplaintStore, ExcelClaimsSearcher, normalize_text
+from ReportGenerator import ReportGenerator, report_key, report_zip
+from ReportGenerator.pool import ReportQueueFullError, default_report_pool
+from ReportGenerator.store import default_report_store
+from ComplaintSearch import (
+    ALIAS_TO_HEADER,
+    ComplaintStore,
+    ExcelClaimsSearcher,
+    map_filters,
+    normalize_text,
+)
 from EightDScanner import EightDScanner
 
-REPORT_DIR = Path(__file__).resolve().parents[1] / "reports"
-REPORT_DIR.mkdir(parents=True, exist_ok=True)
+from .jobs import Job, JobConflictError, JobManager
+
+# Reports are sharded by day or report key and swept by a background thread
+_report_store = default_report_store()
+REPORT_DIR = _report_store.root
+
 
-app = FastAPI(title="Plasma QR API")
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Sweep old reports while the application is serving requests.
+
+    Importing this module starts nothing, so importing it never deletes
+    files; the sweeper stops again on shutdown.
+    """
+    if _report_store.limited:
+        _report_store.start()
+    try:
+        yield
+    finally:
+        _report_store.stop()
+
+
+app = FastAPI(title="Plasma QR API", lifespan=_lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -36,29 +72,56 @@ app.mount("/reports", StaticFiles(directory=str(REPORT_DIR)), name="reports")
 
 logger = logging.getLogger(__name__)
 
-# Map common query aliases to Excel header names
-ALIAS_TO_HEADER = {
-    normalize_text("customer"): "Müşteri Adı",
-    normalize_text("musteri"): "Müşteri Adı",
-    normalize_text("müşteri adı"): "Müşteri Adı",
-    normalize_text("musteri adi"): "Müşteri Adı",
-    normalize_text("subject"): "Hata Tanımı - Kök Neden",
-    normalize_text("konu"): "Konu",
-    normalize_text("hata tanımı - kök neden"): "Hata Tanımı - Kök Neden",
-    normalize_text("part_code"): "Parça Numarası",
-    normalize_text("parca kodu"): "Parça Numarası",
-    normalize_text("parça kodu"): "Parça Numarası",
-    normalize_text("parça numarası"): "Parça Numarası",
-}
+# Browsers may reuse a guide this long before revalidating it with its ETag
+GUIDE_CACHE_CONTROL = "public, max-age={}, must-revalidate".format(
+    int(os.getenv("GUIDE_CACHE_MAX_AGE", "60"))
+)
 
 # Shared component instances
 _guide_manager = GuideManager()
 analyzer = LLMAnalyzer()
 reviewer = Review()
 reporter = ReportGenerator(_guide_manager)
+_report_pool = default_report_pool()
 _store = ComplaintStore()
 _excel_searcher = ExcelClaimsSearcher()
 _scanner = EightDScanner(Path(__file__).resolve().parents[1] / "eight_d_reports")
+_jobs = JobManager()
+_metrics = default_registry()
+_metrics.register_stats("llm_resilience", analyzer.resilience.stats)
+if analyzer.cache is not None:
+    _metrics.register_stats("llm_cache", analyzer.cache.stats)
+_metrics.register_stats("report_pool", _report_pool.stats)
+_metrics.register_stats("report_store", _report_store.stats)
+_batch = BatchAnalyzer(
+    _guide_manager,
+    analyzer,
+    reviewer,
+    reporter,
+    pool=_report_pool,
+)
+# Batches queue behind each other; each one runs ``_batch.concurrency`` items
+_batch_jobs = JobManager()
+
+
+def _llm_error(exc: Exception) -> HTTPException:
+    """Return the HTTP error answering the failed LLM request ``exc``.
+
+    Outages the resilience layer gave up on, an open circuit breaker or
+    transient upstream errors, are ``503`` with ``Retry-After``; anything
+    else is ``500``.
+    """
+    cause = exc.__cause__
+    if isinstance(cause, CircuitOpenError) or (
+        cause is not None and is_transient(cause)
+    ):
+        delay = retry_after(cause) or analyzer.resilience.breaker.reset_timeout
+        return HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(max(1, math.ceil(delay)))},
+        )
+    return HTTPException(status_code=500, detail=str(exc))
 
 
 class AnalyzeBody(BaseModel):
@@ -69,36 +132,164 @@ class AnalyzeBody(BaseModel):
 
 
 @app.post("/analyze")
-def analyze(body: AnalyzeBody) -> Dict[str, Any]:
+async def analyze(body: AnalyzeBody) -> Dict[str, Any]:
     """Return analysis results from ``LLMAnalyzer``."""
     logger.info("Analyze request body: %s", body.dict())
     try:
-        result = analyzer.analyze(
+        result = await analyzer.analyze_async(
             body.details,
             body.guideline,
             body.directives,
             body.language,
         )
-    except Exception as exc:  # pragma: no cover - unexpected failure
+    except Exception as exc:
         logger.exception("Analyze failed")
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+        raise _llm_error(exc) from exc
     logger.info("Analyze result: %s", result)
     return result
 
 
+def _sse(event: str, data: Any) -> str:
+    """Return one server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(body: AnalyzeBody) -> StreamingResponse:
+    """Stream analysis progress from ``LLMAnalyzer`` as server-sent events.
+
+    ``token`` events carry answer chunks of single-prompt methods, ``step``
+    events completed steps of multi-step methods and the final ``done``
+    event the complete result. Failures before the first event are answered
+    like those of ``/analyze``; later ones are reported as an ``error``
+    event.
+    """
+    logger.info("Analyze stream request body: %s", body.dict())
+    events = analyzer.analyze_stream(
+        body.details,
+        body.guideline,
+        body.directives,
+        body.language,
+    )
+    try:
+        first = await events.__anext__()
+    except Exception as exc:
+        logger.exception("Analyze stream failed")
+        raise _llm_error(exc) from exc
+
+    async def frames() -> AsyncIterator[str]:
+        yield _sse(*first)
+        try:
+            async for event, data in events:
+                if event == "done":
+                    logger.info("Analyze stream result: %s", data)
+                yield _sse(event, data)
+        except Exception as exc:
+            logger.exception("Analyze stream failed")
+            yield _sse("error", {"detail": str(exc)})
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class BatchBody(BaseModel):
+    method: str
+    items: List[Dict[str, Any]] = []
+    filters: Dict[str, str] = {}
+    year: Optional[int] = None
+    start_year: Optional[int] = None
+    end_year: Optional[int] = None
+    limit: int = Field(100, ge=1, le=1000)
+    directives: str = ""
+    language: str = "Türkçe"
+
+
+def _report_url(path: Optional[str]) -> Optional[str]:
+    return f"/reports/{_report_store.url_path(path)}" if path else None
+
+
+def _report_urls(paths: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Return the URLs of the ``pdf`` and ``excel`` files in ``paths``."""
+    return {kind: _report_url(paths[kind]) for kind in ("pdf", "excel")}
+
+
+def _public_batch(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Return batch ``state`` with report paths turned into URLs."""
+    items = [{**item, **_report_urls(item)} for item in state["items"]]
+    return {**state, "items": items}
+
+
+@app.post("/analyze/batch", status_code=202)
+def analyze_batch(body: BatchBody) -> Dict[str, Any]:
+    """Start analyzing, reviewing and reporting many complaints.
+
+    Complaints are given as ``items`` or selected from the claims workbook
+    with ``filters`` and the year fields (at most ``limit`` rows). The job
+    id is returned at once; ``GET /analyze/batch/{job_id}`` reports the
+    status of every item.
+    """
+    logger.info("Analyze batch request body: %s", body.dict())
+    items = list(body.items)
+    if body.filters or any(
+        y is not None for y in (body.year, body.start_year, body.end_year)
+    ):
+        rows = _excel_searcher.search(
+            map_filters(body.filters),
+            body.year,
+            start_year=body.start_year,
+            end_year=body.end_year,
+        )
+        items.extend(claims_to_details(rows[: body.limit]))
+    if not items:
+        raise HTTPException(status_code=400, detail="No complaints to analyze")
+    try:
+        _guide_manager.get_format(body.method)
+    except GuideNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    def run(job: Job) -> Dict[str, Any]:
+        state = _batch.run(
+            items,
+            body.method,
+            _report_store.directory(),
+            body.directives,
+            body.language,
+            progress=lambda p: job.update(_public_batch(p)),
+        )
+        return {k: v for k, v in state.items() if k != "items"}
+
+    job = _batch_jobs.submit("analyze_batch", run)
+    result = {"status": job.status, "job_id": job.id, "total": len(items)}
+    logger.info("Analyze batch job started: %s", result)
+    return result
+
+
+@app.get("/analyze/batch/{job_id}")
+def analyze_batch_status(job_id: str) -> Dict[str, Any]:
+    """Return status and per-item progress of the batch job ``job_id``."""
+    job = _batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job.to_dict()
+
+
 class ReviewBody(BaseModel):
     text: str
     context: Dict[str, str] = {}
 
 
 @app.post("/review")
-def review(body: ReviewBody) -> Dict[str, str]:
+async def review(body: ReviewBody) -> Dict[str, str]:
     """Return reviewed text using ``Review``."""
     logger.info("Review request body: %s", body.dict())
     try:
-        result = reviewer.perform(body.text, **body.context)
-    except Exception as exc:  # pragma: no cover - network issues
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+        result = await reviewer.perform_async(body.text, **body.context)
+    except Exception as exc:
+        logger.exception("Review failed")
+        raise _llm_error(exc) from exc
     logger.info("Review result: %s", result)
     return {"result": result}
 
@@ -109,23 +300,122 @@ class ReportBody(BaseModel):
     output_dir: str = "."
 
 
-@app.post("/report")
-def report(body: ReportBody) -> Dict[str, str]:
-    """Generate PDF and Excel reports via ``ReportGenerator``."""
+# ``format`` query values of inline reports
+INLINE_FORMATS = {
+    "pdf": ("pdf", "application/pdf"),
+    "xlsx": (
+        "excel",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+    "zip": (None, "application/zip"),
+}
+
+
+@app.post("/report", response_model=None)
+async def report(
+    body: ReportBody,
+    inline: bool = Query(False),
+    fmt: str = Query("zip", alias="format", pattern="^(pdf|xlsx|zip)$"),
+) -> Dict[str, str] | Response:
+    """Generate PDF and Excel reports in the report worker pool.
+
+    By default both files are stored in ``reports/`` and their URLs are
+    returned; the same report requested again on the same day returns the
+    same files. With ``inline=1`` nothing is written to disk: the response
+    body is the PDF, the workbook or a zip of both, as chosen by
+    ``format``. Returns ``503`` with ``Retry-After`` when the pool already
+    has ``REPORT_MAX_PENDING`` reports to render.
+    """
     logger.info("Report request body: %s", body.dict())
+    kind, media_type = INLINE_FORMATS[fmt]
     try:
-        paths = reporter.generate(body.analysis, body.complaint_info, REPORT_DIR)
+        if inline:
+            files = await _report_pool.generate(
+                body.analysis,
+                body.complaint_info,
+                in_memory=True,
+                formats=(kind,) if kind else ("pdf", "excel"),
+            )
+        else:
+            key = report_key(body.analysis, body.complaint_info)
+            output_dir = _report_store.directory(key=key)
+            paths = await _report_pool.generate(
+                body.analysis, body.complaint_info, output_dir
+            )
+    except ReportQueueFullError as exc:
+        logger.warning("Report rejected: %s", exc)
+        raise HTTPException(
+            status_code=503,
+            detail="Report queue is full",
+            headers={"Retry-After": "1"},
+        ) from exc
     except Exception as exc:  # pragma: no cover - unexpected failure
         logger.exception("Report generation failed")
-        raise HTTPException(status_code=500, detail="Report generation failed") from exc
-    result = {
-        "pdf": f"/reports/{Path(paths['pdf']).name}",
-        "excel": f"/reports/{Path(paths['excel']).name}",
-    }
+        raise HTTPException(
+            status_code=500,
+            detail="Report generation failed",
+        ) from exc
+    if inline:
+        name = f"report_{uuid4().hex}"
+        content = files[kind] if kind else report_zip(files, name)
+        logger.info("Report result: %d bytes inline as %s", len(content), fmt)
+        disposition = f'attachment; filename="{name}.{fmt}"'
+        return Response(
+            content,
+            media_type=media_type,
+            headers={"Content-Disposition": disposition},
+        )
+    result = _report_urls(paths)
     logger.info("Report result: %s", result)
     return result
 
 
+class ReportItemBody(BaseModel):
+    analysis: Dict[str, Any]
+    complaint_info: Dict[str, str] = {}
+
+
+class BulkReportBody(BaseModel):
+    items: List[ReportItemBody] = Field(..., min_length=1)
+    layout: str = Field("rows", pattern="^(rows|sheets)$")
+
+
+@app.post("/report/bulk")
+async def report_bulk(body: BulkReportBody) -> Dict[str, Any]:
+    """Export many analyses into one Excel workbook.
+
+    ``layout`` ``rows`` writes a single sheet with one row per step,
+    ``sheets`` one sheet per analysis. The workbook is streamed to disk in
+    the report worker pool, which answers ``503`` when it is full.
+    """
+    logger.info(
+        "Bulk report request: %d items, layout %s",
+        len(body.items),
+        body.layout,
+    )
+    reports = [(item.analysis, item.complaint_info) for item in body.items]
+    try:
+        result = await _report_pool.export(
+            reports, _report_store.directory(), body.layout
+        )
+    except ReportQueueFullError as exc:
+        logger.warning("Bulk report rejected: %s", exc)
+        raise HTTPException(
+            status_code=503,
+            detail="Report queue is full",
+            headers={"Retry-After": "1"},
+        ) from exc
+    except Exception as exc:  # pragma: no cover - unexpected failure
+        logger.exception("Bulk report generation failed")
+        raise HTTPException(
+            status_code=500,
+            detail="Report generation failed",
+        ) from exc
+    result = {**result, "excel": _report_url(result["excel"])}
+    logger.info("Bulk report result: %s", result)
+    return result
+
+
 @app.get("/complaints")
 def complaints(
     request: Request,
@@ -141,13 +431,7 @@ def complaints(
     filters: Dict[str, str] = {
         k: v for k, v in request.query_params.items() if k not in known
     }
-    normalized: Dict[str, str] = {}
-    for key, val in filters.items():
-        norm = normalize_text(key)
-        mapped = ALIAS_TO_HEADER.get(norm, key)
-        if isinstance(val, str):
-            val = val.strip()
-        normalized[mapped] = val
+    normalized = map_filters(filters)
     excel_results = []
     if normalized or year is not None or start_year is not None or end_year is not None:
         excel_results = _excel_searcher.search(
@@ -188,27 +472,108 @@ def options(field: str, request: Request) -> Dict[str, Any]:
     return result
 
 
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = {tag.strip() for tag in header.split(",")}
+    return etag in tags or f"W/{etag}" in tags
+
+
 @app.get("/guide/{method}")
-def guide(method: str, request: Request) -> Dict[str, Any]:
-    """Return guideline data for ``method``."""
+def guide(method: str, request: Request) -> Response:
+    """Return guideline data for ``method``.
+
+    The pre-serialized guide is sent with an ``ETag``; a request whose
+    ``If-None-Match`` matches it gets an empty ``304`` response.
+    """
     logger.info("Guide method: %s", method)
-    result = _guide_manager.get_format(method)
-    logger.debug("Guide result: %s", result)
-    return result
+    try:
+        entry = _guide_manager.get_entry(method)
+    except GuideNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Guide not found") from exc
+    headers = {"ETag": entry.etag, "Cache-Control": GUIDE_CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        logger.debug("Guide result: %s not modified", method)
+        return Response(status_code=304, headers=headers)
+    logger.debug("Guide result: %s", entry.data)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
 
+def _run_scan(job: Job) -> Dict[str, Any]:
+    summary = _scanner.scan(progress=job.update)
+    logger.info("Scan job %s result: %s", job.id, summary)
+    return summary
 
-@app.post("/scan_8d")
+
+@app.post("/scan_8d", status_code=202)
 def scan_8d() -> Dict[str, Any]:
-    """Scan 8D Excel reports and store rows in SQLite."""
+    """Start scanning new or changed 8D Excel reports in the background.
+
+    Only one scan runs at a time; while it is active further requests are
+    answered with ``409`` and the id of the running job.
+    """
     logger.info("Scanning 8D reports")
     try:
-        count = _scanner.scan()
-    except Exception as exc:  # pragma: no cover - unexpected failure
-        logger.exception("Scan failed")
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
-    result = {"status": "ok", "count": count}
-    logger.info("Scan result: %s", result)
+        job = _jobs.submit("scan_8d", _run_scan, exclusive=True)
+    except JobConflictError as exc:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "A scan is already running",
+                "job_id": exc.job.id,
+            },
+        ) from exc
+    result = {"status": job.status, "job_id": job.id}
+    logger.info("Scan job started: %s", result)
     return result
 
 
-__all__ = ["app", "scan_8d"]
+@app.get("/scan_8d/{job_id}")
+def scan_8d_status(job_id: str) -> Dict[str, Any]:
+    """Return status and progress of the scan job ``job_id``."""
+    job = _jobs.get(job_id)
+    if job is None or job.kind != "scan_8d":
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job.to_dict()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Return LLM latency, token, retry and cache metrics for Prometheus."""
+    return PlainTextResponse(
+        _metrics.render(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@app.get("/8d/search")
+def search_8d(
+    q: str = "",
+    material_code: Optional[str] = None,
+    customer: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+) -> Dict[str, Any]:
+    """Return scanned 8D rows matching ``q`` and the optional filters."""
+    logger.info(
+        "8D search q=%r material_code=%r customer=%r limit=%d",
+        q,
+        material_code,
+        customer,
+        limit,
+    )
+    results = _scanner.search(q, material_code, customer, limit)
+    logger.info("8D search returned %d rows", len(results))
+    return {"results": results}
+
+
+__all__ = [
+    "analyze_batch",
+    "analyze_batch_status",
+    "app",
+    "metrics",
+    "scan_8d",
+    "scan_8d_status",
+    "search_8d",
+]
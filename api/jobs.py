@@ -0,0 +1,125 @@
+"""In-process background jobs for long-running API operations."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from uuid import uuid4
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class JobConflictError(RuntimeError):
+    """Raised when an exclusive job of the same kind is still active."""
+
+    def __init__(self, job: "Job") -> None:
+        super().__init__(f"Job {job.id} is still {job.status}")
+        self.job = job
+
+
+class Job:
+    """State and progress of a single background job."""
+
+    def __init__(self, kind: str) -> None:
+        self.id = uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: str | None = None
+        self.started: float | None = None
+        self.finished: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Return ``True`` while the job is queued or running."""
+        return self.status in {"queued", "running"}
+
+    def update(self, progress: Dict[str, Any]) -> None:
+        """Merge ``progress`` into the reported progress values."""
+        with self._lock:
+            self.progress.update(progress)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable snapshot of the job."""
+        with self._lock:
+            progress = dict(self.progress)
+        elapsed = 0.0
+        if self.started is not None:
+            elapsed = (self.finished or time.monotonic()) - self.started
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "elapsed": round(elapsed, 3),
+            **progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Run jobs on a thread pool and keep their state for polling.
+
+    Only the most recent ``history`` jobs are remembered.
+    """
+
+    def __init__(self, max_workers: int = 1, history: int = 100) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        self._history = history
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        kind: str,
+        func: Callable[[Job], Any],
+        exclusive: bool = False,
+    ) -> Job:
+        """Schedule ``func(job)`` and return the new job.
+
+        When ``exclusive`` is ``True`` and another job of the same ``kind``
+        is still active, :class:`JobConflictError` is raised instead.
+        """
+        with self._lock:
+            if exclusive:
+                for other in self._jobs.values():
+                    if other.kind == kind and other.active:
+                        raise JobConflictError(other)
+            job = Job(kind)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.active:
+                    break
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def _run(self, job: Job, func: Callable[[Job], Any]) -> None:
+        job.started = time.monotonic()
+        job.status = "running"
+        try:
+            job.result = func(job)
+        except Exception as exc:
+            logger.exception("%s job %s failed", job.kind, job.id)
+            job.error = str(exc)
+            job.status = "failed"
+        else:
+            job.status = "done"
+        finally:
+            job.finished = time.monotonic()
+
+    def get(self, job_id: str) -> Job | None:
+        """Return the job with ``job_id`` if it is still remembered."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+__all__ = ["Job", "JobConflictError", "JobManager"]
@@ -0,0 +1,86 @@
+"""Benchmark serial and process-pool scanning of 8D report workbooks.
+
+A corpus of generated workbooks is scanned into a fresh database once per
+worker setting and the elapsed time is printed.
+
+Usage::
+
+    python benchmarks/bench_8d_scan.py --files 1000 --workers 1 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from openpyxl import Workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from EightDScanner import EightDScanner  # noqa: E402
+
+HEADERS = ["Malzeme Kodu", "Tanım", "Müşteri", "Kök Neden", "Kalıcı Aksiyon"]
+DEFECTS = ["Çatlak", "Çapak", "Ölçü hatası", "Renk farkı"]
+
+
+def make_corpus(directory: Path, files: int, rows: int, seed: int = 0) -> None:
+    """Write ``files`` workbooks with ``rows`` report lines each."""
+    rnd = random.Random(seed)
+    for number in range(files):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(HEADERS)
+        for _ in range(rows):
+            ws.append(
+                [
+                    f"E01A-{rnd.randint(0, 9999):04d}",
+                    rnd.choice(DEFECTS),
+                    rnd.choice(["DAIKIN", "FARPLAS", "ARCELIK"]),
+                    rnd.choice(["Kalıp aşınması", "Yanlış montaj", "Malzeme"]),
+                    rnd.choice(["Kalıp revizyonu", "Eğitim", "Poka-yoke"]),
+                ]
+            )
+        wb.save(directory / f"report_{number:05d}.xlsx")
+
+
+def main() -> None:
+    """Generate the corpus and time a full scan per worker count."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1]
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        corpus = Path(tmpdir) / "reports"
+        corpus.mkdir()
+        start = time.perf_counter()
+        make_corpus(corpus, args.files, args.rows)
+        elapsed = time.perf_counter() - start
+        print(f"generated {args.files} workbooks in {elapsed:.1f}s")
+
+        for workers in args.workers:
+            db_path = Path(tmpdir) / f"scan_{workers}.db"
+            scanner = EightDScanner(corpus, db_path, workers=workers)
+            start = time.perf_counter()
+            result = scanner.scan()
+            elapsed = time.perf_counter() - start
+            print(
+                f"workers={workers:<3} {elapsed:7.2f}s "
+                f"{args.files / elapsed:8.1f} files/s rows={result['rows']}"
+            )
+            start = time.perf_counter()
+            scanner.scan()
+            elapsed = time.perf_counter() - start
+            print(f"            rescan {elapsed:7.2f}s (unchanged)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Measure peak memory of exporting many analyses into one workbook.
+
+``before`` builds the workbook with a regular in-memory ``openpyxl``
+``Workbook`` the way ``ReportGenerator`` used to; ``after`` uses
+:func:`ReportGenerator.export_workbook` with a write-only workbook. Each
+variant runs in its own process so that its peak RSS
+(``ru_maxrss``) is measured alone; the baseline is the RSS after the
+imports, before any rows are written.
+
+Usage::
+
+    python benchmarks/bench_excel_export.py --rows 10000 --layout rows
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from openpyxl import Workbook  # noqa: E402
+
+from ReportGenerator import (  # noqa: E402
+    EXPORT_HEADER,
+    ReportItem,
+    export_workbook,
+    report_entries,
+)
+
+STEPS = 8
+SENTENCE = "Kök neden analizi: kalıp sıcaklığı düşük, çapak oluştu. "
+
+
+def reports(rows: int, chars: int) -> Iterator[ReportItem]:
+    text = (SENTENCE * (chars // 50 + 1))[:chars]
+    for n in range(rows // STEPS):
+        analysis = {
+            f"D{step}": {"response": f"{n}/{step} {text}"}
+            for step in range(1, STEPS + 1)
+        }
+        yield analysis, {
+            "customer": f"Müşteri {n % 50}",
+            "subject": "Çatlak",
+            "part_code": f"K{n}",
+        }
+
+
+def in_memory_export(
+    items: Iterator[ReportItem],
+    path: Path,
+    layout: str,
+) -> None:
+    wb = Workbook()
+    if layout == "rows":
+        ws = wb.active
+        ws.title = "Reports"
+        ws.append(EXPORT_HEADER)
+        for count, (analysis, info) in enumerate(items, 1):
+            for key, response in report_entries(analysis):
+                ws.append(
+                    [
+                        count,
+                        info.get("customer", ""),
+                        info.get("subject", ""),
+                        info.get("part_code", ""),
+                        key,
+                        response,
+                    ]
+                )
+    else:
+        wb.remove(wb.active)
+        for count, (analysis, info) in enumerate(items, 1):
+            ws = wb.create_sheet(f"Report {count}")
+            ws.append(["Customer", info.get("customer", "")])
+            ws.append(["Subject", info.get("subject", "")])
+            ws.append(["Part Code", info.get("part_code", "")])
+            ws.append([])
+            ws.append(["Step", "Response"])
+            for key, response in report_entries(analysis):
+                ws.append([key, response])
+    wb.save(str(path))
+
+
+def measure(
+    variant: str,
+    rows: int,
+    chars: int,
+    layout: str,
+) -> Dict[str, Any]:
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "export.xlsx"
+        start = time.perf_counter()
+        if variant == "before":
+            in_memory_export(reports(rows, chars), path, layout)
+        else:
+            export_workbook(reports(rows, chars), path, layout)
+        elapsed = time.perf_counter() - start
+        size = path.stat().st_size
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux
+    return {
+        "peak_mb": peak / 1024,
+        "growth_mb": (peak - baseline) / 1024,
+        "seconds": elapsed,
+        "file_mb": size / 2**20,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument(
+        "--chars", type=int, default=300, help="Characters per response"
+    )
+    parser.add_argument("--layout", choices=["rows", "sheets"], default="rows")
+    parser.add_argument(
+        "--variant", choices=["before", "after"], help=argparse.SUPPRESS
+    )
+    options = parser.parse_args()
+
+    if options.variant:
+        result = measure(
+            options.variant,
+            options.rows,
+            options.chars,
+            options.layout,
+        )
+        print(json.dumps(result))
+        return
+
+    print(
+        f"{options.rows} rows "
+        f"({options.rows // STEPS} analyses x {STEPS} steps), "
+        f"{options.chars} characters per response, layout {options.layout}"
+    )
+    print(
+        f"{'':8} {'peak RSS MB':>11} {'growth MB':>10} "
+        f"{'seconds':>8} {'file MB':>8}"
+    )
+    for variant in ["before", "after"]:
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--variant",
+                variant,
+                "--rows",
+                str(options.rows),
+                "--chars",
+                str(options.chars),
+                "--layout",
+                options.layout,
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output)
+        print(
+            f"{variant:8} {result['peak_mb']:11.1f} "
+            f"{result['growth_mb']:10.1f} "
+            f"{result['seconds']:8.2f} {result['file_mb']:8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Compare the n-gram fuzzy engine with the original per-row matching.
+
+A synthetic complaint data set is generated and every query is answered by
+both the original ``SequenceMatcher`` loop and the indexed implementation.
+Result sets must be identical; timings for both are printed.
+
+Usage::
+
+    python benchmarks/bench_fuzzy.py --rows 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ComplaintSearch import SEARCH_FIELDS, normalize_text  # noqa: E402
+from ComplaintSearch.claims_excel import ClaimsTable  # noqa: E402
+from ComplaintSearch.similarity import ColumnMatcher  # noqa: E402
+
+WORDS = [
+    "çatlak",
+    "kırılma",
+    "çapak",
+    "ölçü",
+    "problemi",
+    "eksik",
+    "montaj",
+    "ters",
+    "yüzey",
+    "çizik",
+    "renk",
+    "farkı",
+    "deformasyon",
+    "somun",
+    "takılı",
+    "değil",
+    "tırnak",
+    "kalıp",
+    "boya",
+    "leke",
+    "vida",
+    "gevşek",
+]
+CUSTOMERS = [
+    "DAIKIN",
+    "FARPLAS",
+    "ARCELIK",
+    "VESTEL",
+    "BOSCH",
+    "TOFAS",
+    "OYAK",
+]
+QUERIES = [
+    "çatlak",
+    "kirilma problemi",
+    "DAIKN",
+    "farplas",
+    "vida gevsek",
+    "X1234",
+]
+
+
+def make_records(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Return ``count`` pseudo-random complaint records."""
+    rnd = random.Random(seed)
+    records = []
+    for _ in range(count):
+        records.append(
+            {
+                "complaint": " ".join(rnd.choices(WORDS, k=rnd.randint(2, 6))),
+                "customer": rnd.choice(CUSTOMERS),
+                "subject": " ".join(rnd.choices(WORDS, k=2)),
+                "part_code": f"X{rnd.randint(0, 99999):05d}",
+            }
+        )
+    return records
+
+
+def original_search(items: List[Dict[str, str]], keyword: str) -> List[int]:
+    """Return matching row numbers using the original per-row loop."""
+    keyword_norm = normalize_text(keyword)
+    results = []
+    for row, item in enumerate(items):
+        for field in SEARCH_FIELDS:
+            value_norm = normalize_text(str(item.get(field, "")))
+            if keyword_norm in value_norm:
+                results.append(row)
+                break
+            if SequenceMatcher(None, keyword_norm, value_norm).ratio() >= 0.8:
+                results.append(row)
+                break
+    return results
+
+
+def original_filter(column: List[str], value: str) -> List[int]:
+    """Return rows of ``column`` matching ``value`` like the old filter."""
+    val_norm = normalize_text(value)
+    rows = []
+    for row, cell_raw in enumerate(column):
+        cell = normalize_text(str(cell_raw))
+        ratio = SequenceMatcher(None, val_norm, cell).ratio()
+        if cell == val_norm or ratio >= 0.8:
+            rows.append(row)
+    return rows
+
+
+def show(query: str, hits: int, old: float, new: float) -> None:
+    print(f"{query:<20}{hits:>8}{old:>11.3f}s{new:>11.4f}s")
+
+
+def main() -> None:
+    """Run the benchmark and print a timing table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--skip-original", action="store_true")
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+
+    start = time.perf_counter()
+    matchers = [
+        ColumnMatcher.from_values(
+            normalize_text(str(item.get(field, ""))) for item in records
+        )
+        for field in SEARCH_FIELDS
+    ]
+    print(f"keyword index build: {time.perf_counter() - start:.2f}s")
+
+    print(f"{'keyword':<20}{'hits':>8}{'original':>12}{'indexed':>12}")
+    for query in QUERIES:
+        start = time.perf_counter()
+        rows: set[int] = set()
+        for matcher in matchers:
+            rows.update(matcher.match(normalize_text(query), substring=True))
+        indexed = sorted(rows)
+        new_time = time.perf_counter() - start
+        old_time = float("nan")
+        if not args.skip_original:
+            start = time.perf_counter()
+            expected = original_search(records, query)
+            old_time = time.perf_counter() - start
+            assert expected == indexed, f"result mismatch for {query!r}"
+        show(query, len(indexed), old_time, new_time)
+
+    customers = tuple(item["customer"] for item in records)
+    start = time.perf_counter()
+    table = ClaimsTable(
+        ["customer"], {"customer": 0}, {"customer": customers}, args.rows
+    )
+    print(f"claims table build: {time.perf_counter() - start:.2f}s")
+    print(f"{'customer filter':<20}{'hits':>8}{'original':>12}{'indexed':>12}")
+    for query in ["DAIKIN", "DAIKN", "farplas", "unknown"]:
+        start = time.perf_counter()
+        matched = table.matcher("customer").match(normalize_text(query))
+        indexed = sorted(matched)
+        new_time = time.perf_counter() - start
+        old_time = float("nan")
+        if not args.skip_original:
+            start = time.perf_counter()
+            expected = original_filter(list(customers), query)
+            old_time = time.perf_counter() - start
+            assert expected == indexed, f"result mismatch for {query!r}"
+        show(query, len(indexed), old_time, new_time)
+
+
+if __name__ == "__main__":
+    main()
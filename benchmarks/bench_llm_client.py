@@ -0,0 +1,122 @@
+"""Measure per-call overhead of a fresh versus a shared OpenAI client.
+
+A local HTTP server answers chat completion requests with a canned reply,
+so the timings only contain client construction, connection setup and
+request handling. The "fresh" rows build ``OpenAI(...)`` for every call
+like the analyzer used to; the "shared" rows go through
+:meth:`LLMAnalyzer._query_llm` and the pooled process-wide client.
+
+Usage::
+
+    python benchmarks/bench_llm_client.py --calls 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from LLMAnalyzer import LLMAnalyzer  # noqa: E402
+from LLMAnalyzer.client import reset_client  # noqa: E402
+
+REPLY = json.dumps(
+    {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": "ok"},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": 1,
+            "completion_tokens": 1,
+            "total_tokens": 2,
+        },
+    }
+).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer every POST with ``REPLY`` over a keep-alive connection."""
+
+    protocol_version = "HTTP/1.1"
+    # Avoid delayed-ACK stalls between the header and body writes
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self) -> None:
+        super().setup()
+        StubHandler.connections += 1
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server API
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(REPLY)))
+        self.end_headers()
+        self.wfile.write(REPLY)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def run(label: str, calls: int, func) -> None:
+    """Time ``calls`` invocations of ``func`` and print the result."""
+    StubHandler.connections = 0
+    func()  # warm up imports
+    StubHandler.connections = 0
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<8}{elapsed:8.2f}s {elapsed / calls * 1000:8.2f} ms/call "
+        f"connections={StubHandler.connections}"
+    )
+
+
+def main() -> None:
+    """Start the stub server and compare both client strategies."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "stub"
+
+    from openai import OpenAI
+
+    messages = [{"role": "user", "content": "hi"}]
+
+    def fresh() -> None:
+        client = OpenAI(api_key="stub", base_url=base_url)
+        client.chat.completions.create(model="stub", messages=messages)
+
+    analyzer = LLMAnalyzer(model="stub")
+    reset_client()
+
+    try:
+        run("fresh", args.calls, fresh)
+        run("shared", args.calls, lambda: analyzer._query_llm("sys", "hi"))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
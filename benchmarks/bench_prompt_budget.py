@@ -0,0 +1,138 @@
+"""Measure prompt sizes with and without the token budget.
+
+For every bundled guideline the token count of the JSON as callers pass it
+today (``json.dumps``) is compared with each compaction level, and a review
+prompt containing the guideline and an analysis is built with and without a
+budget. A long synthetic complaint shows the effect on analysis prompts.
+Tokens are counted with ``tiktoken`` when installed, otherwise estimated.
+
+Usage::
+
+    python benchmarks/bench_prompt_budget.py --budget 1500
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from unittest.mock import mock_open, patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from LLMAnalyzer import LLMAnalyzer  # noqa: E402
+from LLMAnalyzer.budget import (  # noqa: E402
+    PromptBudget,
+    _get_encoding,
+    _guideline_levels,
+    _dump,
+    estimate_tokens,
+)
+from Review import Review  # noqa: E402
+
+ROOT = Path(__file__).resolve().parents[1]
+REVIEW_TEMPLATE = (
+    "Method: {method}\nGuideline: {guideline_json}\n"
+    "Review the following report in {language}.\n\n{initial_report_text}"
+)
+# Budget that neither truncates fields nor limits the prompt
+UNLIMITED = PromptBudget(max_tokens=None, field_tokens=None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=1500,
+        help="Prompt tokens",
+    )
+    parser.add_argument("--report-tokens", type=int, default=900)
+    parser.add_argument("--complaint-chars", type=int, default=30000)
+    options = parser.parse_args()
+
+    counter = "tiktoken cl100k_base" if _get_encoding() else "chars/3 estimate"
+    print(f"Token counts: {counter}\n")
+
+    print(
+        f"{'guideline':10} {'file':>6} {'dumps':>6} {'compact':>8} "
+        f"{'no_ex':>6} {'no_desc':>8} {'titles':>7}"
+    )
+    for path in sorted((ROOT / "Guidelines").glob("*_Guide.json")):
+        raw = path.read_text(encoding="utf-8")
+        guideline = json.loads(raw)
+        dumped = json.dumps(guideline, ensure_ascii=False)
+        variants = _guideline_levels(guideline)
+        levels = [estimate_tokens(_dump(data)) for _, data in variants]
+        print(
+            f"{path.stem.split('_')[0]:10} {estimate_tokens(raw):6} "
+            f"{estimate_tokens(dumped):6} {levels[0]:8} {levels[1]:6} "
+            f"{levels[2]:8} {levels[3]:7}"
+        )
+
+    report = "Kök neden analizi tamamlandı ve aksiyonlar alındı. " * (
+        options.report_tokens * 3 // 50
+    )
+    print(
+        f"\nReview prompt (report ~{estimate_tokens(report)} tokens, "
+        f"budget {options.budget})"
+    )
+    columns = f"{'before':>7} {'after':>6} {'saved':>6} {'us/prompt':>10}"
+    print(f"{'guideline':10} {columns}")
+    budget = PromptBudget(max_tokens=options.budget)
+    with patch("builtins.open", mock_open(read_data=REVIEW_TEMPLATE)):
+        unlimited = Review(template_path="review.md", budget=UNLIMITED)
+        budgeted = Review(template_path="review.md", budget=budget)
+    for path in sorted((ROOT / "Guidelines").glob("*_Guide.json")):
+        guideline_json = json.dumps(
+            json.loads(path.read_text(encoding="utf-8")), ensure_ascii=False
+        )
+        context = {
+            "method": path.stem,
+            "guideline_json": guideline_json,
+            "language": "Türkçe",
+        }
+        with patch(
+            "LLMAnalyzer.budget.compact_guideline",
+            lambda text, max_tokens=None: (text, "original"),
+        ):
+            prompt = unlimited._build_prompt(report, **context)
+            before = estimate_tokens(prompt)
+        start = time.perf_counter()
+        runs = 50
+        for _ in range(runs):
+            prompt = budgeted._build_prompt(report, **context)
+        per_prompt = (time.perf_counter() - start) / runs * 1e6
+        after = estimate_tokens(prompt)
+        print(
+            f"{path.stem.split('_')[0]:10} {before:7} {after:6} "
+            f"{100 * (before - after) / before:5.1f}% {per_prompt:10.0f}"
+        )
+
+    details = {
+        "complaint": "Parçada çatlak ve çapak tespit edildi. "
+        * (options.complaint_chars // 40),
+        "subject": "Çatlak",
+        "part_code": "X1",
+    }
+    chars = len(details["complaint"])
+    print(f"\nAnalysis prompt with a {chars}-character complaint")
+    for method in ["8D", "A3"]:
+        guideline = {"method": method}
+        plain = LLMAnalyzer(budget=UNLIMITED)
+        fitted = LLMAnalyzer(budget=PromptBudget())
+        before = sum(
+            estimate_tokens(s) + estimate_tokens(u)
+            for _, s, u in plain._build_prompts(details, guideline)
+        )
+        after = sum(
+            estimate_tokens(s) + estimate_tokens(u)
+            for _, s, u in fitted._build_prompts(details, guideline)
+        )
+        print(f"{method:10} {before:7} -> {after:6} tokens (default budget)")
+
+
+if __name__ == "__main__":
+    main()
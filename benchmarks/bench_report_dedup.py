@@ -0,0 +1,101 @@
+"""Measure repeated requests for the same report.
+
+A user clicking "generate report" several times is simulated by
+``--clicks`` concurrent identical requests to :meth:`ReportPool.generate`,
+followed by the same number of requests one after another. ``before``
+gives every request a new random report key, so each one renders its own
+files as ``ReportGenerator`` did before reports were content-addressed;
+``after`` uses :func:`ReportGenerator.report_key`.
+
+Usage::
+
+    python benchmarks/bench_report_dedup.py --clicks 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+from unittest.mock import patch
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ReportGenerator.pool import ReportPool  # noqa: E402
+
+RESPONSE = "Kök neden: kalıp sıcaklığı düşük, çapak oluştu. " * 8
+ANALYSIS = {f"D{step}": {"response": RESPONSE} for step in range(1, 9)}
+INFO = {"customer": "Müşteri A.Ş.", "subject": "Çatlak", "part_code": "K-1"}
+
+
+async def clicks(
+    pool: ReportPool,
+    count: int,
+    output_dir: Path,
+) -> Dict[str, float]:
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(pool.generate(ANALYSIS, INFO, output_dir) for _ in range(count))
+    )
+    burst = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        await pool.generate(ANALYSIS, INFO, output_dir)
+    repeat = time.perf_counter() - start
+    return {"burst_ms": burst * 1000, "repeat_ms": repeat / count * 1000}
+
+
+def random_key(*_) -> str:
+    return uuid4().hex
+
+
+def measure(variant: str, count: int, workers: int | None) -> Dict[str, float]:
+    pool = ReportPool(workers, max_pending=count)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Warm up the workers and the font subset cache
+        asyncio.run(pool.generate({"D1": "warm up"}, {}, tmpdir))
+        output_dir = Path(tmpdir) / "reports"
+        if variant == "before":
+            with patch("ReportGenerator.pool.report_key", random_key):
+                result = asyncio.run(clicks(pool, count, output_dir))
+        else:
+            result = asyncio.run(clicks(pool, count, output_dir))
+        files = len(list(output_dir.iterdir()))
+    stats = pool.stats()
+    pool.shutdown()
+    return {**result, "renders": stats["completed"] - 1, "files": files}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clicks", type=int, default=8)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Report processes",
+    )
+    options = parser.parse_args()
+
+    print(
+        f"{options.clicks} concurrent identical requests, "
+        f"then {options.clicks} repeats"
+    )
+    header = f"{'':8} {'burst ms':>9} {'repeat ms':>10}"
+    print(header, f"{'renders':>8} {'files':>6}")
+    for variant in ["before", "after"]:
+        result = measure(variant, options.clicks, options.workers)
+        print(
+            f"{variant:8} {result['burst_ms']:9.0f} "
+            f"{result['repeat_ms']:10.1f} "
+            f"{result['renders']:8d} {result['files']:6d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
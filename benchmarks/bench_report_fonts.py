@@ -0,0 +1,86 @@
+"""Measure report generation throughput with and without the font cache.
+
+``before`` lets ``fpdf`` rebuild the embedded font subset from the TTF file
+for every PDF and keep its per-character glyph list, as ``ReportGenerator``
+did before :mod:`ReportGenerator.fonts`; ``after`` uses the cached subsets.
+Both PDF and Excel files are written, so the numbers are what ``/report``
+can sustain on one core.
+
+Usage::
+
+    python benchmarks/bench_report_fonts.py --reports 50 --chars 400
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fpdf.ttfonts import TTFontFile  # noqa: E402
+
+from GuideManager import GuideManager  # noqa: E402
+from ReportGenerator import ReportGenerator  # noqa: E402
+from ReportGenerator.fonts import CachedTTFontFile  # noqa: E402
+
+
+INFO = {"customer": "Müşteri A.Ş.", "subject": "Çatlak", "part_code": "K-1"}
+SENTENCE = "Kök neden: kalıp sıcaklığı düşük, “çapak” gözlendi – İşlem tamam. "
+
+
+def plain_register_font(pdf, family, path) -> None:
+    pdf.add_font(family, "", str(path), uni=True)
+
+
+def run(generator: ReportGenerator, analyses: list, reports: int) -> float:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        generator.generate(analyses[0], INFO, tmpdir)  # warm up
+        start = time.perf_counter()
+        for i in range(reports):
+            analysis = analyses[i % len(analyses)]
+            generator.generate(analysis, INFO, tmpdir)
+        return reports / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reports", type=int, default=50)
+    parser.add_argument(
+        "--chars",
+        type=int,
+        default=400,
+        help="Characters per step",
+    )
+    options = parser.parse_args()
+
+    repeats = options.chars // len(SENTENCE) + 1
+    body = (SENTENCE * repeats)[: options.chars]
+    # Vary the text so that reports differ like real analyses do
+    steps = [f"D{step}" for step in range(1, 9)]
+    analyses = []
+    for n in range(10):
+        response = {"response": f"{n}. rapor {body}"}
+        analyses.append(dict.fromkeys(steps, response))
+    generator = ReportGenerator(GuideManager())
+
+    with patch("fpdf.fpdf.TTFontFile", TTFontFile), patch(
+        "ReportGenerator.install_font_cache", lambda: None
+    ), patch("ReportGenerator.register_font", plain_register_font):
+        before = run(generator, analyses, options.reports)
+    CachedTTFontFile.clear()
+    after = run(generator, analyses, options.reports)
+
+    print(f"{options.reports} reports, 8 steps x {options.chars} characters")
+    print(f"before: {before:6.1f} reports/s ({1000 / before:6.1f} ms/report)")
+    print(f"after:  {after:6.1f} reports/s ({1000 / after:6.1f} ms/report)")
+    stats = CachedTTFontFile.stats()
+    print(f"speedup: {after / before:.1f}x, subset cache {stats}")
+
+
+if __name__ == "__main__":
+    main()
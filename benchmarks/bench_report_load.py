@@ -0,0 +1,165 @@
+"""Load test ``POST /report`` with concurrent clients.
+
+Requests go through the ASGI app in-process with ``httpx``, so the numbers
+show what the server itself can sustain. ``before`` renders every report
+synchronously on the request thread pool, as ``/report`` did before
+:mod:`ReportGenerator.pool`; ``after`` uses the report worker pool. While
+reports are rendering, ``GET /guide/8D`` is polled to show how much the
+rendering slows down other requests. Requests rejected with ``503`` because
+the queue is full are counted separately. Every request asks for a
+different report, so none is answered from the content-addressed store or
+coalesced with another one.
+
+Usage::
+
+    python benchmarks/bench_report_load.py --requests 64 --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest.mock import patch
+from uuid import uuid4
+
+import anyio
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import api  # noqa: E402
+from ReportGenerator.pool import ReportPool  # noqa: E402
+
+RESPONSE = "Kök neden: kalıp sıcaklığı düşük, çapak oluştu. " * 8
+ANALYSIS = {f"D{step}": {"response": RESPONSE} for step in range(1, 9)}
+
+
+def body(run: str, n: int) -> Dict[str, Any]:
+    """Return request ``n`` of ``run``; every body renders a new report."""
+    return {
+        "analysis": ANALYSIS,
+        "complaint_info": {
+            "customer": "Müşteri A.Ş.",
+            "subject": "Çatlak",
+            "part_code": f"{run}-{n}",
+        },
+    }
+
+
+async def sync_generate(
+    analysis,
+    complaint_info,
+    output_dir,
+) -> Dict[str, str]:
+    return await anyio.to_thread.run_sync(
+        api.reporter.generate, analysis, complaint_info, output_dir
+    )
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def load(run: str, requests: int, concurrency: int) -> Dict[str, float]:
+    transport = httpx.ASGITransport(app=api.app)
+    latencies: List[float] = []
+    probe: List[float] = []
+    rejected = 0
+    created: List[str] = []
+    queue = iter(range(requests))
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        # Warm up workers and caches
+        response = await client.post("/report", json=body(run, -1))
+        created.extend(response.json().values())
+
+        async def worker() -> None:
+            nonlocal rejected
+            for n in queue:
+                start = time.perf_counter()
+                response = await client.post("/report", json=body(run, n))
+                if response.status_code == 503:
+                    rejected += 1
+                    await asyncio.sleep(0.05)
+                    continue
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                created.extend(response.json().values())
+
+        async def poll(done: asyncio.Event) -> None:
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/guide/8D")
+                probe.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        done = asyncio.Event()
+        poller = asyncio.create_task(poll(done))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await poller
+    for url in created:
+        path = api.REPORT_DIR / url.removeprefix("/reports/")
+        path.unlink(missing_ok=True)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "probe_p95": percentile(probe, 0.95) * 1000,
+        "rejected": rejected,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Report processes",
+    )
+    parser.add_argument("--max-pending", type=int, default=None)
+    options = parser.parse_args()
+    clients = (options.requests, options.concurrency)
+    # Reports of earlier runs must not be found again
+    tag = uuid4().hex[:8]
+
+    with patch.object(api._report_pool, "generate", sync_generate):
+        before = asyncio.run(load(f"before-{tag}", *clients))
+    pool = ReportPool(options.workers, options.max_pending)
+    with patch.object(api, "_report_pool", pool):
+        after = asyncio.run(load(f"after-{tag}", *clients))
+    pool.shutdown()
+
+    print(
+        f"{options.requests} reports, "
+        f"{options.concurrency} concurrent clients, "
+        f"{pool.workers} workers, max {pool.max_pending} pending"
+    )
+    print(
+        f"{'':8} {'reports/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'guide p95 ms':>13} {'503s':>5}"
+    )
+    for name, result in [("before", before), ("after", after)]:
+        print(
+            f"{name:8} {result['rps']:9.1f} "
+            f"{result['p50']:8.0f} {result['p95']:8.0f} "
+            f"{result['probe_p95']:13.1f} {result['rejected']:5d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
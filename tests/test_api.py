@@ -1,15 +1,38 @@
+import io
+import math
+import threading
+import types
+import time
 import unittest
-from unittest.mock import patch
+import zipfile
+from unittest.mock import AsyncMock, patch
 
 from fastapi.testclient import TestClient
 import tempfile
 from pathlib import Path
 from ComplaintSearch import ComplaintStore
 from LLMAnalyzer import OpenAIError
+from LLMAnalyzer.resilience import CircuitOpenError
+from ReportGenerator.store import KEYED_DIR, REPORT_DIR, ReportStore
 
 import api
 
 
+def setUpModule() -> None:
+    """Write the reports of these tests to a temporary store."""
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    store = ReportStore(tmp.name, max_age=86400)
+    mount = next(r for r in api.app.routes if r.name == "reports")
+    for patcher in (
+        patch.object(api, "_report_store", store),
+        patch.object(api, "REPORT_DIR", store.root),
+        patch.object(mount.app, "all_directories", [store.root]),
+    ):
+        patcher.start()
+        unittest.addModuleCleanup(patcher.stop)
+
+
 class APITest(unittest.TestCase):
     """Tests for FastAPI endpoints."""
 
@@ -35,7 +58,9 @@ class APITest(unittest.TestCase):
             "directives": "",
             "language": "Türkçe",
         }
-        with patch.object(api.analyzer, "analyze", return_value={"ok": 1}) as mock_analyze:
+        with patch.object(
+            api.analyzer, "analyze_async", return_value={"ok": 1}
+        ) as mock_analyze:
             response = self.client.post("/analyze", json=payload)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"ok": 1})
@@ -53,7 +78,10 @@ class APITest(unittest.TestCase):
             "directives": "",
             "language": "Türkçe",
         }
-        with patch.object(api.analyzer, "analyze", return_value={"ok": 1}):
+        analyze = patch.object(
+            api.analyzer, "analyze_async", return_value={"ok": 1}
+        )
+        with analyze:
             with self.assertLogs("api", level="INFO") as cm:
                 response = self.client.post("/analyze", json=payload)
         self.assertEqual(response.status_code, 200)
@@ -68,14 +96,88 @@ class APITest(unittest.TestCase):
             "directives": "",
             "language": "Türkçe",
         }
-        with patch.object(api.analyzer, "analyze", side_effect=OpenAIError("fail")):
+        with patch.object(
+            api.analyzer, "analyze_async", side_effect=OpenAIError("fail")
+        ):
+            response = self.client.post("/analyze", json=payload)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()["detail"], "fail")
+
+    def test_llm_outage_is_service_unavailable(self) -> None:
+        payload = {"details": {}, "guideline": {}}
+        circuit = OpenAIError("LLM service unavailable")
+        circuit.__cause__ = CircuitOpenError("circuit open")
+        reset = api.analyzer.resilience.breaker.reset_timeout
+        expected = str(max(1, math.ceil(reset)))
+        with patch.object(api.analyzer, "analyze_async", side_effect=circuit):
             response = self.client.post("/analyze", json=payload)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], expected)
+
+        upstream = types.SimpleNamespace(headers={"retry-after": "7"})
+        limited = OpenAIError("LLM service unavailable")
+        limited.__cause__ = type("RateLimitError", (Exception,), {})()
+        limited.__cause__.status_code = 429
+        limited.__cause__.response = upstream
+        with patch.object(api.reviewer, "perform_async", side_effect=limited):
+            response = self.client.post("/review", json={"text": "t"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "7")
+
+    def test_analyze_stream_endpoint(self) -> None:
+        payload = {
+            "details": {"complaint": "c"},
+            "guideline": {"method": "8D"},
+        }
+
+        async def fake_stream(*args):  # type: ignore
+            yield "token", {"text": "Çat"}
+            yield "token", {"text": "lak"}
+            yield "done", {"full_text": "Çatlak"}
+
+        with patch.object(
+            api.analyzer, "analyze_stream", side_effect=fake_stream
+        ):
+            response = self.client.post("/analyze/stream", json=payload)
+        self.assertEqual(response.status_code, 200)
+        content_type = response.headers["content-type"]
+        self.assertTrue(content_type.startswith("text/event-stream"))
+        self.assertEqual(
+            response.text,
+            'event: token\ndata: {"text": "Çat"}\n\n'
+            'event: token\ndata: {"text": "lak"}\n\n'
+            'event: done\ndata: {"full_text": "Çatlak"}\n\n',
+        )
+
+    def test_analyze_stream_errors(self) -> None:
+        payload = {"details": {}, "guideline": {}}
+
+        async def failing_start(*args):  # type: ignore
+            raise OpenAIError("fail")
+            yield  # pragma: no cover
+
+        async def failing_later(*args):  # type: ignore
+            yield "step", {"step_id": "S1", "response": "ok"}
+            raise RuntimeError("boom")
+
+        with patch.object(
+            api.analyzer, "analyze_stream", side_effect=failing_start
+        ):
+            response = self.client.post("/analyze/stream", json=payload)
         self.assertEqual(response.status_code, 500)
         self.assertEqual(response.json()["detail"], "fail")
+        with patch.object(
+            api.analyzer, "analyze_stream", side_effect=failing_later
+        ):
+            response = self.client.post("/analyze/stream", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('event: error\ndata: {"detail": "boom"}', response.text)
 
     def test_review_endpoint(self) -> None:
         body = {"text": "t", "context": {"a": "b"}}
-        with patch.object(api.reviewer, "perform", return_value="r") as mock_perf:
+        with patch.object(
+            api.reviewer, "perform_async", return_value="r"
+        ) as mock_perf:
             response = self.client.post("/review", json=body)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"result": "r"})
@@ -84,25 +186,95 @@ class APITest(unittest.TestCase):
     def test_report_endpoint(self) -> None:
         body = {"analysis": {}, "complaint_info": {}, "output_dir": "."}
         paths = {"pdf": "/tmp/p.pdf", "excel": "/tmp/e.xlsx"}
-        with patch.object(api.reporter, "generate", return_value=paths) as mock_gen:
+        with patch.object(
+            api._report_pool, "generate", new=AsyncMock(return_value=paths)
+        ) as mock_gen:
             response = self.client.post("/report", json=body)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(
             response.json(),
             {"pdf": "/reports/p.pdf", "excel": "/reports/e.xlsx"},
         )
-        mock_gen.assert_called_with({}, {}, api.REPORT_DIR)
+        output_dir = mock_gen.await_args.args[2]
+        self.assertEqual(output_dir.parent, api.REPORT_DIR / KEYED_DIR)
+        self.assertEqual(output_dir.name, api.report_key({}, {})[:2])
 
     def test_report_endpoint_error(self) -> None:
-        """Errors from ``ReportGenerator`` should return HTTP 500."""
+        """Errors from the report workers should return HTTP 500."""
         body = {"analysis": {}, "complaint_info": {}, "output_dir": "."}
-        with patch.object(api.reporter, "generate", side_effect=RuntimeError("boom")):
+        failing = AsyncMock(side_effect=RuntimeError("boom"))
+        with patch.object(api._report_pool, "generate", new=failing):
             with self.assertLogs("api", level="ERROR") as cm:
                 response = self.client.post("/report", json=body)
         self.assertEqual(response.status_code, 500)
         self.assertEqual(response.json()["detail"], "Report generation failed")
         self.assertIn("Report generation failed", "\n".join(cm.output))
 
+    def test_report_endpoint_queue_full(self) -> None:
+        body = {"analysis": {}, "complaint_info": {}}
+        full = api._report_pool.max_pending
+        with patch.object(api._report_pool, "pending", full):
+            response = self.client.post("/report", json=body)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "1")
+
+    def test_report_endpoint_renders_files(self) -> None:
+        body = {
+            "analysis": {"D1": {"response": "Ekip kuruldu"}},
+            "complaint_info": {"customer": "Müşteri"},
+        }
+        response = self.client.post("/report", json=body)
+        self.assertEqual(response.status_code, 200)
+        for url in response.json().values():
+            path = api.REPORT_DIR / url.removeprefix("/reports/")
+            self.assertTrue(path.exists())
+            self.assertEqual(self.client.get(url).status_code, 200)
+            path.unlink()
+
+    def test_report_inline(self) -> None:
+        body = {
+            "analysis": {"D1": {"response": "Ekip"}},
+            "complaint_info": {"customer": "c"},
+        }
+        before = set(api.REPORT_DIR.rglob("report_*"))
+        response = self.client.post("/report?inline=1&format=pdf", json=body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/pdf")
+        self.assertTrue(response.content.startswith(b"%PDF"))
+        self.assertIn(".pdf", response.headers["content-disposition"])
+
+        response = self.client.post("/report?inline=1", json=body)
+        self.assertEqual(response.headers["content-type"], "application/zip")
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            names = sorted(Path(name).suffix for name in archive.namelist())
+        self.assertEqual(names, [".pdf", ".xlsx"])
+
+        response = self.client.post("/report?inline=1&format=xlsx", json=body)
+        self.assertTrue(response.content.startswith(b"PK"))
+        self.assertEqual(set(api.REPORT_DIR.rglob("report_*")), before)
+        response = self.client.post("/report?inline=1&format=doc", json=body)
+        self.assertEqual(response.status_code, 422)
+
+    def test_report_bulk_endpoint(self) -> None:
+        body = {
+            "items": [
+                {"analysis": {"D1": "a"}, "complaint_info": {"customer": "c"}},
+                {"analysis": {"D1": "b", "D2": "c"}},
+            ],
+            "layout": "rows",
+        }
+        response = self.client.post("/report/bulk", json=body)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["reports"], data["rows"]), (2, 3))
+        self.assertTrue(data["excel"].startswith("/reports/"))
+        (api.REPORT_DIR / data["excel"].removeprefix("/reports/")).unlink()
+        response = self.client.post("/report/bulk", json={"items": []})
+        self.assertEqual(response.status_code, 422)
+        body["layout"] = "columns"
+        response = self.client.post("/report/bulk", json=body)
+        self.assertEqual(response.status_code, 422)
+
     def test_reports_static_mount(self) -> None:
         tmp_file = api.REPORT_DIR / "test.txt"
         tmp_file.write_text("hi")
@@ -113,38 +285,77 @@ class APITest(unittest.TestCase):
         finally:
             tmp_file.unlink()
 
+    def test_report_sweeper_runs_while_serving(self) -> None:
+        names = [thread.name for thread in threading.enumerate()]
+        self.assertNotIn("report-sweeper", names)
+        store = api._report_store
+        self.assertNotEqual(api.REPORT_DIR, REPORT_DIR)
+        with patch.object(store, "start") as start, patch.object(
+            store, "stop"
+        ) as stop:
+            with TestClient(api.app):
+                start.assert_called_once_with()
+                stop.assert_not_called()
+            stop.assert_called_once_with()
+        with patch.object(store, "max_age", None), patch.object(
+            store, "start"
+        ) as start:
+            with TestClient(api.app):
+                start.assert_not_called()
+
     def test_complaints_endpoint(self) -> None:
         params = {"keyword": "k", "customer": "c"}
-        with patch.object(api._store, "search", return_value=[{"id": 1}]) as mock_store, \
-             patch.object(api._excel_searcher, "search", return_value=[{"id": 2}]) as mock_excel:
+        with patch.object(
+            api._store, "search", return_value=[{"id": 1}]
+        ) as mock_store, patch.object(
+            api._excel_searcher, "search", return_value=[{"id": 2}]
+        ) as mock_excel:
             response = self.client.get("/complaints", params=params)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), {"store": [{"id": 1}], "excel": [{"id": 2}]})
+        self.assertEqual(
+            response.json(), {"store": [{"id": 1}], "excel": [{"id": 2}]}
+        )
         mock_store.assert_called_with("k")
-        mock_excel.assert_called_with({"Müşteri Adı": "c"}, None, start_year=None, end_year=None)
+        mock_excel.assert_called_with(
+            {"Müşteri Adı": "c"}, None, start_year=None, end_year=None
+        )
 
     def test_complaints_endpoint_year_range(self) -> None:
         params = {"customer": "c", "start_year": 2020, "end_year": 2022}
-        with patch.object(api._excel_searcher, "search", return_value=[]) as mock_excel:
+        with patch.object(
+            api._excel_searcher, "search", return_value=[]
+        ) as mock_excel:
             response = self.client.get("/complaints", params=params)
         self.assertEqual(response.status_code, 200)
-        mock_excel.assert_called_with({"Müşteri Adı": "c"}, None, start_year=2020, end_year=2022)
+        mock_excel.assert_called_with(
+            {"Müşteri Adı": "c"}, None, start_year=2020, end_year=2022
+        )
 
     def test_complaints_extra_filters_forwarded(self) -> None:
         params = {"foo": "bar", "customer": "c"}
-        with patch.object(api._store, "search") as mock_store, \
-             patch.object(api._excel_searcher, "search", return_value=[]) as mock_excel:
+        with patch.object(api._store, "search") as mock_store, patch.object(
+            api._excel_searcher, "search", return_value=[]
+        ) as mock_excel:
             response = self.client.get("/complaints", params=params)
         self.assertEqual(response.status_code, 200)
         mock_store.assert_not_called()
-        mock_excel.assert_called_with({"foo": "bar", "Müşteri Adı": "c"}, None, start_year=None, end_year=None)
+        mock_excel.assert_called_with(
+            {"foo": "bar", "Müşteri Adı": "c"},
+            None,
+            start_year=None,
+            end_year=None,
+        )
 
     def test_complaints_alias_turkish_key(self) -> None:
         params = {"Müşteri Adı": "c"}
-        with patch.object(api._excel_searcher, "search", return_value=[]) as mock_excel:
+        with patch.object(
+            api._excel_searcher, "search", return_value=[]
+        ) as mock_excel:
             response = self.client.get("/complaints", params=params)
         self.assertEqual(response.status_code, 200)
-        mock_excel.assert_called_with({"Müşteri Adı": "c"}, None, start_year=None, end_year=None)
+        mock_excel.assert_called_with(
+            {"Müşteri Adı": "c"}, None, start_year=None, end_year=None
+        )
 
     def test_options_endpoint(self) -> None:
         with patch.object(
@@ -158,45 +369,245 @@ class APITest(unittest.TestCase):
         mock_opts.assert_called_with("Müşteri Adı")
 
     def test_guide_endpoint(self) -> None:
-        with patch.object(
-            api._guide_manager,
-            "get_format",
-            return_value={"method": "8D"},
-        ) as mock_get:
-            with self.assertLogs("api", level="DEBUG") as cm:
-                response = self.client.get("/guide/8D")
+        with self.assertLogs("api", level="DEBUG") as cm:
+            response = self.client.get("/guide/8D")
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), {"method": "8D"})
-        mock_get.assert_called_with("8D")
+        self.assertEqual(response.json(), api._guide_manager.get_format("8D"))
+        entry = api._guide_manager.get_entry("8D")
+        self.assertEqual(response.headers["etag"], entry.etag)
+        self.assertIn("max-age", response.headers["cache-control"])
         logs = "\n".join(cm.output)
         self.assertIn("Guide method", logs)
         self.assertIn("Guide result", logs)
 
+    def test_guide_endpoint_not_modified(self) -> None:
+        etag = self.client.get("/guide/A3").headers["etag"]
+        response = self.client.get(
+            "/guide/A3", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], etag)
+        response = self.client.get(
+            "/guide/A3", headers={"If-None-Match": '"stale"'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/guide/Unknown").status_code, 404)
+
+    def _wait_for_job(self, job_id: str) -> dict:
+        for _ in range(200):
+            data = self.client.get(f"/scan_8d/{job_id}").json()
+            if data["status"] not in {"queued", "running"}:
+                return data
+            time.sleep(0.01)
+        self.fail("scan job did not finish")
+
     def test_scan_8d_endpoint(self) -> None:
-        with patch.object(api._scanner, "scan", return_value=5) as mock_scan:
+        summary = {
+            "rows": 5,
+            "scanned": 2,
+            "skipped": 3,
+            "replaced": 1,
+            "deleted": 0,
+            "errors": [],
+        }
+
+        def fake_scan(progress=None):
+            progress(
+                {
+                    "files_done": 5,
+                    "files_total": 5,
+                    "rows_inserted": 5,
+                    "errors": [],
+                }
+            )
+            return summary
+
+        with patch.object(
+            api._scanner, "scan", side_effect=fake_scan
+        ) as mock_scan:
             response = self.client.post("/scan_8d")
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), {"status": "ok", "count": 5})
+            self.assertEqual(response.status_code, 202)
+            job_id = response.json()["job_id"]
+            data = self._wait_for_job(job_id)
+        self.assertEqual(data["status"], "done")
+        self.assertEqual(data["files_done"], 5)
+        self.assertEqual(data["files_total"], 5)
+        self.assertEqual(data["rows_inserted"], 5)
+        self.assertEqual(data["errors"], [])
+        self.assertEqual(data["result"], summary)
+        self.assertGreaterEqual(data["elapsed"], 0)
         mock_scan.assert_called_once()
 
+    def test_scan_8d_single_job(self) -> None:
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_scan(progress=None):
+            started.set()
+            release.wait(5)
+            return {"rows": 0}
+
+        with patch.object(api._scanner, "scan", side_effect=blocking_scan):
+            first = self.client.post("/scan_8d").json()["job_id"]
+            self.assertTrue(started.wait(5))
+            running = self.client.get(f"/scan_8d/{first}").json()
+            second = self.client.post("/scan_8d")
+            release.set()
+            self._wait_for_job(first)
+        self.assertEqual(running["status"], "running")
+        self.assertEqual(second.status_code, 409)
+        self.assertEqual(second.json()["detail"]["job_id"], first)
+
+    def test_scan_8d_job_failure(self) -> None:
+        with patch.object(
+            api._scanner, "scan", side_effect=RuntimeError("disk")
+        ):
+            job_id = self.client.post("/scan_8d").json()["job_id"]
+            data = self._wait_for_job(job_id)
+        self.assertEqual(data["status"], "failed")
+        self.assertEqual(data["error"], "disk")
+
+    def test_scan_8d_unknown_job(self) -> None:
+        response = self.client.get("/scan_8d/missing")
+        self.assertEqual(response.status_code, 404)
+
+    def _wait_for_batch(self, job_id: str) -> dict:
+        for _ in range(200):
+            data = self.client.get(f"/analyze/batch/{job_id}").json()
+            if data["status"] not in {"queued", "running"}:
+                return data
+            time.sleep(0.01)
+        self.fail("batch job did not finish")
+
+    def test_analyze_batch_items(self) -> None:
+        def process(details, method, guideline, output_dir, *args):
+            if details["complaint"] == "bad":
+                raise RuntimeError("LLM down")
+            name = details["complaint"]
+            return {
+                "pdf": str(Path(output_dir) / f"{name}.pdf"),
+                "excel": str(Path(output_dir) / f"{name}.xlsx"),
+            }
+
+        body = {
+            "method": "8D",
+            "items": [{"complaint": "good"}, {"complaint": "bad"}],
+        }
+        with patch.object(api._batch, "process", side_effect=process):
+            response = self.client.post("/analyze/batch", json=body)
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.json()["total"], 2)
+            data = self._wait_for_batch(response.json()["job_id"])
+        self.assertEqual(data["status"], "done")
+        self.assertEqual((data["completed"], data["failed"]), (1, 1))
+        self.assertRegex(
+            data["items"][0]["pdf"], r"^/reports/[\d-]+/[0-9a-f]{2}/good\.pdf$"
+        )
+        self.assertEqual(data["items"][1]["status"], "failed")
+        self.assertEqual(data["items"][1]["error"], "LLM down")
+        self.assertEqual(data["result"]["total"], 2)
+
+    def test_analyze_batch_from_claims(self) -> None:
+        rows = [
+            {
+                "musteri ad": "DAIKIN",
+                "parca numaras": "P1",
+                "hata tanm kok neden": "Kırık",
+            },
+            {
+                "musteri ad": "DAIKIN",
+                "parca numaras": "P2",
+                "hata tanm kok neden": "Çapak",
+            },
+        ]
+        with patch.object(
+            api._excel_searcher, "search", return_value=rows
+        ) as mock_search, patch.object(
+            api._batch,
+            "process",
+            return_value={"pdf": "a.pdf", "excel": "a.xlsx"},
+        ) as mock_process:
+            response = self.client.post(
+                "/analyze/batch",
+                json={
+                    "method": "8D",
+                    "filters": {"customer": "DAIKIN"},
+                    "limit": 1,
+                },
+            )
+            self._wait_for_batch(response.json()["job_id"])
+        self.assertEqual(response.json()["total"], 1)
+        mock_search.assert_called_with(
+            {"Müşteri Adı": "DAIKIN"}, None, start_year=None, end_year=None
+        )
+        details = mock_process.call_args.args[0]
+        self.assertEqual(details["complaint"], "Kırık")
+        self.assertEqual(details["part_code"], "P1")
+
+    def test_analyze_batch_validation(self) -> None:
+        response = self.client.post("/analyze/batch", json={"method": "8D"})
+        self.assertEqual(response.status_code, 400)
+        body = {"method": "Nope", "items": [{"complaint": "c"}]}
+        response = self.client.post("/analyze/batch", json=body)
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get("/analyze/batch/missing")
+        self.assertEqual(response.status_code, 404)
+
+    def test_metrics_endpoint(self) -> None:
+        api._metrics.counter("llm_test_total", "Test counter.").inc(2)
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        content_type = response.headers["content-type"]
+        self.assertTrue(content_type.startswith("text/plain"))
+        self.assertIn("llm_test_total 2\n", response.text)
+        self.assertIn(
+            "llm_resilience_breaker_state{breaker_state=", response.text
+        )
+        self.assertIn("llm_resilience_calls ", response.text)
+
+    def test_search_8d_endpoint(self) -> None:
+        rows = [{"id": 1, "material_code": "123"}]
+        with patch.object(
+            api._scanner, "search", return_value=rows
+        ) as mock_search:
+            response = self.client.get(
+                "/8d/search", params={"q": "crack", "material_code": "123"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"results": rows})
+        mock_search.assert_called_with("crack", "123", None, 50)
+
+    def test_search_8d_limit_validated(self) -> None:
+        response = self.client.get("/8d/search", params={"limit": 0})
+        self.assertEqual(response.status_code, 422)
+
     def test_add_complaint_endpoint(self) -> None:
-        body = {"complaint": "c", "customer": "cust", "subject": "s", "part_code": "p"}
+        body = {
+            "complaint": "c",
+            "customer": "cust",
+            "subject": "s",
+            "part_code": "p",
+        }
         with patch.object(api._store, "add_complaint") as mock_add:
             response = self.client.post("/complaints", json=body)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"status": "ok"})
         mock_add.assert_called_with(body)
 
-
     def test_review_endpoint_error(self) -> None:
         body = {"text": "t", "context": {}}
-        with patch.object(api.reviewer, "perform", side_effect=Exception("boom")):
+        with patch.object(
+            api.reviewer, "perform_async", side_effect=Exception("boom")
+        ):
             response = self.client.post("/review", json=body)
         self.assertEqual(response.status_code, 500)
         self.assertIn("boom", response.json()["detail"])
 
     def test_complaints_endpoint_error(self) -> None:
-        with patch.object(api._excel_searcher, "search", side_effect=ValueError("fail")):
+        with patch.object(
+            api._excel_searcher, "search", side_effect=ValueError("fail")
+        ):
             response = self.client.get("/complaints", params={"customer": "c"})
         self.assertEqual(response.status_code, 500)
 
@@ -204,12 +615,18 @@ class APITest(unittest.TestCase):
         with tempfile.TemporaryDirectory() as tmpdir:
             store = ComplaintStore(Path(tmpdir) / "c.json")
             with patch.object(api, "_store", store):
-                body = {"complaint": "n", "customer": "AC", "subject": "s", "part_code": "p"}
+                body = {
+                    "complaint": "n",
+                    "customer": "AC",
+                    "subject": "s",
+                    "part_code": "p",
+                }
                 add_resp = self.client.post("/complaints", json=body)
                 self.assertEqual(add_resp.status_code, 200)
                 resp = self.client.get("/complaints", params={"keyword": "n"})
             self.assertEqual(resp.status_code, 200)
             self.assertEqual(resp.json()["store"], [body])
 
+
 if __name__ == "__main__":
     unittest.main()
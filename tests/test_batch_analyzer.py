@@ -0,0 +1,149 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from BatchAnalyzer import BatchAnalyzer, claims_to_details
+
+
+class SlowAnalyzer:
+    """Analyzer stub sleeping like an LLM round-trip."""
+
+    def __init__(self, delay: float = 0.0, fail_on: str | None = None) -> None:
+        self.delay = delay
+        self.fail_on = fail_on
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def analyze(self, details, guideline, directives="", language="Türkçe"):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if details["complaint"] == self.fail_on:
+                raise RuntimeError("LLM down")
+            return {"full_text": f"analysis {details['complaint']}"}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class BatchAnalyzerTest(unittest.TestCase):
+    """Tests for the concurrent analyze/review/report pipeline."""
+
+    def _batch(
+        self,
+        analyzer: SlowAnalyzer,
+        concurrency: int,
+    ) -> BatchAnalyzer:
+        manager = MagicMock()
+        manager.get_format.return_value = {"fields": []}
+        reviewer = MagicMock()
+        reviewer.perform.side_effect = lambda text, **ctx: f"reviewed {text}"
+        reporter = MagicMock()
+        reporter.generate.side_effect = lambda analysis, info, out: {
+            "pdf": f"{out}/{info['customer']}.pdf",
+            "excel": f"{out}/{info['customer']}.xlsx",
+        }
+        return BatchAnalyzer(
+            manager, analyzer, reviewer, reporter, concurrency=concurrency
+        )
+
+    def _items(self, count: int) -> list:
+        return [
+            {
+                "complaint": f"c{i}",
+                "customer": f"cust{i}",
+                "subject": "s",
+                "part_code": "p",
+            }
+            for i in range(count)
+        ]
+
+    def test_runs_pipeline_per_item(self) -> None:
+        batch = self._batch(SlowAnalyzer(), concurrency=2)
+        result = batch.run(self._items(3), "8D", "out", language="English")
+        self.assertEqual(
+            (result["total"], result["completed"], result["failed"]), (3, 3, 0)
+        )
+        self.assertEqual(
+            [item["pdf"] for item in result["items"]],
+            ["out/cust0.pdf", "out/cust1.pdf", "out/cust2.pdf"],
+        )
+        batch.guide_manager.get_format.assert_called_once_with("8D")
+        analysis, info, _ = batch.reporter.generate.call_args_list[0].args
+        response = analysis["full_report"]["response"]
+        self.assertTrue(response.startswith("reviewed"))
+        expected = {"customer": "cust0", "subject": "s", "part_code": "p"}
+        self.assertEqual(info, expected)
+        context = batch.reviewer.perform.call_args_list[0].kwargs
+        self.assertEqual(context["method"], "8D")
+        self.assertEqual(context["language"], "English")
+
+    def test_reports_render_in_pool(self) -> None:
+        batch = self._batch(SlowAnalyzer(), concurrency=2)
+        batch.pool = MagicMock()
+        batch.pool.render.side_effect = lambda analysis, info, out: {
+            "pdf": f"{out}/pool.pdf",
+            "excel": f"{out}/pool.xlsx",
+        }
+        result = batch.run(self._items(2), "8D", "out")
+        self.assertEqual(result["items"][0]["pdf"], "out/pool.pdf")
+        self.assertEqual(batch.pool.render.call_count, 2)
+        batch.reporter.generate.assert_not_called()
+
+    def test_failed_item_does_not_stop_batch(self) -> None:
+        batch = self._batch(SlowAnalyzer(fail_on="c1"), concurrency=2)
+        updates = []
+        items = self._items(3)
+        result = batch.run(items, "8D", "out", progress=updates.append)
+        self.assertEqual((result["completed"], result["failed"]), (2, 1))
+        self.assertEqual(result["items"][1]["status"], "failed")
+        self.assertEqual(result["items"][1]["error"], "LLM down")
+        self.assertEqual(updates[0]["items"][0]["status"], "queued")
+        self.assertEqual(updates[-1]["completed"] + updates[-1]["failed"], 3)
+
+    def test_throughput_scales_with_concurrency(self) -> None:
+        timings = {}
+        for concurrency in (1, 4):
+            analyzer = SlowAnalyzer(delay=0.05)
+            start = time.perf_counter()
+            self._batch(analyzer, concurrency).run(self._items(8), "8D", "out")
+            timings[concurrency] = time.perf_counter() - start
+            self.assertEqual(analyzer.peak, concurrency)
+        self.assertGreater(timings[1], 0.4)
+        self.assertLess(timings[4], timings[1] / 2)
+
+    def test_concurrency_from_env(self) -> None:
+        from unittest.mock import patch
+
+        with patch.dict("os.environ", {"BATCH_CONCURRENCY": "7"}):
+            batch = BatchAnalyzer(None, None, None, None)
+        self.assertEqual(batch.concurrency, 7)
+
+    def test_claims_to_details(self) -> None:
+        rows = [
+            {
+                "musteri ad": "DAIKIN",
+                "parca numaras": "E01A-0346",
+                "hata tanm kok neden": " Kırılma Problemi ",
+            },
+        ]
+        rows.append(dict.fromkeys(rows[0]))
+        self.assertEqual(
+            claims_to_details(rows),
+            [
+                {
+                    "customer": "DAIKIN",
+                    "subject": "Kırılma Problemi",
+                    "part_code": "E01A-0346",
+                    "complaint": "Kırılma Problemi",
+                }
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
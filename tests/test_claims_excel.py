@@ -172,6 +172,74 @@ class ExcelClaimsSearchTest(unittest.TestCase):
             overlap = searcher.search({}, year=2023, start_year=2022, end_year=2023)
             self.assertEqual(len(overlap), 1)
 
+    def test_workbook_loaded_once(self) -> None:
+        """Repeated queries should reuse the cached table."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, "claims.xlsx")
+            self._create_file(file_path)
+            searcher = ExcelClaimsSearcher(file_path)
+            with patch.object(
+                claims_excel, "load_workbook", wraps=load_workbook
+            ) as mock_load:
+                searcher.search({"customer": "ACME"})
+                searcher.unique_values("customer")
+                ExcelClaimsSearcher(file_path).search({})
+            self.assertEqual(mock_load.call_count, 1)
+
+    def test_cache_reloads_changed_file(self) -> None:
+        """Modifying the workbook should invalidate the cached table."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, "claims.xlsx")
+            self._create_file(file_path)
+            searcher = ExcelClaimsSearcher(file_path)
+            customers = searcher.unique_values("customer")
+            self.assertEqual(customers, ["ACME", "BETA"])
+
+            wb = load_workbook(file_path)
+            row = ["rust", "DELTA", "frame", "X4", datetime(2024, 1, 1)]
+            wb.active.append(row)
+            wb.save(file_path)
+
+            with self.assertLogs(claims_excel.logger, level="INFO") as log:
+                customers = searcher.unique_values("customer")
+            self.assertEqual(customers, ["ACME", "BETA", "DELTA"])
+            self.assertIn("Claims cache miss", "\n".join(log.output))
+
+    def test_results_are_copies(self) -> None:
+        """Mutating a returned record should not affect the cache."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, "claims.xlsx")
+            self._create_file(file_path)
+            searcher = ExcelClaimsSearcher(file_path)
+            searcher.search({"customer": "ACME"})[0]["customer"] = "CHANGED"
+            result = searcher.search({"customer": "ACME"})
+            self.assertEqual(result[0]["customer"], "ACME")
+
+    def test_filters_use_prebuilt_index(self) -> None:
+        """Cells should not be normalized again once the table is loaded."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, "claims.xlsx")
+            self._create_file(file_path)
+            searcher = ExcelClaimsSearcher(file_path)
+            searcher.search({})
+            filters = {"customer": "acme", "part_code": "X1"}
+            normalize = claims_excel.normalize_text
+            with patch.object(
+                claims_excel, "normalize_text", wraps=normalize
+            ) as mock_norm:
+                result = searcher.search(filters)
+            self.assertEqual([r["customer"] for r in result], ["ACME"])
+            self.assertEqual(mock_norm.call_count, 4)
+
+    def test_fuzzy_exact_field_match(self) -> None:
+        """Non-complaint fields should accept close spellings."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, "claims.xlsx")
+            self._create_file(file_path)
+            searcher = ExcelClaimsSearcher(file_path)
+            result = searcher.search({"customer": "ACMEE"})
+            self.assertEqual([r["customer"] for r in result], ["ACME"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,10 +1,11 @@
 import io
 import unittest
-from contextlib import redirect_stdout
+from contextlib import redirect_stderr, redirect_stdout
 from unittest.mock import patch
 import tempfile
 from pathlib import Path
 
+from GuideManager import GuideNotFoundError
 from UI import cli
 import json
 
@@ -96,6 +97,103 @@ class CLITest(unittest.TestCase):
         mock_store.return_value.search.assert_called_with("a")
         self.assertIn("complaint", output)
 
+    @patch("UI.cli.BatchAnalyzer")
+    @patch("UI.cli.ReportGenerator")
+    @patch("UI.cli.Review")
+    @patch("UI.cli.LLMAnalyzer")
+    @patch("UI.cli.GuideManager")
+    @patch("UI.cli.ExcelClaimsSearcher")
+    def test_batch_option(
+        self,
+        mock_claims,
+        mock_manager,
+        mock_analyzer,
+        mock_review,
+        mock_report,
+        mock_batch,
+    ) -> None:
+        mock_claims.return_value.search.return_value = [
+            {
+                "musteri ad": "cust",
+                "parca numaras": "p",
+                "hata tanm kok neden": "crack",
+            }
+        ]
+        mock_batch.return_value.run.return_value = {"total": 2, "items": []}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            batch_file = Path(tmpdir) / "batch.json"
+            batch = json.dumps([{"complaint": "c"}])
+            batch_file.write_text(batch, encoding="utf-8")
+            with io.StringIO() as buf, redirect_stdout(buf):
+                cli.main([
+                    "--batch",
+                    str(batch_file),
+                    "--claims",
+                    "--filter",
+                    "Müşteri Adı=cust",
+                    "--method",
+                    "8D",
+                    "--output",
+                    tmpdir,
+                    "--concurrency",
+                    "3",
+                ])
+                output = buf.getvalue()
+        self.assertIn('"total": 2', output)
+        search = mock_claims.return_value.search
+        search.assert_called_with({"Müşteri Adı": "cust"}, None)
+        self.assertEqual(mock_batch.call_args.kwargs["concurrency"], 3)
+        run = mock_batch.return_value.run
+        items, method, out_dir, directives = run.call_args.args
+        self.assertEqual([item["complaint"] for item in items], ["c", "crack"])
+        self.assertEqual((method, out_dir, directives), ("8D", tmpdir, ""))
+
+    def _usage_error(self, args) -> str:
+        with io.StringIO() as buf, redirect_stderr(buf):
+            with self.assertRaises(SystemExit) as exit_info:
+                cli.main(args)
+            output = buf.getvalue()
+        self.assertEqual(exit_info.exception.code, 2)
+        return output
+
+    @patch("UI.cli.BatchAnalyzer")
+    def test_invalid_batch_file_is_a_usage_error(self, mock_batch) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            batch_file = Path(tmpdir) / "batch.json"
+            args = ["--batch", str(batch_file), "--method", "8D"]
+            self.assertIn("cannot read", self._usage_error(args))
+            for content in ['{"complaint": "c"}', '["c"]', "{broken"]:
+                with self.subTest(content=content):
+                    batch_file.write_text(content, encoding="utf-8")
+                    output = self._usage_error(args)
+                    self.assertIn("--batch", output)
+        mock_batch.assert_not_called()
+
+    @patch("UI.cli.BatchAnalyzer")
+    @patch("UI.cli.GuideManager")
+    def test_unknown_batch_method_is_a_usage_error(
+        self, mock_manager, mock_batch
+    ) -> None:
+        get_format = mock_manager.return_value.get_format
+        get_format.side_effect = GuideNotFoundError("Nope")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            batch_file = Path(tmpdir) / "batch.json"
+            batch_file.write_text("[]", encoding="utf-8")
+            with patch("builtins.input", return_value="Nope"):
+                output = self._usage_error(["--batch", str(batch_file)])
+        self.assertIn("unknown method 'Nope'", output)
+        mock_batch.assert_not_called()
+
+    def test_malformed_filter_is_a_usage_error(self) -> None:
+        with io.StringIO() as buf, redirect_stderr(buf):
+            with self.assertRaises(SystemExit) as exit_info:
+                cli.parse_args(["--claims", "--filter", "customer"])
+            output = buf.getvalue()
+        self.assertEqual(exit_info.exception.code, 2)
+        self.assertIn("expected FIELD=VALUE", output)
+        options = cli.parse_args(["--filter", "musteri = a=b"])
+        self.assertEqual(options.filter, [("musteri", " a=b")])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,13 @@
+import json
+import sqlite3
 import tempfile
+import threading
 import unittest
+from pathlib import Path
+from unittest.mock import patch
 
-from ComplaintSearch import ComplaintStore
+from ComplaintSearch import ComplaintStore, storage
+from ComplaintSearch.similarity import ScanIndex
 
 
 class ComplaintStoreTest(unittest.TestCase):
@@ -49,6 +55,139 @@ class ComplaintStoreTest(unittest.TestCase):
             self.assertEqual(len(typo), 1)
             self.assertEqual(typo[0]["customer"], "BETA")
 
+    def test_engines_agree(self) -> None:
+        """The brute-force engine should return the same records."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = f"{tmpdir}/complaints.json"
+            store = ComplaintStore(path)
+            for text in ["noise issue", "crack", "paint stain"]:
+                store.add_complaint({"complaint": text, "customer": "ACME"})
+            scan_store = ComplaintStore(path, engine=ScanIndex)
+            for keyword in ["noize", "crak", "acme", "stain", "zzz"]:
+                with self.subTest(keyword=keyword):
+                    expected = scan_store.search(keyword)
+                    self.assertEqual(store.search(keyword), expected)
+
+    def test_search_reuses_parsed_file(self) -> None:
+        """The file should be parsed again only after it changes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = f"{tmpdir}/complaints.json"
+            store = ComplaintStore(path)
+            store.add_complaint({"complaint": "noise", "customer": "ACME"})
+            with patch.object(
+                storage.json, "load", wraps=json.load
+            ) as mock_load:
+                store.search("noise")
+                store.search("crack")
+                self.assertEqual(mock_load.call_count, 1)
+                store.add_complaint({"complaint": "crack", "customer": "BETA"})
+                self.assertEqual(len(store.search("crack")), 1)
+
+
+class SQLiteComplaintStoreTest(unittest.TestCase):
+    """Tests for the SQLite complaint backend."""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.path = self.dir / "complaints.db"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_default_backend_is_sqlite(self) -> None:
+        store = ComplaintStore(self.path)
+        self.assertIsInstance(store.backend, storage.SQLiteComplaintBackend)
+        json_store = ComplaintStore(self.dir / "c.db", backend="json")
+        self.assertIsInstance(json_store.backend, storage.JSONComplaintBackend)
+        with self.assertRaises(ValueError):
+            ComplaintStore(self.path, backend="xml")
+
+    def test_add_and_search(self) -> None:
+        store = ComplaintStore(self.path)
+        store.add_complaint({
+            "complaint": "M\u015fteri \u015fikayet",
+            "customer": "ACME",
+            "subject": "engine",
+            "part_code": "X1",
+        })
+        store.add_complaint({
+            "complaint": "noise issue",
+            "customer": "BETA",
+            "subject": "door",
+            "part_code": "X2",
+        })
+
+        def customers(keyword: str) -> list:
+            return [r["customer"] for r in store.search(keyword)]
+
+        self.assertEqual(customers("sikayet"), ["ACME"])
+        self.assertEqual(customers("noize issue"), ["BETA"])
+        self.assertEqual(customers("x"), ["ACME", "BETA"])
+        self.assertEqual(store.search("missing"), [])
+
+    def test_matches_json_backend(self) -> None:
+        """Both backends should return the same records."""
+        json_store = ComplaintStore(self.dir / "other.json")
+        sql_store = ComplaintStore(self.path)
+        for text, customer in [
+            ("noise issue", "ACME"),
+            ("crack on body", "BETA"),
+            ("paint stain", "ACMEE"),
+            ("100% broken_part", "GAMMA"),
+        ]:
+            record = {"complaint": text, "customer": customer}
+            json_store.add_complaint(record)
+            sql_store.add_complaint(record)
+        # Fuzzy words, then LIKE wildcards and substrings too short for FTS
+        keywords = ["noize", "crak", "acme", "stain", "zz"]
+        for keyword in keywords + ["_", "%", "ck", " "]:
+            with self.subTest(keyword=keyword):
+                expected = json_store.search(keyword)
+                self.assertEqual(sql_store.search(keyword), expected)
+
+    def test_wal_mode_and_fts_index(self) -> None:
+        ComplaintStore(self.path).add_complaint({"complaint": "noise"})
+        with sqlite3.connect(self.path) as conn:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            hits = conn.execute(
+                "SELECT rowid FROM complaints_fts "
+                "WHERE complaints_fts MATCH 'ois'"
+            ).fetchall()
+        self.assertEqual(mode, "wal")
+        self.assertEqual(hits, [(1,)])
+
+    def test_migrates_json_once(self) -> None:
+        records = [{"complaint": "noise", "customer": "ACME"}]
+        with open(self.dir / "complaints.json", "w", encoding="utf-8") as f:
+            json.dump(records, f)
+        store = ComplaintStore(self.path)
+        self.assertEqual(store.search("noise"), records)
+        again = ComplaintStore(self.path)
+        self.assertEqual(again.search("noise"), records)
+
+    def test_sees_rows_added_by_other_instances(self) -> None:
+        reader = ComplaintStore(self.path)
+        self.assertEqual(reader.search("noise"), [])
+        ComplaintStore(self.path).add_complaint({"complaint": "noise"})
+        self.assertEqual(reader.search("noize"), [{"complaint": "noise"}])
+
+    def test_concurrent_writes_are_not_lost(self) -> None:
+        store = ComplaintStore(self.path)
+
+        def worker(n: int) -> None:
+            for i in range(20):
+                store.add_complaint({"complaint": f"c{n}-{i}"})
+
+        threads = [
+            threading.Thread(target=worker, args=(n,)) for n in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(store.search("")), 100)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,11 @@
+import os
 import sqlite3
 from pathlib import Path
 import unittest
+from unittest.mock import patch
 
-from EightDScanner import EightDScanner
-from openpyxl import Workbook
+from EightDScanner import SCHEMA_VERSION, EightDScanner
+from openpyxl import Workbook, load_workbook
 
 
 class TestEightDScanner(unittest.TestCase):
@@ -34,12 +36,252 @@ class TestEightDScanner(unittest.TestCase):
         file_path = self.dir / "test.xlsx"
         self._create_excel(file_path)
         scanner = EightDScanner(self.dir, self.db_path)
-        count = scanner.scan()
-        self.assertEqual(count, 1)
+        result = scanner.scan()
+        self.assertEqual(result["rows"], 1)
         with sqlite3.connect(self.db_path) as conn:
             rows = list(conn.execute("SELECT material_code, description, customer, root_cause, permanent_action FROM reports"))
         self.assertEqual(rows, [("123", "desc", "cust", "root", "action")])
 
+    def _rows(self) -> list:
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT material_code, description, source FROM reports "
+                "ORDER BY id"
+            ).fetchall()
+        conn.close()
+        return rows
+
+    def test_rescan_is_idempotent(self) -> None:
+        self._create_excel(self.dir / "a.xlsx")
+        scanner = EightDScanner(self.dir, self.db_path)
+        first = scanner.scan()
+        self.assertEqual((first["scanned"], first["skipped"]), (1, 0))
+        second = scanner.scan()
+        self.assertEqual(
+            second,
+            {
+                "rows": 0,
+                "scanned": 0,
+                "skipped": 1,
+                "replaced": 0,
+                "deleted": 0,
+                "errors": [],
+            },
+        )
+        self.assertEqual(len(self._rows()), 1)
+
+    def test_unchanged_content_is_not_parsed(self) -> None:
+        """A touched file with identical bytes should only be re-hashed."""
+        path = self.dir / "a.xlsx"
+        self._create_excel(path)
+        scanner = EightDScanner(self.dir, self.db_path)
+        scanner.scan()
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with patch.object(scanner, "_extract_rows") as mock_extract:
+            result = scanner.scan()
+        mock_extract.assert_not_called()
+        self.assertEqual(result["skipped"], 1)
+
+    def test_changed_file_rows_replaced(self) -> None:
+        path = self.dir / "a.xlsx"
+        self._create_excel(path)
+        self._create_excel(self.dir / "b.xlsx")
+        scanner = EightDScanner(self.dir, self.db_path)
+        scanner.scan()
+
+        wb = load_workbook(path)
+        wb.active.append(["456", "second", "cust", "root2", "action2"])
+        wb.save(path)
+        result = scanner.scan()
+
+        self.assertEqual(
+            result,
+            {
+                "rows": 2,
+                "scanned": 1,
+                "skipped": 1,
+                "replaced": 1,
+                "deleted": 0,
+                "errors": [],
+            },
+        )
+        self.assertEqual(
+            sorted(self._rows()),
+            [
+                ("123", "desc", "a.xlsx"),
+                ("123", "desc", "b.xlsx"),
+                ("456", "second", "a.xlsx"),
+            ],
+        )
+        hits = scanner.search("second")
+        self.assertEqual([r["material_code"] for r in hits], ["456"])
+
+    def test_deleted_file_rows_purged(self) -> None:
+        path = self.dir / "a.xlsx"
+        self._create_excel(path)
+        scanner = EightDScanner(self.dir, self.db_path)
+        scanner.scan()
+        path.unlink()
+        result = scanner.scan()
+        self.assertEqual(result["deleted"], 1)
+        self.assertEqual(self._rows(), [])
+        self.assertEqual(scanner.search("desc"), [])
+
+    def test_legacy_rows_dropped_on_first_scan(self) -> None:
+        """Rows without a source file are re-imported once, not duplicated."""
+        self._create_excel(self.dir / "a.xlsx")
+        scanner = EightDScanner(self.dir, self.db_path)
+        insert = (
+            "INSERT INTO reports(material_code, description) "
+            "VALUES ('123', 'desc')"
+        )
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(insert)
+        conn.close()
+        scanner.scan()
+        self.assertEqual(self._rows(), [("123", "desc", "a.xlsx")])
+
+        # The migration ran; later scans leave such rows alone
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(insert)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        self.assertEqual(version, SCHEMA_VERSION)
+        scanner.scan()
+        self.assertEqual(
+            self._rows(), [("123", "desc", "a.xlsx"), ("123", "desc", None)]
+        )
+
+    def test_progress_and_unreadable_files(self) -> None:
+        """A broken workbook is reported and retried on the next scan."""
+        self._create_excel(self.dir / "a.xlsx")
+        broken = self.dir / "b.xlsx"
+        broken.write_bytes(b"not a workbook")
+        scanner = EightDScanner(self.dir, self.db_path)
+        updates = []
+        result = scanner.scan(progress=updates.append)
+        self.assertEqual(result["rows"], 1)
+        self.assertEqual([e["file"] for e in result["errors"]], ["b.xlsx"])
+        self.assertEqual(
+            [(u["files_done"], u["files_total"]) for u in updates],
+            [(0, 2), (1, 2), (2, 2)],
+        )
+        self.assertEqual(updates[-1]["rows_inserted"], 1)
+        self.assertEqual(len(updates[-1]["errors"]), 1)
+
+        broken.unlink()
+        self._create_excel(broken)
+        retry = scanner.scan()
+        self.assertEqual((retry["skipped"], retry["scanned"]), (1, 1))
+        self.assertEqual(retry["errors"], [])
+
+    def test_parallel_scan_matches_serial(self) -> None:
+        for name in ["a", "b", "c"]:
+            self._create_excel(self.dir / f"{name}.xlsx")
+        self._create_history(self.dir / "history.xlsx")
+        serial_db = self.dir / "serial.db"
+        serial = EightDScanner(self.dir, serial_db).scan()
+        parallel = EightDScanner(
+            self.dir, self.db_path, workers=2, batch_size=2
+        ).scan()
+        self.assertEqual(parallel, serial)
+        self.assertEqual(parallel["scanned"], 4)
+        query = "SELECT material_code, description, source FROM reports"
+        with sqlite3.connect(serial_db) as conn:
+            expected = sorted(conn.execute(query).fetchall())
+        conn.close()
+        self.assertEqual(sorted(self._rows()), expected)
+
+    def test_batches_files_per_transaction(self) -> None:
+        for name in ["a", "b", "c"]:
+            self._create_excel(self.dir / f"{name}.xlsx")
+        scanner = EightDScanner(self.dir, self.db_path, batch_size=2)
+        sizes = []
+        original = scanner._store_batch
+
+        def store(batch):
+            sizes.append(len(batch))
+            original(batch)
+
+        with patch.object(scanner, "_store_batch", side_effect=store):
+            scanner.scan()
+        self.assertEqual(sizes, [2, 1])
+        self.assertEqual(len(self._rows()), 3)
+
+    def test_worker_settings_from_env(self) -> None:
+        env = {"EIGHT_D_WORKERS": "4", "EIGHT_D_BATCH_SIZE": "7"}
+        with patch.dict(os.environ, env):
+            scanner = EightDScanner(self.dir, self.db_path)
+        self.assertEqual((scanner.workers, scanner.batch_size), (4, 7))
+
+    def _create_history(self, path: Path) -> None:
+        wb = Workbook()
+        ws = wb.active
+        rows = [
+            ["Malzeme Kodu", "Tanım", "Müşteri"]
+            + ["Kök Neden", "Kalıcı Aksiyon"],
+            ["A1", "Çatlak gövde", "ACME"]
+            + ["Kalıp sıcaklığı düşük", "Isıtıcı değişti"],
+            ["A1", "Çapak", "BETA", "Kalıp aşınması", "Kalıp revizyonu"],
+            ["B2", "Renk farkı", "ACME"]
+            + ["Boya karışımı", "Reçete güncellendi"],
+        ]
+        for row in rows:
+            ws.append(row)
+        wb.save(path)
+
+    def test_search_full_text_and_filters(self) -> None:
+        self._create_history(self.dir / "history.xlsx")
+        scanner = EightDScanner(self.dir, self.db_path)
+        scanner.scan()
+
+        hits = scanner.search("kalip")
+        self.assertEqual(
+            {r["description"] for r in hits}, {"Çatlak gövde", "Çapak"}
+        )
+        by_part = scanner.search(material_code="A1", customer="acme")
+        self.assertEqual(
+            [r["root_cause"] for r in by_part], ["Kalıp sıcaklığı düşük"]
+        )
+        combined = scanner.search("recete", customer="ACME")
+        self.assertEqual([r["material_code"] for r in combined], ["B2"])
+        self.assertEqual(scanner.search("boya", material_code="A1"), [])
+        self.assertEqual(len(scanner.search(limit=2)), 2)
+        self.assertEqual(set(hits[0]), {
+            "id", "material_code", "description", "customer", "root_cause",
+            "permanent_action",
+        })
+
+    def test_existing_rows_indexed_on_upgrade(self) -> None:
+        """Rows stored before the full-text index existed are searchable."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE reports (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "material_code TEXT, description TEXT, customer TEXT, "
+                "root_cause TEXT, permanent_action TEXT)"
+            )
+            conn.execute(
+                "INSERT INTO reports(material_code, description, customer, "
+                "root_cause, permanent_action) "
+                "VALUES ('1', 'old', 'c', 'wear', 'fix')"
+            )
+        conn.close()
+        scanner = EightDScanner(self.dir, self.db_path)
+        hits = scanner.search("wear")
+        self.assertEqual([r["description"] for r in hits], ["old"])
+
+    def test_lookup_uses_indexes(self) -> None:
+        EightDScanner(self.dir, self.db_path)
+        with sqlite3.connect(self.db_path) as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN "
+                "SELECT * FROM reports WHERE material_code = ?",
+                ("x",),
+            ).fetchall()
+        conn.close()
+        self.assertIn("idx_reports_material_code", str(plan))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,18 @@
+import copy
 import json
+import os
+import pickle
+import tempfile
 from pathlib import Path
 import unittest
 import unittest.mock
 
-from GuideManager import DEFAULT_8D_GUIDE, GuideManager, GuideNotFoundError
+from GuideManager import (
+    DEFAULT_8D_GUIDE,
+    GuideManager,
+    GuideNotFoundError,
+    GuideRegistry,
+)
 
 
 class GuideManagerTest(unittest.TestCase):
@@ -30,7 +39,7 @@ class GuideManagerTest(unittest.TestCase):
         self.assertEqual(result, expected)
 
     def test_get_format_caches_result(self) -> None:
-        """Repeated calls should not reopen the guideline file."""
+        """Guides are loaded up front and not reopened while unchanged."""
         test_file = self.base_dir / "8D_Guide.json"
         with open(test_file, "r", encoding="utf-8") as f:
             data = f.read()
@@ -41,7 +50,7 @@ class GuideManagerTest(unittest.TestCase):
             first = self.manager.get_format("8D")
             second = self.manager.get_format("8D")
 
-            self.assertEqual(mocked_open.call_count, 1)
+            self.assertEqual(mocked_open.call_count, 0)
             self.assertIs(first, second)
 
     def test_get_format_fallback_default_8d(self) -> None:
@@ -77,5 +86,69 @@ class GuideManagerTest(unittest.TestCase):
             self.manager.get_format("UNKNOWN")
 
 
+GUIDE = {"method": "A3", "fields": [{"id": 1}]}
+
+
+class GuideRegistryTest(unittest.TestCase):
+    """Tests for the eagerly loaded, frozen guide registry."""
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.path = self.dir / "A3_Guide.json"
+        self.path.write_text(json.dumps(GUIDE), "utf-8")
+
+    def test_loads_all_guides_at_startup(self) -> None:
+        (self.dir / "8D_Guide.json").write_text("{}", "utf-8")
+        registry = GuideRegistry(self.dir)
+        self.assertEqual(registry.loads, 2)
+        registry.get("A3")
+        registry.get("8D")
+        self.assertEqual(registry.loads, 2)
+
+    def test_guides_are_read_only(self) -> None:
+        guide = GuideRegistry(self.dir).get("A3")
+        with self.assertRaises(TypeError):
+            guide["method"] = "B"
+        with self.assertRaises(TypeError):
+            guide["fields"].append({})
+        with self.assertRaises(TypeError):
+            guide["fields"][0].update(id=2)
+        copied = copy.deepcopy(guide)
+        copied["fields"].append({"id": 2})
+        self.assertIs(type(copied), dict)
+        self.assertEqual(pickle.loads(pickle.dumps(guide)), guide)
+        self.assertEqual(json.loads(json.dumps(guide)), GUIDE)
+
+    def test_entry_body_and_etag(self) -> None:
+        registry = GuideRegistry(self.dir)
+        entry = registry.entry("A3")
+        self.assertEqual(json.loads(entry.body), entry.data)
+        self.assertEqual(entry.etag[0] + entry.etag[-1], '""')
+        self.assertIs(registry.entry("A3"), entry)
+
+        emptied = {"method": "A3", "fields": []}
+        self.path.write_text(json.dumps(emptied), "utf-8")
+        os.utime(self.path, ns=(0, 0))
+        changed = registry.entry("A3")
+        self.assertEqual(changed.data["fields"], [])
+        self.assertNotEqual(changed.etag, entry.etag)
+
+    def test_broken_reload_keeps_old_guide(self) -> None:
+        registry = GuideRegistry(self.dir)
+        self.path.write_text("{broken", "utf-8")
+        os.utime(self.path, ns=(0, 0))
+        with self.assertLogs("GuideManager.registry", level="ERROR"):
+            self.assertEqual(registry.get("A3")["method"], "A3")
+
+    def test_fallback_when_file_missing(self) -> None:
+        registry = GuideRegistry(self.dir, fallbacks={"8D": {"method": "8D"}})
+        self.assertEqual(registry.get("8D"), {"method": "8D"})
+        self.path.unlink()
+        with self.assertRaises(GuideNotFoundError):
+            registry.get("A3")
+
+
 if __name__ == "__main__":
     unittest.main()
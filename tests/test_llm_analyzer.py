@@ -1,11 +1,14 @@
+import asyncio
+import threading
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 from pathlib import Path
 import types
 
-from GuideManager import GuideManager
-
 from LLMAnalyzer import DEFAULT_8D_PROMPT, LLMAnalyzer, OpenAIError
+from LLMAnalyzer import client as llm_client
+from LLMAnalyzer.resilience import Resilience
 
 
 class LLMAnalyzerTest(unittest.TestCase):
@@ -174,6 +177,238 @@ class LLMAnalyzerTest(unittest.TestCase):
         self.assertIn("LLMAnalyzer returned: ok", messages)
         self.assertIn("LLMAnalyzer._query_llm end", messages)
 
+    def test_concurrent_steps_match_sequential(self) -> None:
+        """Concurrent step queries should keep guideline order and content."""
+        guideline = {
+            "method": "TEST",
+            "fields": [
+                {"id": f"S{i}", "definition": str(i)} for i in range(6)
+            ],
+        }
+        template = {
+            "system": "sys {customer}",
+            "steps": {f"S{i}": {"prompt": "{step_id}"} for i in range(6)},
+        }
+        details = {"complaint": "c", "customer": "cust"}
+
+        def fake_query(self, system, user):  # type: ignore
+            # Later steps finish first so ordering depends on reassembly
+            index = int(user.split("Step definition: ")[1][0])
+            time.sleep(0.01 * (6 - index))
+            return f"{system}|{user}"
+
+        with patch.object(LLMAnalyzer, "_query_llm", fake_query), patch(
+            "PromptManager.PromptManager.get_template", return_value=template
+        ):
+            sequential = LLMAnalyzer(concurrency=1).analyze(
+                details, guideline, "d"
+            )
+            concurrent = LLMAnalyzer(concurrency=4).analyze(
+                details, guideline, "d"
+            )
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual(list(concurrent), [f"S{i}" for i in range(6)])
+        self.assertTrue(concurrent["S3"]["response"].startswith("sys cust|"))
+
+    def test_concurrent_steps_reduce_wall_time(self) -> None:
+        guideline = {"fields": [{"id": f"S{i}"} for i in range(8)]}
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_query(self, system, user):  # type: ignore
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.1)
+            with lock:
+                active.pop()
+            return "ok"
+
+        with patch.object(LLMAnalyzer, "_query_llm", slow_query):
+            start = time.perf_counter()
+            LLMAnalyzer(concurrency=1).analyze({}, guideline)
+            sequential = time.perf_counter() - start
+            start = time.perf_counter()
+            result = LLMAnalyzer(concurrency=4).analyze({}, guideline)
+            concurrent = time.perf_counter() - start
+        self.assertGreaterEqual(sequential, 0.8)
+        self.assertLess(concurrent, 0.5)
+        self.assertEqual(max(peak), 4)
+        self.assertEqual(len(result), 8)
+
+    def test_concurrency_from_env(self) -> None:
+        with patch.dict("os.environ", {"LLM_STEP_CONCURRENCY": "2"}):
+            self.assertEqual(LLMAnalyzer().concurrency, 2)
+        self.assertEqual(LLMAnalyzer(concurrency=0).concurrency, 1)
+
+    def test_analyze_async_matches_sync(self) -> None:
+        guideline = {
+            "fields": [
+                {"id": f"S{i}", "definition": str(i)} for i in range(5)
+            ]
+        }
+        details = {"complaint": "c"}
+
+        def fake_query(self, system, user):  # type: ignore
+            return f"{system}|{user}"
+
+        async def fake_aquery(self, system, user):  # type: ignore
+            await asyncio.sleep(0.01)
+            return f"{system}|{user}"
+
+        with patch.object(LLMAnalyzer, "_query_llm", fake_query), patch.object(
+            LLMAnalyzer, "_aquery_llm", fake_aquery
+        ):
+            expected = self.analyzer.analyze(details, guideline, "d")
+            result = asyncio.run(
+                self.analyzer.analyze_async(details, guideline, "d")
+            )
+            full = asyncio.run(
+                self.analyzer.analyze_async(details, {"method": "A3"}, "d")
+            )
+        self.assertEqual(result, expected)
+        self.assertEqual(list(result), list(expected))
+        self.assertEqual(list(full), ["full_text"])
+
+    def test_analyze_async_uses_async_client(self) -> None:
+        """Many analyses should share one event loop without threads."""
+        message = types.SimpleNamespace(content="ok")
+        response = types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=message)],
+            usage=None,
+        )
+
+        async def create(**kwargs):  # type: ignore
+            await asyncio.sleep(0.1)
+            return response
+
+        fake = MagicMock()
+        fake.chat.completions.create = create
+        guideline = {"method": "8D", "fields": []}
+
+        async def run_many() -> list:
+            analyzer = LLMAnalyzer(resilience=Resilience(max_concurrency=200))
+            calls = [
+                analyzer.analyze_async({"complaint": "c"}, guideline)
+                for _ in range(200)
+            ]
+            return await asyncio.gather(*calls)
+
+        llm_client.set_async_client(fake)
+        try:
+            with patch.dict("os.environ", {"OPENAI_API_KEY": "key"}):
+                start = time.perf_counter()
+                results = asyncio.run(run_many())
+                elapsed = time.perf_counter() - start
+        finally:
+            llm_client.set_async_client(None)
+        self.assertEqual(results, [{"full_text": "ok"}] * 200)
+        self.assertLess(elapsed, 2)
+
+    def test_analyze_async_limits_concurrency(self) -> None:
+        guideline = {"fields": [{"id": f"S{i}"} for i in range(6)]}
+        active = []
+        peak = []
+
+        async def fake_aquery(self, system, user):  # type: ignore
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+            return "ok"
+
+        with patch.object(LLMAnalyzer, "_aquery_llm", fake_aquery):
+            analyzer = LLMAnalyzer(concurrency=2)
+            asyncio.run(analyzer.analyze_async({}, guideline))
+        self.assertEqual(max(peak), 2)
+
+    def _stream_client(
+        self, texts: list, delay: float = 0.0, error: Exception | None = None
+    ) -> MagicMock:
+        async def chunks():  # type: ignore
+            for text in texts:
+                await asyncio.sleep(delay)
+                delta = types.SimpleNamespace(content=text)
+                yield types.SimpleNamespace(
+                    choices=[types.SimpleNamespace(delta=delta)], usage=None
+                )
+            if error is not None:
+                raise error
+            usage = types.SimpleNamespace(total_tokens=7)
+            yield types.SimpleNamespace(choices=[], usage=usage)
+
+        async def create(**kwargs):  # type: ignore
+            self.assertTrue(kwargs["stream"])
+            return chunks()
+
+        fake = MagicMock()
+        fake.chat.completions.create = create
+        return fake
+
+    def _collect_stream(  # type: ignore
+        self, analyzer, details, guideline
+    ) -> list:
+        async def run() -> list:
+            events = []
+            start = time.perf_counter()
+            stream = analyzer.analyze_stream(details, guideline)
+            async for event, data in stream:
+                events.append((event, data, time.perf_counter() - start))
+            return events
+
+        return asyncio.run(run())
+
+    def test_analyze_stream_emits_tokens(self) -> None:
+        client = self._stream_client([" Kök", " neden", " "], 0.1)
+        llm_client.set_async_client(client)
+        try:
+            with patch.dict("os.environ", {"OPENAI_API_KEY": "key"}):
+                events = self._collect_stream(
+                    self.analyzer, {"complaint": "c"}, {"method": "8D"}
+                )
+        finally:
+            llm_client.set_async_client(None)
+        names = [event for event, _, _ in events]
+        self.assertEqual(names, ["token", "token", "token", "done"])
+        self.assertEqual(events[0][1], {"text": " Kök"})
+        self.assertEqual(events[-1][1], {"full_text": "Kök neden"})
+        # The first token arrives long before the answer is complete
+        self.assertLess(events[0][2], events[-1][2] - 0.15)
+
+    def test_analyze_stream_fails_after_partial_output(self) -> None:
+        client = self._stream_client([" Kök", " neden"], error=ValueError("x"))
+        llm_client.set_async_client(client)
+        events = []
+
+        async def run() -> None:
+            stream = self.analyzer.analyze_stream(
+                {"complaint": "c"}, {"method": "8D"}
+            )
+            async for event, data in stream:
+                events.append(event)
+
+        try:
+            with patch.dict("os.environ", {"OPENAI_API_KEY": "key"}):
+                with self.assertRaises(OpenAIError):
+                    asyncio.run(run())
+        finally:
+            llm_client.set_async_client(None)
+        self.assertEqual(events, ["token", "token"])
+
+    def test_analyze_stream_emits_steps(self) -> None:
+        guideline = {"fields": [{"id": f"S{i}"} for i in range(3)]}
+
+        async def fake_aquery(self, system, user):  # type: ignore
+            return "ok"
+
+        with patch.object(LLMAnalyzer, "_aquery_llm", fake_aquery):
+            events = self._collect_stream(self.analyzer, {}, guideline)
+        steps = [data["step_id"] for name, data, _ in events if name == "step"]
+        self.assertEqual(sorted(steps), ["S0", "S1", "S2"])
+        self.assertEqual(events[-1][0], "done")
+        self.assertEqual(list(events[-1][1]), ["S0", "S1", "S2"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,156 @@
+import asyncio
+import tempfile
+import threading
+import types
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, mock_open, patch
+
+from LLMAnalyzer import LLMAnalyzer
+from LLMAnalyzer import cache as llm_cache
+from LLMAnalyzer import client as llm_client
+from LLMAnalyzer.cache import ResponseCache
+from Review import Review
+
+
+def _response(text: str) -> types.SimpleNamespace:
+    message = types.SimpleNamespace(content=text)
+    return types.SimpleNamespace(
+        choices=[types.SimpleNamespace(message=message)],
+        usage=None,
+    )
+
+
+class ResponseCacheTest(unittest.TestCase):
+    """Tests for the two-tier LLM response cache."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "cache.db"
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_key_depends_on_all_parts(self) -> None:
+        key = ResponseCache.key("m", "ab", "c")
+        self.assertEqual(key, ResponseCache.key("m", "ab", "c"))
+        self.assertNotEqual(key, ResponseCache.key("m", "a", "bc"))
+        self.assertNotEqual(key, ResponseCache.key("n", "ab", "c"))
+
+    def test_memory_lru_eviction_and_counters(self) -> None:
+        cache = ResponseCache(memory_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        self.assertEqual(cache.get("a"), "1")
+        cache.set("c", "3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "3")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["memory_entries"], 2)
+
+    def test_entries_expire(self) -> None:
+        cache = ResponseCache(self.path, ttl=10)
+        with patch("LLMAnalyzer.cache.time.time", return_value=100.0):
+            cache.set("a", "1")
+        with patch("LLMAnalyzer.cache.time.time", return_value=105.0):
+            self.assertEqual(cache.get("a"), "1")
+        with patch("LLMAnalyzer.cache.time.time", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expired"], 2)
+
+    def test_disk_tier_persists_and_evicts(self) -> None:
+        cache = ResponseCache(self.path, max_entries=2)
+        for key in ["a", "b", "c"]:
+            cache.set(key, key.upper())
+        reopened = ResponseCache(self.path)
+        self.assertIsNone(reopened.get("a"))
+        self.assertEqual(reopened.get("c"), "C")
+        self.assertEqual(reopened.stats()["disk_hits"], 1)
+        self.assertEqual(reopened.get("c"), "C")
+        self.assertEqual(reopened.stats()["memory_hits"], 1)
+
+    def test_async_access_reads_disk_off_the_loop(self) -> None:
+        cache = ResponseCache(self.path)
+        threads = []
+        get = cache.get
+
+        def record(key):
+            threads.append(threading.get_ident())
+            return get(key)
+
+        async def run():
+            await cache.aset("a", "A")
+            cache._memory.clear()
+            with patch.object(cache, "get", side_effect=record):
+                return await cache.aget("a"), threading.get_ident()
+
+        value, loop_thread = asyncio.run(run())
+        self.assertEqual(value, "A")
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_default_cache_from_env(self) -> None:
+        with patch.object(llm_cache, "_default_loaded", False), patch.object(
+            llm_cache, "_default", None
+        ):
+            with patch.dict("os.environ", {"LLM_CACHE_PATH": str(self.path)}):
+                cache = llm_cache.default_cache()
+                self.assertIs(llm_cache.default_cache(), cache)
+        self.assertEqual(cache.path, self.path)
+        with patch.object(llm_cache, "_default_loaded", False), patch.object(
+            llm_cache, "_default", None
+        ):
+            with patch.dict("os.environ", {}, clear=True):
+                self.assertIsNone(llm_cache.default_cache())
+
+
+class CachedQueryTest(unittest.TestCase):
+    """Tests for cached LLM calls in the analyzer and reviewer."""
+
+    def setUp(self) -> None:
+        self.fake = MagicMock()
+        llm_client.set_client(self.fake)
+        self.env = patch.dict("os.environ", {"OPENAI_API_KEY": "key"})
+        self.env.start()
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        llm_client.set_client(None)
+
+    def test_analyzer_reuses_cached_answer(self) -> None:
+        self.fake.chat.completions.create.return_value = _response("answer")
+        cache = ResponseCache()
+        analyzer = LLMAnalyzer(cache=cache)
+        self.assertEqual(analyzer._query_llm("sys", "user"), "answer")
+        self.assertEqual(analyzer._query_llm("sys", "user"), "answer")
+        self.assertEqual(analyzer._query_llm("sys", "other"), "answer")
+        self.assertEqual(self.fake.chat.completions.create.call_count, 2)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_placeholder_is_not_cached(self) -> None:
+        self.fake.chat.completions.create.side_effect = [
+            Exception("timeout"),
+            _response("answer"),
+        ]
+        cache = ResponseCache()
+        analyzer = LLMAnalyzer(cache=cache)
+        first = analyzer._query_llm("sys", "user")
+        self.assertTrue(first.startswith("LLM response placeholder"))
+        self.assertEqual(analyzer._query_llm("sys", "user"), "answer")
+        self.assertEqual(cache.stats()["stores"], 1)
+
+    def test_review_reuses_cached_answer(self) -> None:
+        self.fake.chat.completions.create.return_value = _response("rev")
+        template = mock_open(read_data="{initial_report_text}")
+        with patch("builtins.open", template):
+            review = Review(template_path="review.md", cache=ResponseCache())
+        self.assertEqual(review.perform("text"), "rev")
+        self.assertEqual(review.perform("text"), "rev")
+        self.fake.chat.completions.create.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
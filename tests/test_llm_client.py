@@ -0,0 +1,88 @@
+import asyncio
+import types
+import unittest
+from unittest.mock import MagicMock, mock_open, patch
+
+from LLMAnalyzer import LLMAnalyzer
+from LLMAnalyzer import client as llm_client
+from Review import Review
+
+
+def _response(text: str) -> types.SimpleNamespace:
+    message = types.SimpleNamespace(content=text)
+    return types.SimpleNamespace(
+        choices=[types.SimpleNamespace(message=message)],
+        usage=None,
+    )
+
+
+class SharedClientTest(unittest.TestCase):
+    """Tests for the process-wide OpenAI client."""
+
+    def setUp(self) -> None:
+        llm_client.reset_client()
+
+    def tearDown(self) -> None:
+        llm_client.set_client(None)
+        llm_client.reset_client()
+
+    def test_client_created_once_for_all_callers(self) -> None:
+        mock_openai = types.ModuleType("openai")
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value = _response("ok")
+        mock_openai.OpenAI = MagicMock(return_value=mock_client)
+        template = mock_open(read_data="{initial_report_text}")
+        with patch("builtins.open", template):
+            review = Review(template_path="review.md")
+        analyzer = LLMAnalyzer()
+        with patch.dict("sys.modules", {"openai": mock_openai}):
+            with patch.dict("os.environ", {"OPENAI_API_KEY": "key"}):
+                analyzer._query_llm("sys", "one")
+                analyzer._query_llm("sys", "two")
+                review._query_llm("three")
+        mock_openai.OpenAI.assert_called_once_with(api_key="key")
+        self.assertEqual(mock_client.chat.completions.create.call_count, 3)
+
+    def test_new_client_when_key_changes(self) -> None:
+        mock_openai = types.ModuleType("openai")
+        mock_openai.OpenAI = MagicMock(side_effect=lambda api_key: MagicMock())
+        with patch.dict("sys.modules", {"openai": mock_openai}):
+            first = llm_client.get_client("a")
+            self.assertIs(llm_client.get_client("a"), first)
+            self.assertIsNot(llm_client.get_client("b"), first)
+
+    def test_injected_client_is_used(self) -> None:
+        fake = MagicMock()
+        fake.chat.completions.create.return_value = _response("fake")
+        llm_client.set_client(fake)
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "key"}):
+            result = LLMAnalyzer()._query_llm("sys", "prompt")
+        self.assertEqual(result, "fake")
+        fake.chat.completions.create.assert_called_once()
+
+    def test_settings_applied_to_sdk_client(self) -> None:
+        env = {
+            "OPENAI_TIMEOUT": "7",
+            "OPENAI_CONNECT_TIMEOUT": "2",
+            "OPENAI_MAX_RETRIES": "0",
+        }
+        with patch.dict("os.environ", env):
+            client = llm_client.get_client("key")
+        self.assertEqual(client.max_retries, 0)
+        self.assertEqual(client.timeout.read, 7)
+        self.assertEqual(client.timeout.connect, 2)
+
+    def test_async_client_per_event_loop(self) -> None:
+        async def fetch() -> tuple:
+            first = llm_client.get_async_client("key")
+            return first, llm_client.get_async_client("key")
+
+        first, again = asyncio.run(fetch())
+        second, _ = asyncio.run(fetch())
+        self.assertIs(first, again)
+        self.assertIsNot(first, second)
+        self.assertEqual(type(first).__name__, "AsyncOpenAI")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+import asyncio
+import types
+import unittest
+from unittest.mock import MagicMock, mock_open, patch
+
+from LLMAnalyzer import LLMAnalyzer
+from LLMAnalyzer import client as llm_client
+from LLMAnalyzer.metrics import (
+    MetricsRegistry,
+    default_registry,
+    method_context,
+    track_call,
+)
+from LLMAnalyzer.resilience import Resilience
+from Review import Review
+
+
+def _response(
+    text: str, prompt: int = 10, completion: int = 5
+) -> types.SimpleNamespace:
+    message = types.SimpleNamespace(content=text)
+    return types.SimpleNamespace(
+        choices=[types.SimpleNamespace(message=message)],
+        usage=types.SimpleNamespace(
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            total_tokens=prompt + completion,
+        ),
+    )
+
+
+def _duration() -> object:
+    return default_registry().histogram(
+        "llm_request_duration_seconds",
+        "Latency of LLM requests in seconds.",
+        ("component", "model", "method", "outcome"),
+    )
+
+
+def _tokens(kind: str) -> object:
+    return default_registry().counter(
+        f"llm_{kind}_tokens_total",
+        "",
+        ("component", "model", "method"),
+    )
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    """Tests for the Prometheus text registry."""
+
+    def test_render_counters_and_histograms(self) -> None:
+        registry = MetricsRegistry()
+        registry.counter("jobs_total", "Jobs run.", ("kind",)).inc(kind='a"b')
+        histogram = registry.histogram(
+            "latency_seconds",
+            "Latency.",
+            (),
+            (0.1, 1),
+        )
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(3)
+        text = registry.render()
+        self.assertIn("# TYPE jobs_total counter\n", text)
+        self.assertIn('jobs_total{kind="a\\"b"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3\n', text)
+        self.assertIn("latency_seconds_sum 3.55\n", text)
+        self.assertIn("latency_seconds_count 3\n", text)
+
+    def test_metric_kind_conflict(self) -> None:
+        registry = MetricsRegistry()
+        registry.counter("x", "")
+        with self.assertRaises(ValueError):
+            registry.histogram("x", "")
+
+    def test_registered_stats(self) -> None:
+        registry = MetricsRegistry()
+        stats = {"hits": 3, "state": "open"}
+        registry.register_stats("llm_cache", lambda: stats)
+        text = registry.render()
+        self.assertIn("llm_cache_hits 3\n", text)
+        self.assertIn('llm_cache_state{state="open"} 1\n', text)
+
+    def test_track_call_outcomes(self) -> None:
+        registry = MetricsRegistry()
+        with track_call("analyzer", "m", registry=registry) as call:
+            usage = types.SimpleNamespace(prompt_tokens=7, completion_tokens=2)
+            call.usage(usage)
+        with self.assertRaises(RuntimeError):
+            with method_context("A3"):
+                with track_call("analyzer", "m", registry=registry):
+                    raise RuntimeError("boom")
+        duration = registry.histogram(
+            "llm_request_duration_seconds",
+            "",
+            ("component", "model", "method", "outcome"),
+        )
+        self.assertEqual(
+            duration.count(component="analyzer", model="m", outcome="ok"), 1
+        )
+        self.assertEqual(
+            duration.count(
+                component="analyzer", model="m", method="A3", outcome="error"
+            ),
+            1,
+        )
+        prompt = registry.counter(
+            "llm_prompt_tokens_total", "", ("component", "model", "method")
+        )
+        self.assertEqual(prompt.value(component="analyzer", model="m"), 7)
+
+
+class LLMCallMetricsTest(unittest.TestCase):
+    """Tests for metrics recorded by the analyzer and reviewer."""
+
+    def setUp(self) -> None:
+        self.fake = MagicMock()
+        llm_client.set_client(self.fake)
+        self.env = patch.dict("os.environ", {"OPENAI_API_KEY": "key"})
+        self.env.start()
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        llm_client.set_client(None)
+
+    def test_analyzer_records_method_tokens_and_outcome(self) -> None:
+        self.fake.chat.completions.create.return_value = _response("ok", 10, 5)
+        steps = [f"S{i}" for i in range(3)]
+        guideline = {"method": "DMAIC", "fields": [{"id": s} for s in steps]}
+        template = {"system": "", "steps": {s: {"prompt": "x"} for s in steps}}
+        analyzer = LLMAnalyzer(model="metrics-steps", concurrency=3)
+        manager = "PromptManager.PromptManager"
+        with patch(f"{manager}.get_text_template", return_value=None), patch(
+            f"{manager}.get_template", return_value=template
+        ):
+            analyzer.analyze({"complaint": "c"}, guideline)
+        labels = {
+            "component": "analyzer",
+            "model": "metrics-steps",
+            "method": "DMAIC",
+        }
+        self.assertEqual(_duration().count(outcome="ok", **labels), 3)
+        self.assertEqual(_tokens("prompt").value(**labels), 30)
+        self.assertEqual(_tokens("completion").value(**labels), 15)
+
+    def test_placeholder_and_error_outcomes(self) -> None:
+        create = self.fake.chat.completions.create
+        create.side_effect = ValueError("bad request")
+        analyzer = LLMAnalyzer(model="metrics-fail", resilience=Resilience())
+        with method_context("8D"):
+            analyzer._query_llm("sys", "user")
+        create.side_effect = Exception("invalid key")
+        with self.assertRaises(Exception):
+            analyzer._query_llm("sys", "user")
+        labels = {"component": "analyzer", "model": "metrics-fail"}
+        self.assertEqual(
+            _duration().count(method="8D", outcome="placeholder", **labels), 1
+        )
+        self.assertEqual(_duration().count(outcome="error", **labels), 1)
+
+    def test_async_review_records_method(self) -> None:
+        async_fake = MagicMock()
+
+        async def create(**kwargs):  # type: ignore
+            return _response("rev", 4, 2)
+
+        async_fake.chat.completions.create = create
+        llm_client.set_async_client(async_fake)
+        try:
+            template = mock_open(read_data="{initial_report_text}")
+            with patch("builtins.open", template):
+                review = Review("metrics-review", template_path="review.md")
+            asyncio.run(review.perform_async("text", method="A3"))
+        finally:
+            llm_client.set_async_client(None)
+        labels = {
+            "component": "review",
+            "model": "metrics-review",
+            "method": "A3",
+        }
+        self.assertEqual(_duration().count(outcome="ok", **labels), 1)
+        self.assertEqual(_tokens("completion").value(**labels), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import json
+import unittest
+from pathlib import Path
+from unittest.mock import mock_open, patch
+
+from LLMAnalyzer import LLMAnalyzer
+from LLMAnalyzer.budget import (
+    TRUNCATION_MARK,
+    PromptBudget,
+    compact_guideline,
+    estimate_tokens,
+    truncate_text,
+)
+from Review import Review
+
+GUIDELINES = Path(__file__).resolve().parents[1] / "Guidelines"
+
+
+class PromptBudgetTest(unittest.TestCase):
+    """Tests for token estimation and prompt field fitting."""
+
+    def setUp(self) -> None:
+        # Use the character heuristic whether or not tiktoken is installed
+        patcher = patch("LLMAnalyzer.budget._get_encoding", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_estimate_and_truncate(self) -> None:
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcdefg"), 3)
+        text = "kelime " * 100
+        short = truncate_text(text, 20)
+        self.assertLessEqual(estimate_tokens(short), 20)
+        self.assertTrue(short.endswith(TRUNCATION_MARK))
+        self.assertEqual(truncate_text("kısa", 20), "kısa")
+
+    def test_compact_guideline_levels(self) -> None:
+        raw = (GUIDELINES / "A3_Guide.json").read_text(encoding="utf-8")
+        guideline = json.loads(raw)
+        compact, level = compact_guideline(raw)
+        self.assertEqual(level, "compact")
+        self.assertEqual(json.loads(compact), guideline)
+        self.assertLess(len(compact), len(raw))
+
+        smaller, level = compact_guideline(raw, estimate_tokens(compact) - 1)
+        self.assertIn(level, {"no_examples", "no_description", "titles_only"})
+        data = json.loads(smaller)
+        ids = [f["id"] for f in guideline["fields"]]
+        self.assertEqual([f["id"] for f in data["fields"]], ids)
+        self.assertNotIn("example_questions", data["fields"][0])
+
+        titles, level = compact_guideline(raw, 200)
+        self.assertEqual(level, "titles_only")
+        self.assertEqual(set(json.loads(titles)["fields"][0]), {"id", "title"})
+        text, level = compact_guideline("not json " * 10, 10)
+        self.assertEqual(level, "truncated")
+        self.assertLessEqual(estimate_tokens(text), 10)
+        self.assertEqual(
+            compact_guideline("not json"),
+            ("not json", "original"),
+        )
+
+    def test_fit_caps_fields_and_trims_low_priority_first(self) -> None:
+        budget = PromptBudget(max_tokens=300, field_tokens=200)
+        with self.assertLogs("LLMAnalyzer.budget", level="INFO") as logs:
+            fitted = budget.fit(
+                "x" * 150,
+                [
+                    ("complaint", "a " * 300, None),
+                    ("directives", "b " * 300, None),
+                ],
+                prompt="test",
+            )
+        self.assertEqual(estimate_tokens(fitted["complaint"]), 200)
+        self.assertLessEqual(estimate_tokens(fitted["directives"]), 50)
+        total = 50 + sum(estimate_tokens(v) for v in fitted.values())
+        self.assertLessEqual(total, 300)
+        messages = "\n".join(logs.output)
+        self.assertIn("directives truncated", messages)
+
+    def test_fit_leaves_small_prompts_alone(self) -> None:
+        budget = PromptBudget(max_tokens=1000)
+        with self.assertNoLogs("LLMAnalyzer.budget", level="INFO"):
+            fitted = budget.fit("overhead", [("complaint", "short", None)])
+        self.assertEqual(fitted, {"complaint": "short"})
+
+
+class BudgetedPromptTest(unittest.TestCase):
+    """Tests for budgets applied by the analyzer and reviewer."""
+
+    def setUp(self) -> None:
+        patcher = patch("LLMAnalyzer.budget._get_encoding", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_analyzer_truncates_long_complaint(self) -> None:
+        budget = PromptBudget(max_tokens=4000, field_tokens=100)
+        analyzer = LLMAnalyzer(budget=budget)
+        details = {
+            "complaint": "çatlak " * 1000,
+            "subject": "s",
+            "part_code": "p",
+        }
+        with self.assertLogs("LLMAnalyzer.budget", level="INFO"):
+            prompts = analyzer._build_prompts(
+                details, {"method": "8D"}, directives="d " * 500
+            )
+        _, system, user = prompts[0]
+        self.assertIn(TRUNCATION_MARK, user)
+        self.assertLess(estimate_tokens(user), 320)
+
+    def test_review_compacts_guideline_json(self) -> None:
+        template = "{guideline_json}\n{initial_report_text}"
+        budget = PromptBudget(max_tokens=None)
+        with patch("builtins.open", mock_open(read_data=template)):
+            review = Review(template_path="review.md", budget=budget)
+        raw = (GUIDELINES / "8D_Guide.json").read_text("utf-8")
+        guideline = json.loads(raw)
+        pretty = json.dumps(guideline, ensure_ascii=False, indent=2)
+        prompt = review._build_prompt("report", guideline_json=pretty)
+        guideline_part = prompt.split("\n")[0]
+        self.assertEqual(json.loads(guideline_part), guideline)
+        self.assertLess(len(prompt), len(pretty))
+
+    def test_review_trims_guideline_before_report(self) -> None:
+        template = "{guideline_json}\n{initial_report_text}"
+        budget = PromptBudget(max_tokens=2500)
+        with patch("builtins.open", mock_open(read_data=template)):
+            review = Review(template_path="review.md", budget=budget)
+        raw = (GUIDELINES / "A3_Guide.json").read_text(encoding="utf-8")
+        report = "rapor " * 1000
+        prompt = review._build_prompt(report, guideline_json=raw)
+        guideline_part, report_part = prompt.split("\n", 1)
+        self.assertEqual(report_part, report)
+        self.assertLess(estimate_tokens(guideline_part), estimate_tokens(raw))
+
+    def test_unused_fields_not_budgeted(self) -> None:
+        budget = PromptBudget(max_tokens=100)
+        template = mock_open(read_data="{initial_report_text}")
+        with patch("builtins.open", template):
+            review = Review(template_path="review.md", budget=budget)
+        with self.assertNoLogs("LLMAnalyzer.budget", level="INFO"):
+            prompt = review._build_prompt("text", guideline_json="x" * 10000)
+        self.assertEqual(prompt, "text")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,16 @@
+import os
+import tempfile
 import unittest
 from pathlib import Path
 from unittest import mock
 
-from PromptManager import PromptManager
+from PromptManager import (
+    PromptManager,
+    PromptRegistry,
+    PromptTemplate,
+    compile_format,
+    compile_template,
+)
 
 
 class PromptManagerTextTest(unittest.TestCase):
@@ -29,15 +37,110 @@ class PromptManagerTextTest(unittest.TestCase):
         self.assertEqual(result, expected)
 
     def test_get_text_prompt_caches_result(self) -> None:
+        # Prompts are loaded once per process, not once per manager
         test_file = self.base_dir / "5N1K_Prompt.txt"
         with open(test_file, "r", encoding="utf-8") as f:
             data = f.read()
         with mock.patch("builtins.open", mock.mock_open(read_data=data)) as m:
             first = self.manager.get_text_prompt("5N1K")
-            second = self.manager.get_text_prompt("5N1K")
-            self.assertEqual(m.call_count, 1)
+            second = PromptManager().get_text_prompt("5N1K")
+            self.assertEqual(m.call_count, 0)
             self.assertIs(first, second)
 
 
+TEXT = "A {{musteri_sikayeti}}"
+
+
+class PromptRegistryTest(unittest.TestCase):
+    """Tests for the shared prompt registry and compiled templates."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        (self.dir / "A3_Prompt.txt").write_text(TEXT, "utf-8")
+        (self.dir / "X_Prompt.json").write_text('{"system": "s"}', "utf-8")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _touch(self, path: Path, text: str) -> None:
+        path.write_text(text, encoding="utf-8")
+        stat = path.stat()
+        # Make the change visible even on coarse-grained file systems
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_template_renders_in_one_pass(self) -> None:
+        template = PromptTemplate("{{a}} and {{ b }} and {{c}}")
+        self.assertEqual(template.names, ("a", "b", "c"))
+        rendered = template.render(a="{{b}}", b="2")
+        self.assertEqual(rendered, "{{b}} and 2 and {{c}}")
+        self.assertIs(compile_template("x {{a}}"), compile_template("x {{a}}"))
+
+    def test_format_template_matches_str_format(self) -> None:
+        values = {"a": "{b}", "b": 2.5, "c": [1]}
+        for source in [
+            "{a} and {b:.2f} and {c!r} {{literal}}",
+            "{0}",
+            "{c[0]} {b:{a}}",
+            "",
+        ]:
+            with self.subTest(source=source):
+                try:
+                    expected = source.format(**values)
+                except (IndexError, ValueError) as exc:
+                    with self.assertRaises(type(exc)):
+                        compile_format(source).render(**values)
+                    continue
+                rendered = compile_format(source).render(**values)
+                self.assertEqual(rendered, expected)
+        with self.assertRaises(KeyError):
+            compile_format("{missing}").render(**values)
+        self.assertIs(compile_format("{a}"), compile_format("{a}"))
+
+    def test_loads_all_prompts_once(self) -> None:
+        registry = PromptRegistry(self.dir)
+        self.assertEqual(registry.loads, 2)
+        manager = PromptManager(registry)
+        for _ in range(3):
+            self.assertEqual(manager.get_text_prompt("A3"), TEXT)
+            self.assertEqual(manager.get_template("X"), {"system": "s"})
+        self.assertEqual(registry.loads, 2)
+        self.assertIs(manager.get_text_template("A3"), registry.text("A3"))
+        self.assertIsNone(manager.get_text_template("Missing"))
+        self.assertEqual(manager.get_text_prompt("Missing"), "")
+        with self.assertRaises(FileNotFoundError):
+            manager.get_template("Missing")
+
+    def test_hot_reload_on_change(self) -> None:
+        registry = PromptRegistry(self.dir)
+        manager = PromptManager(registry)
+        self._touch(self.dir / "A3_Prompt.txt", "B {{parca_kodu}}")
+        self.assertEqual(manager.get_text_prompt("A3"), "B {{parca_kodu}}")
+        (self.dir / "New_Prompt.txt").write_text("new", "utf-8")
+        self.assertEqual(manager.get_text_prompt("New"), "new")
+        (self.dir / "New_Prompt.txt").unlink()
+        self.assertEqual(manager.get_text_prompt("New"), "")
+
+    def test_broken_reload_keeps_previous_version(self) -> None:
+        registry = PromptRegistry(self.dir)
+        self._touch(self.dir / "X_Prompt.json", "{broken")
+        with self.assertLogs("PromptManager", level="ERROR"):
+            self.assertEqual(registry.template("X"), {"system": "s"})
+
+    def test_broken_file_only_fails_its_lookup(self) -> None:
+        (self.dir / "Bad_Prompt.json").write_text("{broken", "utf-8")
+        with self.assertLogs("PromptManager", level="ERROR"):
+            registry = PromptRegistry(self.dir)
+        manager = PromptManager(registry)
+        self.assertEqual(manager.get_text_prompt("A3"), TEXT)
+        with self.assertRaises(ValueError):
+            manager.get_template("Bad")
+
+    def test_watch_disabled(self) -> None:
+        registry = PromptRegistry(self.dir, watch=False)
+        self._touch(self.dir / "A3_Prompt.txt", "changed")
+        self.assertEqual(registry.text("A3").source, TEXT)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,13 +1,25 @@
+import io
 import tempfile
 from pathlib import Path
 import unittest
 from unittest.mock import patch
 import os
+import zipfile
+import fpdf.fpdf
 from fpdf import FPDF
-from openpyxl import Workbook
+from fpdf.ttfonts import TTFontFile
+from openpyxl import Workbook, load_workbook
 
 from GuideManager import GuideManager
-from ReportGenerator import ReportGenerator
+from ReportGenerator import (
+    EXPORT_HEADER,
+    ReportGenerator,
+    export_workbook,
+    render_pdf,
+    report_key,
+    report_zip,
+)
+from ReportGenerator.fonts import CachedTTFontFile, GlyphSet
 
 
 class ReportGeneratorTest(unittest.TestCase):
@@ -27,15 +39,32 @@ class ReportGeneratorTest(unittest.TestCase):
             self.assertTrue(pdf_path.exists())
             self.assertTrue(excel_path.exists())
 
-    def test_generate_unique_paths(self) -> None:
-        """Consecutive calls should produce different file names."""
+    def test_generate_reuses_identical_reports(self) -> None:
+        """Identical requests return the same files without rendering again."""
         analysis = {"Step1": {"response": "foo"}}
         info = {"customer": "c"}
         with tempfile.TemporaryDirectory() as tmpdir:
             first = self.generator.generate(analysis, info, tmpdir)
-            second = self.generator.generate(analysis, info, tmpdir)
-            self.assertNotEqual(first["pdf"], second["pdf"])
-            self.assertNotEqual(first["excel"], second["excel"])
+            with patch("ReportGenerator.render_pdf") as render:
+                second = self.generator.generate(
+                    dict(analysis), dict(info), tmpdir
+                )
+            render.assert_not_called()
+            self.assertEqual(first, second)
+            other_info = {"customer": "d"}
+            other = self.generator.generate(analysis, other_info, tmpdir)
+            self.assertNotEqual(first["pdf"], other["pdf"])
+            self.assertNotEqual(first["excel"], other["excel"])
+            self.assertEqual(len(list(Path(tmpdir).iterdir())), 4)
+
+    def test_report_key_covers_template_version(self) -> None:
+        analysis = {"Step1": {"response": "foo"}}
+        key = report_key(analysis, {"customer": "c"})
+        self.assertEqual(key, report_key({"Step1": "foo"}, {"customer": "c"}))
+        with patch("ReportGenerator.REPORT_VERSION", 2):
+            self.assertNotEqual(key, report_key(analysis, {"customer": "c"}))
+        with patch("ReportGenerator.font_signature", return_value="other"):
+            self.assertNotEqual(key, report_key(analysis, {"customer": "c"}))
 
     def test_generate_handles_unicode(self) -> None:
         """PDF creation should not fail with non-Latin characters."""
@@ -169,6 +198,94 @@ class ReportGeneratorTest(unittest.TestCase):
 
         self.assertIn("Failed to create report file", "\n".join(log.output))
 
+    def test_font_subset_built_once(self) -> None:
+        """Reports with the same characters reuse the embedded font subset."""
+        CachedTTFontFile.clear()
+        info = {"customer": "Müşteri", "subject": "Konu", "part_code": "K001"}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            analysis = {"A": {"response": "İşlem"}}
+            first = self.generator.generate(analysis, info, tmpdir)
+            self.generator.generate({"B": {"response": "Çapak"}}, info, tmpdir)
+            self.assertEqual(CachedTTFontFile.stats()["misses"], 1)
+            self.assertEqual(CachedTTFontFile.stats()["hits"], 1)
+            self.generator.generate({"C": {"response": "Ω"}}, info, tmpdir)
+            self.assertEqual(CachedTTFontFile.stats()["misses"], 2)
+            data = Path(first["pdf"]).read_bytes()
+        self.assertIn(b"/FontFile2", data)
+        self.assertTrue(data.rstrip().endswith(b"%%EOF"))
+
+    def test_font_cache_installed_on_render(self) -> None:
+        with patch("fpdf.fpdf.TTFontFile", TTFontFile):
+            render_pdf([("A", "b")], {})
+            self.assertIs(fpdf.fpdf.TTFontFile, CachedTTFontFile)
+
+    def test_glyph_set_keeps_unique_codes(self) -> None:
+        glyphs = GlyphSet(range(3))
+        for code in [5, 5, 1, 7]:
+            glyphs.append(code)
+        self.assertEqual(list(glyphs), [0, 1, 2, 5, 7])
+        del glyphs[0]
+        self.assertNotIn(0, glyphs)
+        self.assertIn(7, glyphs)
+
+    def test_excel_report_contents(self) -> None:
+        analysis = {"D1": {"response": "Ekip"}, "D2": "Çatlak"}
+        info = {"customer": "Müşteri", "subject": "Konu", "part_code": "K1"}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = self.generator.generate(analysis, info, tmpdir)
+            rows = list(load_workbook(paths["excel"]).active.values)
+        self.assertEqual(
+            rows[:3],
+            [
+                ("Customer", "Müşteri"),
+                ("Subject", "Konu"),
+                ("Part Code", "K1"),
+            ],
+        )
+        self.assertEqual(
+            rows[4:],
+            [("Step", "Response"), ("D1", "Ekip"), ("D2", "Çatlak")],
+        )
+
+    def test_export_workbook_rows(self) -> None:
+        reports = (
+            ({"D1": {"response": f"r{n}"}, "D2": "x"}, {"customer": f"c{n}"})
+            for n in range(3)
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "all.xlsx"
+            result = export_workbook(reports, path)
+            wb = load_workbook(path)
+            rows = list(wb["Reports"].values)
+        self.assertEqual((result["reports"], result["rows"]), (3, 6))
+        self.assertEqual(rows[0], tuple(EXPORT_HEADER))
+        self.assertEqual(rows[1], (1, "c0", None, None, "D1", "r0"))
+        self.assertEqual(rows[-1], (3, "c2", None, None, "D2", "x"))
+
+    def test_export_workbook_sheets(self) -> None:
+        reports = [({"D1": "a"}, {"customer": "c1"}), ({"D1": "b"}, {})]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = self.generator.export(reports, tmpdir, layout="sheets")
+            wb = load_workbook(result["excel"])
+            self.assertEqual(wb.sheetnames, ["Report 1", "Report 2"])
+            self.assertEqual(list(wb["Report 2"].values)[-1], ("D1", "b"))
+            with self.assertRaises(ValueError):
+                self.generator.export(reports, tmpdir, layout="columns")
+
+    def test_generate_in_memory(self) -> None:
+        analysis = {"Adım1": {"response": "İşlem tamam"}}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            files = self.generator.generate(
+                analysis, {}, tmpdir, in_memory=True
+            )
+            self.assertEqual(list(Path(tmpdir).iterdir()), [])
+        self.assertTrue(files["pdf"].startswith(b"%PDF"))
+        rows = list(load_workbook(io.BytesIO(files["excel"])).active.values)
+        self.assertEqual(rows[-1], ("Adım1", "İşlem tamam"))
+        with zipfile.ZipFile(io.BytesIO(report_zip(files, "r1"))) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["r1.pdf", "r1.xlsx"])
+            self.assertEqual(archive.read("r1.pdf"), files["pdf"])
+
 
 if __name__ == "__main__":
     unittest.main()
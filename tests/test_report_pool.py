@@ -0,0 +1,108 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from openpyxl import load_workbook
+
+from ReportGenerator.pool import ReportPool, ReportQueueFullError
+
+
+class ReportPoolTest(unittest.TestCase):
+    """Tests for rendering reports in worker processes."""
+
+    def setUp(self) -> None:
+        self.pool = ReportPool(workers=2, max_pending=1)
+        self.addCleanup(self.pool.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_generate_renders_pdf_and_excel(self) -> None:
+        analysis = {"D1": {"response": "Ekip kuruldu"}, "D2": "Çatlak"}
+        paths = asyncio.run(
+            self.pool.generate(analysis, {"customer": "Müşteri"}, self.dir)
+        )
+        self.assertTrue(Path(paths["pdf"]).read_bytes().startswith(b"%PDF"))
+        rows = list(load_workbook(paths["excel"]).active.values)
+        self.assertEqual(rows[0], ("Customer", "Müşteri"))
+        self.assertEqual(rows[-2:], [("D1", "Ekip kuruldu"), ("D2", "Çatlak")])
+        self.assertEqual(self.pool.stats()["completed"], 1)
+        self.assertEqual(self.pool.stats()["pending"], 0)
+
+    def test_rejects_when_queue_is_full(self) -> None:
+        futures = self.pool.submit({"D1": "a"}, {}, self.dir)
+        with self.assertRaises(ReportQueueFullError):
+            self.pool.submit({"D1": "b"}, {}, self.dir)
+        futures["pdf"].result(timeout=60)
+        futures["excel"].result(timeout=60)
+        stats = self.pool.stats()
+        self.assertEqual((stats["rejected"], stats["pending"]), (1, 0))
+
+    def test_render_waits_for_a_free_slot(self) -> None:
+        futures = self.pool.submit({"D1": "a"}, {}, self.dir)
+        paths = self.pool.render({"D1": "b"}, {}, self.dir)
+        self.assertTrue(futures["pdf"].done() and futures["excel"].done())
+        self.assertTrue(Path(paths["pdf"]).is_file())
+        stats = self.pool.stats()
+        self.assertEqual((stats["rejected"], stats["completed"]), (0, 2))
+
+    def test_worker_errors_are_raised(self) -> None:
+        missing = self.dir / "missing"
+        paths = {"pdf": missing / "r.pdf", "excel": missing / "r.xlsx"}
+        with patch("ReportGenerator.pool.report_paths", return_value=paths):
+            with self.assertRaises(OSError):
+                asyncio.run(self.pool.generate({"D1": "a"}, {}, self.dir))
+        self.assertEqual(self.pool.stats()["failed"], 1)
+
+    def test_export_runs_in_worker(self) -> None:
+        reports = [({"D1": "a", "D2": "b"}, {"customer": "c"})] * 3
+        result = asyncio.run(self.pool.export(reports, self.dir))
+        self.assertEqual((result["reports"], result["rows"]), (3, 6))
+        rows = list(load_workbook(result["excel"])["Reports"].values)
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(self.pool.stats()["pending"], 0)
+
+    def test_identical_reports_render_once(self) -> None:
+        def report():
+            return self.pool.generate({"D1": "a"}, {"customer": "c"}, self.dir)
+
+        async def generate_many():
+            return await asyncio.gather(*(report() for _ in range(3)))
+
+        results = asyncio.run(generate_many())
+        self.assertTrue(all(result == results[0] for result in results))
+        stats = self.pool.stats()
+        counts = (stats["completed"], stats["coalesced"], stats["rejected"])
+        self.assertEqual(counts, (1, 2, 0))
+
+        shared = self.pool.submit({"D1": "b"}, {}, self.dir)
+        self.pool.submit({"D1": "b"}, {}, self.dir)["pdf"].cancel()
+        self.assertTrue(shared["pdf"].result(timeout=60).endswith(".pdf"))
+        shared["excel"].result(timeout=60)
+
+        again = asyncio.run(report())
+        self.assertEqual(again, results[0])
+        stats = self.pool.stats()
+        self.assertEqual((stats["completed"], stats["deduplicated"]), (2, 1))
+        self.assertEqual(len(list(self.dir.iterdir())), 4)
+
+    def test_generate_in_memory_selected_formats(self) -> None:
+        files = asyncio.run(
+            self.pool.generate(
+                {"D1": "a"},
+                {},
+                in_memory=True,
+                formats=("pdf",),
+            )
+        )
+        self.assertEqual(list(files), ["pdf"])
+        self.assertTrue(files["pdf"].startswith(b"%PDF"))
+        self.assertEqual(list(self.dir.iterdir()), [])
+        with self.assertRaises(ValueError):
+            self.pool.submit({}, {}, formats=("doc",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+from ReportGenerator import store as store_module
+from ReportGenerator.store import DEFAULT_MAX_AGE_DAYS, KEYED_DIR, ReportStore
+
+
+class ReportStoreTest(unittest.TestCase):
+    """Tests for sharding and sweeping stored reports."""
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.now = time.time()
+
+    def write(
+        self,
+        store: ReportStore,
+        name: str,
+        size: int,
+        age: float,
+        day=None,
+        key=None,
+    ) -> Path:
+        path = store.directory(day, key) / name
+        path.write_bytes(b"x" * size)
+        mtime = self.now - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_directory_is_sharded_by_day(self) -> None:
+        store = ReportStore(self.root)
+        path = store.directory(date(2026, 1, 2))
+        self.assertTrue(path.is_dir())
+        self.assertEqual(path.parent, self.root / "2026-01-02")
+        self.assertRegex(path.name, r"^[0-9a-f]{2}$")
+
+    def test_keyed_directory_does_not_depend_on_day(self) -> None:
+        store = ReportStore(self.root)
+        path = store.directory(date(2026, 1, 2), key="ab12")
+        self.assertEqual(path, self.root / KEYED_DIR / "ab")
+        self.assertEqual(store.directory(key="ab34"), path)
+
+    def test_url_path_is_relative_to_root(self) -> None:
+        store = ReportStore(self.root)
+        path = store.directory(date(2026, 1, 2)) / "report_a.pdf"
+        self.assertEqual(
+            store.url_path(path), f"2026-01-02/{path.parent.name}/report_a.pdf"
+        )
+        elsewhere = store.url_path("/elsewhere/report_b.pdf")
+        self.assertEqual(elsewhere, "report_b.pdf")
+
+    def test_sweep_removes_expired_reports(self) -> None:
+        store = ReportStore(self.root, max_age=3600)
+        old = self.write(store, "report_old.pdf", 10, age=7200)
+        new = self.write(store, "report_new.pdf", 10, age=60)
+        other = self.write(store, "notes.txt", 10, age=7200)
+        result = store.sweep(self.now)
+        self.assertEqual(
+            result,
+            {"removed": 1, "freed": 10, "files": 1, "bytes": 10},
+        )
+        self.assertFalse(old.exists())
+        self.assertTrue(new.exists())
+        self.assertTrue(other.exists())
+
+    def test_sweep_removes_oldest_beyond_limits(self) -> None:
+        store = ReportStore(self.root, max_files=2)
+        paths = []
+        for n in range(4):
+            name = f"report_{n}.pdf"
+            paths.append(self.write(store, name, 100, age=100 - n))
+        store.sweep(self.now)
+        exists = [p.exists() for p in paths]
+        self.assertEqual(exists, [False, False, True, True])
+
+        store = ReportStore(self.root, max_bytes=150)
+        store.sweep(self.now)
+        exists = [p.exists() for p in paths]
+        self.assertEqual(exists, [False, False, False, True])
+        stats = store.stats()
+        self.assertEqual(
+            (stats["files"], stats["bytes"], stats["removed"]), (1, 100, 1)
+        )
+
+    def test_sweep_prunes_empty_past_directories(self) -> None:
+        store = ReportStore(self.root, max_age=3600)
+        day = date(2020, 1, 1)
+        old = self.write(store, "report_old.pdf", 10, age=7200, day=day)
+        keyed = self.write(store, "report_k.pdf", 10, age=7200, key="ab12")
+        fresh = self.write(store, "report_f.pdf", 10, age=60, key="cd34")
+        today = store.directory()
+        store.sweep(self.now)
+        self.assertFalse(old.parent.parent.exists())
+        self.assertFalse(keyed.exists())
+        self.assertTrue(keyed.parent.is_dir())
+        self.assertTrue(fresh.exists())
+        self.assertTrue(today.is_dir())
+
+    def test_start_sweeps_in_background(self) -> None:
+        store = ReportStore(self.root, max_files=0, sweep_interval=60)
+        path = self.write(store, "report_a.pdf", 10, age=10)
+        store.start()
+        self.addCleanup(store.stop)
+        deadline = time.monotonic() + 5
+        while path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(path.exists())
+        store.stop()
+        self.assertGreaterEqual(store.stats()["sweeps"], 1)
+
+    def test_default_store_is_created_idle(self) -> None:
+        with patch.object(store_module, "_default", None), patch.object(
+            store_module, "REPORT_DIR", self.root / "r"
+        ):
+            with patch.dict("os.environ", {}, clear=True):
+                store = store_module.default_report_store()
+                self.assertIs(store_module.default_report_store(), store)
+        self.assertEqual(store.root, self.root / "r")
+        self.assertEqual(DEFAULT_MAX_AGE_DAYS, 0)
+        self.assertIsNone(store.max_age)
+        self.assertIsNone(store.max_files)
+        self.assertFalse(store.limited)
+        self.assertEqual(store.stats()["sweeps"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
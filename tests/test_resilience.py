@@ -0,0 +1,218 @@
+import asyncio
+import json
+import threading
+import time
+import types
+import unittest
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from LLMAnalyzer import LLMAnalyzer, OpenAIError
+from LLMAnalyzer import client as llm_client
+from LLMAnalyzer.resilience import (
+    CircuitBreaker,
+    Resilience,
+    TokenBucket,
+    is_transient,
+    retry_after,
+)
+
+REPLY = json.dumps(
+    {
+        "id": "fake",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "fake",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": "ok"},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+).encode()
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Answer with the queued status codes, then with a completion."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    statuses: list = []
+    retry_after = "0"
+    hits = 0
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server API
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        FakeLLMHandler.hits += 1
+        statuses = FakeLLMHandler.statuses
+        status = statuses.pop(0) if statuses else 200
+        body = REPLY if status == 200 else b'{"error": {"message": "busy"}}'
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", FakeLLMHandler.retry_after)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class ResilienceServerTest(unittest.TestCase):
+    """Retry and breaker behaviour against a local fake OpenAI server."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLLMHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        FakeLLMHandler.statuses = []
+        FakeLLMHandler.retry_after = "0"
+        FakeLLMHandler.hits = 0
+        base_url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        self.env = patch.dict(
+            "os.environ",
+            {"OPENAI_BASE_URL": base_url, "OPENAI_API_KEY": "key"},
+        )
+        self.env.start()
+        llm_client.reset_client()
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        llm_client.reset_client()
+
+    def _analyzer(self, **kwargs) -> LLMAnalyzer:  # type: ignore
+        kwargs.setdefault("base_delay", 0.001)
+        return LLMAnalyzer(model="fake", resilience=Resilience(**kwargs))
+
+    def test_retries_rate_limited_requests(self) -> None:
+        FakeLLMHandler.statuses = [429, 429]
+        analyzer = self._analyzer()
+        self.assertEqual(analyzer._query_llm("sys", "user"), "ok")
+        self.assertEqual(FakeLLMHandler.hits, 3)
+        stats = analyzer.resilience.stats()
+        self.assertEqual((stats["retries"], stats["rate_limited"]), (2, 2))
+        self.assertEqual(stats["successes"], 1)
+        self.assertEqual(stats["breaker_state"], "closed")
+
+    def test_honours_retry_after(self) -> None:
+        FakeLLMHandler.statuses = [429]
+        FakeLLMHandler.retry_after = "0.3"
+        analyzer = self._analyzer()
+        start = time.perf_counter()
+        self.assertEqual(analyzer._query_llm("sys", "user"), "ok")
+        self.assertGreaterEqual(time.perf_counter() - start, 0.3)
+
+    def test_persistent_errors_raise(self) -> None:
+        FakeLLMHandler.statuses = [503] * 5
+        analyzer = self._analyzer(max_attempts=3)
+        with self.assertRaises(OpenAIError):
+            analyzer._query_llm("sys", "user")
+        self.assertEqual(FakeLLMHandler.hits, 3)
+        self.assertEqual(analyzer.resilience.stats()["failures"], 1)
+
+    def test_client_errors_not_retried(self) -> None:
+        FakeLLMHandler.statuses = [400]
+        analyzer = self._analyzer()
+        result = analyzer._query_llm("sys", "user")
+        self.assertTrue(result.startswith("LLM response placeholder"))
+        self.assertEqual(FakeLLMHandler.hits, 1)
+
+    def test_breaker_fails_fast_and_recovers(self) -> None:
+        FakeLLMHandler.statuses = [500, 500]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+        analyzer = self._analyzer(max_attempts=1, breaker=breaker)
+        for _ in range(2):
+            with self.assertRaises(OpenAIError):
+                analyzer._query_llm("sys", "user")
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(OpenAIError):
+            analyzer._query_llm("sys", "user")
+        self.assertEqual(FakeLLMHandler.hits, 2)
+        stats = analyzer.resilience.stats()
+        self.assertEqual((stats["rejected"], stats["breaker_opened"]), (1, 1))
+
+        time.sleep(0.25)
+        self.assertEqual(breaker.state, "half_open")
+        self.assertEqual(analyzer._query_llm("sys", "user"), "ok")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_async_path_retries(self) -> None:
+        FakeLLMHandler.statuses = [429]
+        analyzer = self._analyzer()
+        result = asyncio.run(analyzer._aquery_llm("sys", "user"))
+        self.assertEqual(result, "ok")
+        self.assertEqual(analyzer.resilience.stats()["retries"], 1)
+
+
+class ResilienceUnitTest(unittest.TestCase):
+    """Tests for the resilience helpers."""
+
+    def _error(self, status: int, headers: dict) -> Exception:
+        exc = Exception("error")
+        exc.status_code = status  # type: ignore[attr-defined]
+        exc.response = types.SimpleNamespace(  # type: ignore[attr-defined]
+            status_code=status, headers=headers
+        )
+        return exc
+
+    def test_retry_after_formats(self) -> None:
+        seconds = self._error(429, {"retry-after": "2"})
+        self.assertEqual(retry_after(seconds), 2.0)
+        milliseconds = self._error(429, {"retry-after-ms": "250"})
+        self.assertEqual(retry_after(milliseconds), 0.25)
+        date = formatdate(time.time() + 5, usegmt=True)
+        delay = retry_after(self._error(429, {"retry-after": date}))
+        self.assertTrue(3 <= delay <= 5)
+        self.assertIsNone(retry_after(Exception("plain")))
+
+    def test_transient_classification(self) -> None:
+        self.assertTrue(is_transient(self._error(429, {})))
+        self.assertTrue(is_transient(self._error(502, {})))
+        self.assertFalse(is_transient(self._error(401, {})))
+        self.assertFalse(is_transient(Exception("network")))
+
+    def test_token_bucket_spaces_requests(self) -> None:
+        bucket = TokenBucket(rate=10, capacity=1)
+        waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits[0], 0.0)
+        self.assertAlmostEqual(waits[3], 0.3, places=2)
+
+    def test_concurrency_limit(self) -> None:
+        resilience = Resilience(max_concurrency=2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def work() -> None:
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+        call = resilience.call
+        threads = []
+        for _ in range(6):
+            threads.append(threading.Thread(target=call, args=(work,)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(resilience.stats()["calls"], 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
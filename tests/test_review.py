@@ -1,8 +1,10 @@
+import asyncio
 import types
 import unittest
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import AsyncMock, patch, mock_open, MagicMock
 
-from Review import Review
+from LLMAnalyzer import client as llm_client
+from Review import REVIEW_PROMPT, Review
 
 
 class ReviewTest(unittest.TestCase):
@@ -18,17 +20,24 @@ class ReviewTest(unittest.TestCase):
     def test_prompt_template_is_used(self) -> None:
         template = "prefix {initial_report_text} suffix"
         with patch("builtins.open", mock_open(read_data=template)):
-            review = Review()
+            review = Review(template_path="review.md")
         with patch.object(Review, "_query_llm") as mock_query:
             mock_query.return_value = "ok"
             review.perform("data", language="Türkçe")
             mock_query.assert_called_with("prefix data suffix")
 
+    def test_default_template_from_prompt_registry(self) -> None:
+        review = Review()
+        prompt = review.prompt_manager.registry.get(REVIEW_PROMPT)
+        with patch("builtins.open", side_effect=AssertionError("read")):
+            self.assertEqual(review.template, prompt.source)
+            review._build_prompt("data", language="English")
+
     def test_query_llm_logs_error(self) -> None:
         """Ensure network errors are logged for debugging."""
         template = "{initial_report_text}"
         with patch("builtins.open", mock_open(read_data=template)):
-            review = Review()
+            review = Review(template_path="review.md")
         mock_openai = types.ModuleType("openai")
         mock_client = MagicMock()
         exc = Exception("timeout")
@@ -44,7 +53,7 @@ class ReviewTest(unittest.TestCase):
         """Ensure start, end and token usage messages are logged."""
         template = "{initial_report_text}"
         with patch("builtins.open", mock_open(read_data=template)):
-            review = Review()
+            review = Review(template_path="review.md")
         mock_openai = types.ModuleType("openai")
         usage = types.SimpleNamespace(total_tokens=3)
         response = types.SimpleNamespace(
@@ -64,6 +73,43 @@ class ReviewTest(unittest.TestCase):
         self.assertIn("INFO:Review:Review tokens used: 3", messages)
         self.assertIn("Review._query_llm end", messages)
 
+    def test_perform_async_uses_async_client(self) -> None:
+        template = "{initial_report_text}"
+        with patch("builtins.open", mock_open(read_data=template)):
+            review = Review(template_path="review.md")
+        message = types.SimpleNamespace(content=" rev ")
+        response = types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=message)],
+            usage=None,
+        )
+        fake = MagicMock()
+        fake.chat.completions.create = AsyncMock(return_value=response)
+        llm_client.set_async_client(fake)
+        try:
+            with patch.dict("os.environ", {"OPENAI_API_KEY": "key"}):
+                result = asyncio.run(review.perform_async("data"))
+        finally:
+            llm_client.set_async_client(None)
+        self.assertEqual(result, "rev")
+        fake.chat.completions.create.assert_awaited_once_with(
+            model=review.model, messages=[{"role": "user", "content": "data"}]
+        )
+
+    def test_perform_async_placeholder_on_error(self) -> None:
+        template = "{initial_report_text}"
+        with patch("builtins.open", mock_open(read_data=template)):
+            review = Review(template_path="review.md")
+        fake = MagicMock()
+        error = Exception("timeout")
+        fake.chat.completions.create = AsyncMock(side_effect=error)
+        llm_client.set_async_client(fake)
+        try:
+            with patch.dict("os.environ", {"OPENAI_API_KEY": "key"}):
+                result = asyncio.run(review.perform_async("data"))
+        finally:
+            llm_client.set_async_client(None)
+        self.assertTrue(result.startswith("LLM review placeholder"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,66 @@
+import random
+import unittest
+
+from ComplaintSearch.similarity import (
+    ColumnMatcher,
+    NGramIndex,
+    ScanIndex,
+    SimilarityIndex,
+)
+
+
+class SimilarityIndexTest(unittest.TestCase):
+    """Tests for the fuzzy matching engines."""
+
+    def setUp(self) -> None:
+        rnd = random.Random(7)
+        alphabet = "abcde "
+        self.values = [
+            "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 12)))
+            for _ in range(400)
+        ]
+        self.values += ["noise issue", "noize issue", "crack", "sikayet var"]
+        self.queries = [
+            "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 10)))
+            for _ in range(60)
+        ] + ["noise issue", "sikayet", "crak", ""]
+
+    def test_index_without_match_cannot_be_created(self) -> None:
+        class Incomplete(SimilarityIndex):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete(self.values)
+
+    def test_ngram_matches_scan(self) -> None:
+        """Indexed results should equal the brute-force engine."""
+        scan = ScanIndex(self.values)
+        ngram = NGramIndex(self.values)
+        for query in self.queries:
+            for substring in (True, False):
+                with self.subTest(query=query, substring=substring):
+                    expected = scan.match(query, substring)
+                    self.assertEqual(ngram.match(query, substring), expected)
+
+    def test_substring_and_fuzzy(self) -> None:
+        index = NGramIndex(["noise issue", "crack", "door"])
+        self.assertEqual(index.match("noise", substring=True), [0])
+        self.assertEqual(index.match("noise"), [])
+        self.assertEqual(index.match("noize issue"), [0])
+        self.assertEqual(index.match("crak"), [1])
+
+    def test_threshold_is_respected(self) -> None:
+        index = NGramIndex(["abcdefghij"], threshold=0.95)
+        self.assertEqual(index.match("abcdefghix"), [])
+        self.assertEqual(index.match("abcdefghij"), [0])
+
+    def test_column_matcher_maps_rows(self) -> None:
+        matcher = ColumnMatcher.from_values(["acme", "beta", "acme"])
+        self.assertEqual(matcher.match("acme"), {0, 2})
+        self.assertEqual(matcher.match("acmee"), {0, 2})
+        matcher.add("acmes", 3)
+        self.assertEqual(matcher.match("acme"), {0, 2, 3})
+
+
+if __name__ == "__main__":
+    unittest.main()